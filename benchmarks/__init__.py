@@ -0,0 +1 @@
+"""Offline performance benchmarks: synthetic corpus, fake Ollama server and runners."""
@@ -0,0 +1,97 @@
+"""Benchmark Comparison
+
+Compares a benchmark result file with a stored baseline and flags metrics
+that got worse by more than a tolerance.
+
+Usage:
+    python -m benchmarks.compare results.json benchmarks/baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import sys
+
+
+def flatten(data: dict, prefix: str = "") -> dict[str, float]:
+    """Flattens nested results into dotted metric names."""
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def direction(metric: str) -> str | None:
+    """"lower" or "higher" for metrics where that is better; None for counts and settings."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if "throughput" in leaf or leaf.endswith("_per_second"):
+        return "higher"
+    if "_ms" in metric or leaf.endswith("seconds"):
+        return "lower"
+    return None
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.15) -> list[dict]:
+    """
+    Compares the startup, ingest and query metrics of two result files.
+
+    Args:
+        results (dict): Current benchmark results.
+        baseline (dict): Baseline results.
+        tolerance (float): Allowed relative change in the bad direction.
+
+    Returns:
+        list[dict]: One row per metric present in both, with ``regression`` set when it got worse.
+    """
+    current = flatten({key: results.get(key, {}) for key in ("startup", "ingest", "query")})
+    reference = flatten({key: baseline.get(key, {}) for key in ("startup", "ingest", "query")})
+    rows = []
+    for metric in sorted(current.keys() & reference.keys()):
+        better = direction(metric)
+        if better is None or not reference[metric]:
+            continue
+        change = (current[metric] - reference[metric]) / reference[metric]
+        worse = change if better == "lower" else -change
+        rows.append({
+            "metric": metric,
+            "baseline": reference[metric],
+            "current": current[metric],
+            "change": round(change, 4),
+            "regression": worse > tolerance,
+        })
+    return rows
+
+
+def print_comparison(rows: list[dict]):
+    width = max((len(row["metric"]) for row in rows), default=10)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['metric'].ljust(width)}  {row['baseline']:>12.3f}  {row['current']:>12.3f}  "
+            f"{row['change']:>+8.1%}  {flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark results with a baseline")
+    parser.add_argument("results", help="Current results JSON")
+    parser.add_argument("baseline", help="Baseline results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown (default: 0.15)")
+    args = parser.parse_args()
+
+    with open(args.results, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if results.get("config") != baseline.get("config"):
+        print("Warning: results and baseline were produced with different settings.")
+
+    rows = compare(results, baseline, args.tolerance)
+    print_comparison(rows)
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Synthetic PDF Corpus
+
+Generates product-sheet-like PDFs of a configurable size, together with
+questions whose answers are stated in the documents.
+"""
+import os
+import random
+import fitz  # PyMuPDF
+
+WORDS = (
+    "pump motor impeller casing seal bearing flange valve sensor controller circulator coupling "
+    "pressure flow head efficiency speed voltage frequency temperature installation maintenance "
+    "vertical inline split case suction discharge variable drive parallel sequencing redundancy"
+).split()
+
+PROPERTIES = [
+    ("maximum flow", "gpm", 50, 5000),
+    ("maximum working pressure", "psi", 75, 400),
+    ("maximum head", "ft", 20, 600),
+    ("motor power", "hp", 1, 300),
+    ("operating temperature limit", "°F", 150, 300),
+]
+
+
+def generate_corpus(
+    out_dir: str,
+    n_docs: int = 20,
+    pages_per_doc: int = 10,
+    facts_per_page: int = 3,
+    words_per_page: int = 350,
+    seed: int = 0,
+) -> list[str]:
+    """
+    Writes ``n_docs`` PDFs to ``out_dir``.
+
+    Each page holds filler prose around a few facts of the form
+    "The <model> has a <property> of <value> <unit>."
+
+    Returns:
+        list[str]: Questions about the facts, one per fact.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    questions = []
+    for doc_no in range(n_docs):
+        doc = fitz.open()
+        for _ in range(pages_per_doc):
+            sentences = []
+            for _ in range(facts_per_page):
+                model = f"{rng.choice(['IPS', 'VIL', 'DE', 'PT'])}-{rng.randint(1000, 9999)}"
+                prop, unit, low, high = rng.choice(PROPERTIES)
+                sentences.append(f"The {model} has a {prop} of {rng.randint(low, high)} {unit}.")
+                questions.append(f"What is the {prop} of the {model}?")
+            while sum(len(s.split()) for s in sentences) < words_per_page:
+                filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+                sentences.insert(rng.randint(0, len(sentences)), filler.capitalize() + ".")
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 550, 800), " ".join(sentences), fontsize=9)
+        doc.save(os.path.join(out_dir, f"synthetic_{doc_no:04d}.pdf"))
+        doc.close()
+    return questions
@@ -0,0 +1,163 @@
+"""Embedding Backend Parity Check
+
+Compares an ONNX embedding backend (optionally int8-quantized) with the
+PyTorch model on the same chunks and questions:
+
+- agreement: cosine similarity between the two vectors of each chunk;
+- retrieval: overlap of the top-k chunks retrieved for each question, with
+  the index built from each backend's chunk vectors;
+- latency: single-query encode percentiles and chunk throughput of both.
+
+Usage:
+    python -m benchmarks.embedding_parity --onnx-file onnx/model_qint8_avx512_vnni.onnx --docs 20
+    python -m benchmarks.embedding_parity --export-quantized avx2 --save-dir models/minilm-onnx
+
+With ``--export-quantized``, a quantized copy of EMBEDDING_MODEL is written
+to ``--save-dir`` first and compared. Exits with code 1 if the mean cosine
+similarity or the mean top-k overlap is below the given minimum.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.embedding_throughput import load_chunks
+from benchmarks.run import summarize
+
+
+def normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype="float32")
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def time_encode(model, texts: list[str], batch_size: int) -> tuple[np.ndarray, float]:
+    model.encode(texts[:batch_size], batch_size=batch_size, show_progress_bar=False)  # Warm-up
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return normalized(vectors), time.perf_counter() - start
+
+
+def query_latency(model, queries: list[str]) -> tuple[np.ndarray, dict]:
+    vectors, seconds = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vectors.append(model.encode([query], convert_to_numpy=True, show_progress_bar=False)[0])
+        seconds.append(time.perf_counter() - start)
+    return normalized(np.stack(vectors)), summarize(seconds)
+
+
+def top_k(chunk_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = query_vectors @ chunk_vectors.T
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+def compare(reference: dict, candidate: dict, k: int) -> dict:
+    """Agreement of two backends' chunk and query vectors and of the chunks they retrieve."""
+    cosine = np.sum(reference["chunks"] * candidate["chunks"], axis=1)
+    query_cosine = np.sum(reference["queries"] * candidate["queries"], axis=1)
+    expected = top_k(reference["chunks"], reference["queries"], k)
+    actual = top_k(candidate["chunks"], candidate["queries"], k)
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(expected.tolist(), actual.tolist())]
+    return {
+        "chunk_cosine": {
+            "mean": round(float(cosine.mean()), 5),
+            "min": round(float(cosine.min()), 5),
+            "p01": round(float(np.percentile(cosine, 1)), 5),
+        },
+        "query_cosine_mean": round(float(query_cosine.mean()), 5),
+        f"top{k}_overlap_mean": round(float(np.mean(overlap)), 4),
+        "top1_agreement": round(float(np.mean(expected[:, 0] == actual[:, 0])), 4),
+    }
+
+
+def run(args) -> dict:
+    from main.config import Config
+    from main.embedder import backend
+
+    model_name = Config.EMBEDDING_MODEL
+    onnx_file = args.onnx_file
+    if args.export_quantized:
+        onnx_file = backend.export_quantized(model_name, args.save_dir, args.export_quantized)
+        model_name = args.save_dir
+        print(f"Exported {onnx_file} to {args.save_dir}", file=sys.stderr)
+
+    corpus_dir = os.path.join(tempfile.mkdtemp(prefix="rag-parity-"), "corpus")
+    questions = generate_corpus(corpus_dir, args.docs, args.pages, seed=args.seed)
+    chunks = load_chunks(corpus_dir)
+    if os.path.isdir(args.sample_dir):
+        chunks += load_chunks(args.sample_dir)
+    queries = random.Random(args.seed).sample(questions, min(args.queries, len(questions)))
+    print(f"{len(chunks)} chunks, {len(queries)} queries", file=sys.stderr)
+
+    backends = {
+        "torch": backend.load_model(Config.EMBEDDING_MODEL, backend_name="torch"),
+        "onnx": backend.load_model(model_name, backend_name="onnx", onnx_file=onnx_file),
+    }
+    vectors, latency = {}, {}
+    for name, model in backends.items():
+        chunk_vectors, seconds = time_encode(model, chunks, Config.EMBEDDING_BATCH_SIZE)
+        query_vectors, query_stats = query_latency(model, queries)
+        vectors[name] = {"chunks": chunk_vectors, "queries": query_vectors}
+        latency[name] = {"query": query_stats, "chunks_per_second": round(len(chunks) / seconds, 2)}
+        print(f"  {name}: {latency[name]['chunks_per_second']} chunks/s, query {query_stats}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "onnx_model": model_name,
+            "onnx_file": onnx_file,
+            "fingerprint": backend.fingerprint(model_name, "onnx", onnx_file),
+            "chunks": len(chunks),
+            "queries": len(queries),
+            "k": args.k,
+        },
+        "parity": compare(vectors["torch"], vectors["onnx"], args.k),
+        "latency": latency,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the ONNX embedding backend with PyTorch")
+    parser.add_argument("--onnx-file", default="onnx/model.onnx", help="ONNX file in the model repository")
+    parser.add_argument("--export-quantized", choices=["arm64", "avx2", "avx512", "avx512_vnni"],
+                        help="Export an int8-quantized copy of the model first")
+    parser.add_argument("--save-dir", default="models/onnx-int8", help="Where --export-quantized writes the model")
+    parser.add_argument("--sample-dir", default="sample_pdfs", help="Real PDFs to include, if present")
+    parser.add_argument("--docs", type=int, default=20, help="Synthetic PDFs to generate")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per synthetic PDF")
+    parser.add_argument("--queries", type=int, default=200, help="Questions to compare retrieval and latency on")
+    parser.add_argument("-k", type=int, default=5, help="Top-k for retrieval overlap")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Minimum mean chunk cosine similarity")
+    parser.add_argument("--min-overlap", type=float, default=0.9, help="Minimum mean top-k overlap")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    parity = results["parity"]
+    if parity["chunk_cosine"]["mean"] < args.min_cosine or parity[f"top{args.k}_overlap_mean"] < args.min_overlap:
+        print("Parity check failed.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
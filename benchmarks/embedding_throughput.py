@@ -0,0 +1,131 @@
+"""Embedding Throughput Benchmark
+
+Measures chunks/second of ingest-time embedding for several worker counts:
+in-process encoding (0 workers) and ``EmbeddingPool`` with 1, 2, 4, ...
+worker processes. Chunks come from the PDFs in ``sample_pdfs/`` and from a
+synthetic corpus of the requested size, chunked like the ingest pipeline.
+
+Usage:
+    python -m benchmarks.embedding_throughput --workers 0,1,2,4,8 --docs 50 --output embed.json
+
+Worker start-up (loading the model in each process) is excluded from the
+timings; the embedding cache is not used.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import generate_corpus
+
+
+def load_chunks(folder: str) -> list[str]:
+    from main.chunker import text_chunker
+    from main.config import Config
+    from main.extractor import pdf_extractor
+
+    files = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+    chunks = []
+    for result in pdf_extractor.extract_pdfs_parallel(files):
+        chunks.extend(text_chunker.chunk_text(result.text, Config.CHUNK_SIZE, Config.CHUNK_OVERLAP))
+    return chunks
+
+
+def bench_workers(chunks: list[str], workers: int, threads_per_worker: int | None, repeat: int) -> dict:
+    """Best-of-``repeat`` throughput of encoding ``chunks`` with ``workers`` processes (0: in-process)."""
+    from main.embedder import embedder
+    from main.embedder.embedding_pool import EmbeddingPool
+
+    if workers < 1:
+        encode, pool = embedder.encode_batched, None
+        threads = None
+    else:
+        pool = EmbeddingPool(workers, threads_per_worker)
+        pool.warm_up()
+        encode, threads = pool.encode, pool.threads_per_worker
+    try:
+        encode(chunks[:64])  # Warm-up
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            encode(chunks)
+            seconds.append(time.perf_counter() - start)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    best = min(seconds)
+    return {
+        "workers": workers,
+        "threads_per_worker": threads,
+        "seconds": round(best, 3),
+        "chunks_per_second": round(len(chunks) / best, 2),
+    }
+
+
+def run(args) -> dict:
+    corpora = {}
+    if os.path.isdir(args.sample_dir) and any(f.lower().endswith(".pdf") for f in os.listdir(args.sample_dir)):
+        corpora["sample_pdfs"] = load_chunks(args.sample_dir)
+    if args.docs:
+        corpus_dir = os.path.join(tempfile.mkdtemp(prefix="rag-embed-bench-"), "corpus")
+        generate_corpus(corpus_dir, args.docs, args.pages, seed=args.seed)
+        corpora["synthetic"] = load_chunks(corpus_dir)
+
+    from main.config import Config
+
+    results = {}
+    for name, chunks in corpora.items():
+        print(f"{name}: {len(chunks)} chunks", file=sys.stderr)
+        rows = []
+        for workers in args.workers:
+            row = bench_workers(chunks, workers, args.threads_per_worker, args.repeat)
+            row["speedup"] = round(row["chunks_per_second"] / rows[0]["chunks_per_second"], 2) if rows else 1.0
+            print(f"  {workers} workers: {row['chunks_per_second']} chunks/s", file=sys.stderr)
+            rows.append(row)
+        results[name] = {"chunks": len(chunks), "runs": rows}
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "batch_size": Config.EMBEDDING_BATCH_SIZE,
+            "chunk_size": Config.CHUNK_SIZE,
+            "docs": args.docs,
+            "pages": args.pages,
+        },
+        "corpora": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput by worker count")
+    parser.add_argument("--workers", default="0,1,2,4", help="Comma-separated worker counts; 0 encodes in-process")
+    parser.add_argument("--threads-per-worker", type=int, help="Torch threads per worker (default: cores / workers)")
+    parser.add_argument("--sample-dir", default="sample_pdfs", help="Real PDFs to include, if present")
+    parser.add_argument("--docs", type=int, default=50, help="Synthetic PDFs to generate (0: none)")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per worker count (best is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+    args.workers = [int(n) for n in args.workers.split(",")]
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Fake Ollama Server
+
+Local stand-in for the Ollama HTTP API, so benchmarks run offline and
+measure this project's overhead instead of model speed. It serves
+``/api/tags``, ``/api/generate`` and ``/api/chat``, streaming or not, and
+emits tokens at a configurable rate after a configurable first-token latency.
+
+Run standalone (e.g. for the Streamlit app):
+    python -m benchmarks.fake_ollama --port 11434 --tokens-per-second 40
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOllamaServer:
+    """
+    Threaded fake Ollama server; use as a context manager.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free one.
+        tokens_per_second (float): Generation speed; 0 for instant.
+        first_token_latency (float): Seconds before the first token (prompt processing).
+        answer_tokens (int): Tokens per generated answer.
+        chat_reply (str): Fixed reply to /api/chat requests without a system message
+            (those of the LLM intent detector).
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        tokens_per_second: float = 50.0,
+        first_token_latency: float = 0.2,
+        answer_tokens: int = 64,
+        chat_reply: str = "question",
+    ):
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.answer_tokens = answer_tokens
+        self.chat_reply = chat_reply
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """API base URL, as expected by OllamaClient."""
+        return f"http://127.0.0.1:{self._server.server_port}/api"
+
+    @property
+    def base_url(self) -> str:
+        """Server URL, as expected by langchain's ChatOllama."""
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def tokens(self, n: int):
+        """Yields ``n`` tokens at the configured pace."""
+        time.sleep(self.first_token_latency)
+        for i in range(n):
+            if i and self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield f"tok{i} "
+
+
+def _make_handler(server: FakeOllamaServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/api/tags":
+                self._send_json({"models": [{"name": "fake", "model": "fake"}]})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            server.requests += 1
+            if self.path == "/api/generate":
+                if "prompt" not in body:
+                    # Load-only request (keep_alive warm-up)
+                    self._send_json(self._final(body, done_reason="load"))
+                    return
+                self._reply(body, server.tokens(server.answer_tokens), "response")
+            elif self.path == "/api/chat":
+                if body.get("messages", [{}])[0].get("role") == "system":
+                    # RAG answer in chat mode
+                    self._reply(body, server.tokens(server.answer_tokens), "message")
+                else:
+                    # Intent classification by the LLM detector
+                    self._reply(body, iter([server.chat_reply]), "message")
+            else:
+                self.send_error(404)
+
+        def _reply(self, body: dict, tokens, field: str):
+            start = time.perf_counter_ns()
+
+            def chunk(text):
+                if field == "message":
+                    return {"message": {"role": "assistant", "content": text}}
+                return {"response": text}
+
+            if not body.get("stream", True):
+                text = "".join(tokens)
+                self._send_json(dict(self._final(body, start, len(text.split())), **chunk(text)))
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            count = 0
+            for token in tokens:
+                count += 1
+                self._write_chunk(dict(model=body.get("model"), done=False, **chunk(token)))
+            self._write_chunk(dict(self._final(body, start, count), **chunk("")))
+            self.wfile.write(b"0\r\n\r\n")
+
+        @staticmethod
+        def _final(body: dict, start: int | None = None, count: int = 0, done_reason: str = "stop") -> dict:
+            duration = time.perf_counter_ns() - start if start else 0
+            return {
+                "model": body.get("model"),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "done": True,
+                "done_reason": done_reason,
+                "total_duration": duration,
+                "load_duration": 0,
+                "prompt_eval_count": len(str(body.get("prompt", body.get("messages", ""))).split()),
+                "prompt_eval_duration": int(server.first_token_latency * 1e9),
+                "eval_count": count,
+                "eval_duration": max(0, duration - int(server.first_token_latency * 1e9)),
+            }
+
+        def _write_chunk(self, data: dict):
+            line = json.dumps(data).encode() + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, data: dict):
+            payload = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline benchmarks")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="Seconds")
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.port, args.tokens_per_second, args.first_token_latency, args.answer_tokens)
+    print(f"Fake Ollama listening on {server.base_url}")
+    server.start()
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Benchmark Runner
+
+Builds the global index from a synthetic PDF corpus and times every ingest
+stage, then runs queries through ``pipeline.query_and_respond`` against a
+fake Ollama server and reports end-to-end and time-to-first-token latency
+percentiles. Everything runs offline in a scratch directory.
+
+Usage:
+    python -m benchmarks.run --docs 20 --pages 10 --queries 100 --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit code 1 on regression
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+
+Only the embedding model must be available locally (or downloadable).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING
+import numpy as np
+
+from benchmarks.compare import compare, print_comparison
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+
+if TYPE_CHECKING:
+    from main.vector_store.sharded_store import ShardedStore
+
+GREETINGS = ["hello", "hi there", "thanks!", "thank you, bye", "what can you do?"]
+
+
+def summarize(seconds: list[float]) -> dict:
+    """Latency percentiles in milliseconds."""
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "mean_ms": round(float(ms.mean()), 2),
+    }
+
+
+class TimedLLM:
+    """Wraps an LLM client and records when the first token of each answer arrives."""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.first_token = None
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def generate_answer(self, prompt: str) -> str:
+        answer = self.llm.generate_answer(prompt)
+        self.first_token = self.first_token or time.perf_counter()
+        return answer
+
+    def stream_answer(self, prompt: str):
+        return self._timed(self.llm.stream_answer(prompt))
+
+    def chat_answer(self, messages: list[dict]) -> str:
+        answer = self.llm.chat_answer(messages)
+        self.first_token = self.first_token or time.perf_counter()
+        return answer
+
+    def stream_chat(self, messages: list[dict]):
+        return self._timed(self.llm.stream_chat(messages))
+
+    def _timed(self, stream):
+        for delta in stream:
+            self.first_token = self.first_token or time.perf_counter()
+            yield delta
+
+
+def bench_ingest(pipeline, corpus_dir: str) -> tuple[dict, "ShardedStore | None"]:
+    """
+    Times a full rebuild and a no-op sync of the global index.
+
+    Returns:
+        tuple: (ingest results: file and chunk counts, timings and per-stage
+        throughput; the rebuilt index, or None if the corpus produced no chunks).
+    """
+    pipeline.SAMPLE_DIR = corpus_dir
+    stats = {}
+    start = time.perf_counter()
+    index = pipeline.build_global_index(force=True, stats=stats)
+    total = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pipeline.build_global_index(force=False)
+    noop = time.perf_counter() - start
+
+    chunks = index.ntotal if index is not None else 0
+    return {
+        "files": len(os.listdir(corpus_dir)),
+        "chunks": chunks,
+        "total_seconds": round(total, 3),
+        "chunks_per_second": round(chunks / total, 2) if total else 0.0,
+        "noop_sync_seconds": round(noop, 3),
+        "stages": {
+            name: {
+                "items": stage.items,
+                "unit": stage.unit,
+                "busy_seconds": round(stage.busy_seconds, 3),
+                "throughput": round(stage.throughput, 2),
+            }
+            for name, stage in stats.items()
+        },
+    }, index
+
+
+def bench_queries(pipeline, index, queries: list[str], server: FakeOllamaServer, warmup: int = 5) -> dict:
+    """Runs each query through query_and_respond with a fresh history and records its latency."""
+    from langchain_ollama import ChatOllama
+    from main import metrics
+    from main.config import Config
+    from main.intent_classifier import EmbeddingIntentDetector
+    from main.intent_detector import IntentDetector
+    from main.llm.ollama_client import OllamaClient
+
+    llm = TimedLLM(OllamaClient(url=server.url))
+    llm_detector = IntentDetector(ChatOllama(model=Config.OLLAMA_MODEL, base_url=server.base_url))
+    if Config.INTENT_BACKEND == "llm":
+        intent_detector = llm_detector
+    else:
+        intent_detector = EmbeddingIntentDetector(fallback=llm_detector)
+
+    latencies, first_tokens, first_query = [], [], None
+    for position, query in enumerate(queries[:warmup] + queries):
+        if position == warmup:
+            metrics.REGISTRY.reset()
+        llm.first_token = None
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            pipeline.query_and_respond(index, query, llm, [], intent_detector)
+            end = time.perf_counter()
+        if position == 0:
+            first_query = end - start
+        if position < warmup:
+            continue
+        latencies.append(end - start)
+        first_tokens.append((llm.first_token or end) - start)
+
+    return {
+        "count": len(latencies),
+        # After ingest loaded the embedding model, but with cold caches and intent centroids
+        "first_query_ms": round(first_query * 1000, 2) if first_query is not None else None,
+        "end_to_end": summarize(latencies),
+        "first_token": summarize(first_tokens),
+        "stages": stage_summary(),
+    }
+
+
+def stage_summary() -> dict:
+    """Per-stage p50/p95 (estimated from the metrics histograms), in milliseconds."""
+    from main import metrics
+
+    prefix = 'rag_stage_seconds{stage="'
+    return {
+        name[len(prefix):-2]: {
+            "count": summary["count"],
+            "p50_ms": round(summary["p50"] * 1000, 2),
+            "p95_ms": round(summary["p95"] * 1000, 2),
+        }
+        for name, summary in metrics.snapshot().items()
+        if name.startswith(prefix)
+    }
+
+
+def run(args) -> dict:
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="rag-bench-"))
+    corpus_dir = os.path.join(workdir, "corpus")
+    questions = generate_corpus(corpus_dir, args.docs, args.pages, seed=args.seed)
+
+    # Index, manifest, embedding cache and debug output all live under the scratch directory
+    os.chdir(workdir)
+    start = time.perf_counter()
+    import pipeline
+    import_seconds = time.perf_counter() - start
+    from main.config import Config
+
+    print(f"Ingesting {args.docs} PDFs x {args.pages} pages in {workdir}", file=sys.stderr)
+    ingest, index = bench_ingest(pipeline, corpus_dir)
+
+    rng = random.Random(args.seed)
+    queries = [
+        rng.choice(GREETINGS) if rng.random() < args.greeting_ratio else rng.choice(questions)
+        for _ in range(args.queries)
+    ]
+    print(f"Running {len(queries)} queries", file=sys.stderr)
+    with FakeOllamaServer(
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.first_token_latency,
+        answer_tokens=args.answer_tokens,
+    ) as server:
+        query = bench_queries(pipeline, index, queries, server)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "docs": args.docs,
+            "pages": args.pages,
+            "queries": args.queries,
+            "greeting_ratio": args.greeting_ratio,
+            "tokens_per_second": args.tokens_per_second,
+            "first_token_latency": args.first_token_latency,
+            "answer_tokens": args.answer_tokens,
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "chunk_size": Config.CHUNK_SIZE,
+            "index_spec": Config.FAISS_INDEX_SPEC,
+            "intent_backend": Config.INTENT_BACKEND,
+            "llm_mode": Config.LLM_MODE,
+        },
+        "startup": {"import_seconds": round(import_seconds, 3)},
+        "ingest": ingest,
+        "query": query,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingest and query benchmarks")
+    parser.add_argument("--docs", type=int, default=20, help="Synthetic PDFs to generate")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF")
+    parser.add_argument("--queries", type=int, default=100, help="Queries to time")
+    parser.add_argument("--greeting-ratio", type=float, default=0.1, help="Share of non-question messages")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Fake LLM generation speed")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="Fake LLM prompt latency (seconds)")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="Fake LLM answer length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a new temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare with this results JSON; exit code 1 on regression")
+    parser.add_argument("--save-baseline", help="Also write the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown (default: 0.15)")
+    args = parser.parse_args()
+
+    # Paths are resolved before run() changes into the scratch directory
+    output, baseline_path, save_path = (
+        os.path.abspath(path) if path else None for path in (args.output, args.baseline, args.save_baseline)
+    )
+    results = run(args)
+
+    report = json.dumps(results, indent=2)
+    for path in (output, save_path):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+    if not output:
+        print(report)
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("Warning: baseline was produced with different settings.", file=sys.stderr)
+        rows = compare(results, baseline, args.tolerance)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""HTTP Service Load Benchmark
+
+Builds the global index from a synthetic PDF corpus, starts the HTTP service
+(``server.py``) against a fake Ollama server and sends /query requests from
+1, 2, 4, ... concurrent clients, each on a keep-alive connection. Every
+request asks a different question, so the query caches do not hide the
+retrieval cost. Reports throughput, latency percentiles and the mean batch
+size at each concurrency level, with micro-batching and without it
+(SERVE_MAX_BATCH_SIZE=1).
+
+Usage:
+    python -m benchmarks.serve_load --concurrency 1,2,4,8,16,32 --requests 200
+    python -m benchmarks.serve_load --stream --first-token-latency 0.2 --tokens-per-second 50
+
+The fake LLM serves any number of requests at once; ``--llm-concurrency``
+is the client-side limit (OLLAMA_MAX_CONCURRENCY in a real deployment).
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.run import summarize
+
+
+class ServiceThread:
+    """Runs a QueryService on its own event loop in a daemon thread; use as a context manager."""
+
+    def __init__(self, service):
+        self.service = service
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(self.service.start("127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        server.close()
+        self._loop.run_until_complete(self.service.close())
+
+    def __enter__(self) -> "ServiceThread":
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def send_requests(port: int, questions: list[str], concurrency: int, stream: bool) -> tuple[list[float], float]:
+    """Sends every question from ``concurrency`` clients; returns the latencies and the wall time."""
+    pending = list(reversed(questions))
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def client():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while True:
+            with lock:
+                if not pending:
+                    break
+                question = pending.pop()
+            body = json.dumps({"question": question, "stream": stream})
+            start = time.perf_counter()
+            connection.request("POST", "/query", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200:
+                errors.append(data)
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    if errors:
+        print(f"  {len(errors)} failed requests, e.g. {errors[0][:200]!r}", file=sys.stderr)
+    return latencies, seconds
+
+
+def bench_level(running: ServiceThread, questions: list[str], concurrency: int, stream: bool) -> dict:
+    before = running.service.batcher.stats()
+    latencies, seconds = send_requests(running.port, questions, concurrency, stream)
+    after = running.service.batcher.stats()
+    batches = after["batches"] - before["batches"]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / seconds, 2),
+        "mean_batch_size": round((after["items"] - before["items"]) / batches, 2) if batches else 0.0,
+        "latency": summarize(latencies),
+    }
+
+
+def run(args) -> dict:
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="rag-serve-"))
+    corpus_dir = os.path.join(workdir, "corpus")
+    questions = generate_corpus(corpus_dir, args.docs, args.pages, seed=args.seed)
+
+    # Index, manifest and embedding cache all live under the scratch directory
+    os.chdir(workdir)
+    import pipeline
+    import server
+    from main.config import Config
+    from main.intent_classifier import EmbeddingIntentDetector
+    from main.llm.ollama_client import OllamaClient
+
+    Config.ANSWER_CACHE_SIZE = 0  # Similar questions would skip generation
+    print(f"Ingesting {args.docs} PDFs x {args.pages} pages in {workdir}", file=sys.stderr)
+    pipeline.SAMPLE_DIR = corpus_dir
+    index = pipeline.build_global_index(force=True)
+    intent_detector = EmbeddingIntentDetector()
+    intent_detector.warm_up()
+
+    rng = random.Random(args.seed)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results = {"batched": [], "unbatched": []}
+    with FakeOllamaServer(
+        tokens_per_second=args.tokens_per_second,
+        first_token_latency=args.first_token_latency,
+        answer_tokens=args.answer_tokens,
+    ) as fake:
+        llm = OllamaClient(url=fake.url, max_concurrency=args.llm_concurrency)
+        for mode, max_batch_size in (("batched", args.max_batch_size), ("unbatched", 1)):
+            service = server.QueryService(
+                index, llm, intent_detector, max_batch_size=max_batch_size, max_wait_ms=args.max_wait_ms,
+                workers=max(levels) * 2,
+            )
+            with ServiceThread(service) as running:
+                for concurrency in levels:
+                    # A number makes each question unique, so nothing is answered from a cache
+                    batch = [f"{rng.choice(questions)} ({rng.randrange(10 ** 9)})" for _ in range(args.requests)]
+                    level = bench_level(running, batch, concurrency, args.stream)
+                    results[mode].append(level)
+                    print(
+                        f"  {mode} x{concurrency}: {level['requests_per_second']} req/s, "
+                        f"batch {level['mean_batch_size']}, p95 {level['latency'].get('p95_ms')} ms",
+                        file=sys.stderr,
+                    )
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "docs": args.docs,
+            "pages": args.pages,
+            "requests": args.requests,
+            "stream": args.stream,
+            "max_batch_size": args.max_batch_size,
+            "max_wait_ms": args.max_wait_ms,
+            "llm_concurrency": args.llm_concurrency,
+            "tokens_per_second": args.tokens_per_second,
+            "first_token_latency": args.first_token_latency,
+            "answer_tokens": args.answer_tokens,
+            "embedding_model": Config.EMBEDDING_MODEL,
+        },
+        "load": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the HTTP service under concurrent load")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="Comma-separated concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--stream", action="store_true", help="Request streamed answers")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Queries retrieved together")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Longest wait for a batch to fill")
+    parser.add_argument("--llm-concurrency", type=int, default=64, help="Generations in flight")
+    parser.add_argument("--docs", type=int, default=20, help="Synthetic PDFs to generate")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per PDF")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake LLM generation speed; 0 for instant")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Fake LLM prompt latency (seconds)")
+    parser.add_argument("--answer-tokens", type=int, default=64, help="Fake LLM answer length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Scratch directory (default: a new temporary directory)")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import streamlit as st
 import time
 
-from pipeline import build_global_index, build_prompt
+from pipeline import build_global_index
 from main.llm.ollama_client import OllamaClient
-from main.intent_detector import IntentDetector
-from main.vector_store import faiss_indexer
-from main.embedder import embedder
+from main.intent_classifier import create_intent_detector
+from main.rag_pipeline import cache_stats, recent_history, stream_query
+from main import metrics, rag_pipeline
+from main.config import Config
+
+MAX_HISTORY_TURNS = 4
 
 
 # === Page Setup ===
@@ -17,9 +20,18 @@ st.caption("Ask technical questions about Armstrong products. I'll pull relevant
 # === Component Initialization ===
 @st.cache_resource
 def load_components():
+    start = time.perf_counter()
     llm = OllamaClient()
+    intent_detector = create_intent_detector()
+    if Config.WARM_UP:
+        # Model loading and the Ollama ping overlap with the index sync
+        rag_pipeline.start_warm_up(llm, intent_detector=intent_detector)
     index = build_global_index(force=False)
-    intent_detector = IntentDetector()
+    if Config.WARM_UP:
+        rag_pipeline.start_warm_up(index=index)
+    if Config.METRICS_PORT:
+        metrics.serve(Config.METRICS_PORT)
+    metrics.record_startup("streamlit", time.perf_counter() - start)
     return llm, index, intent_detector
 
 llm, index, intent_detector = load_components()
@@ -36,6 +48,15 @@ with st.sidebar:
     if st.button("Reset Conversation"):
         st.session_state.history.clear()
         st.rerun()
+    collections = st.multiselect(
+        "Collections", index.collections if index else [], help="Search only these collections (all if none selected)"
+    )
+    with st.expander("Cache statistics"):
+        st.json(cache_stats())
+    with st.expander("LLM requests"):
+        st.json(llm.stats())
+    with st.expander("Stage latency"):
+        st.json(metrics.snapshot())
 
 
 # === Display Chat History ===
@@ -47,33 +68,16 @@ for user_msg, assistant_msg in st.session_state.history:
 
 
 # === Core Logic ===
-def respond_to_query(query_text: str) -> str:
-    intent = intent_detector.detect(query_text)
-
-    if intent == "greeting":
-        return "Hello! I'm your Armstrong assistant. Ask me a technical question and I’ll look it up for you."
-    elif intent == "thanks":
-        return "You're welcome! Let me know if you have more questions."
-    elif intent == "goodbye":
-        return "Goodbye! Feel free to come back with more questions anytime."
-    elif intent == "help":
-        return "I can help answer questions about Armstrong products. Ask me something specific!"
-    elif intent == "vague":
-        return "Could you please rephrase your question or ask something more specific?"
-    elif intent == "empty":
-        return None
-
-    top_chunks = faiss_indexer.query_faiss_index(index, query_text, embedder.get_model(), k=4)
-    if not top_chunks:
-        return "Sorry, I couldn't find relevant information in the documents."
-
-    max_score = max(score for _, score in top_chunks)
-    if max_score < 0.2:
-        return "I looked through the documents but didn’t find anything helpful for that question."
-
-    context = "\n\n".join(chunk for chunk, _ in top_chunks)
-    prompt = build_prompt(context, query_text, st.session_state.history[-3:])
-    return llm.generate_answer(prompt)
+def respond_to_query(query_text: str):
+    history = recent_history(st.session_state.history, MAX_HISTORY_TURNS)
+    return stream_query(index, query_text, llm, history, intent_detector, collections=collections or None)
+
+
+def timed(stream, timings: dict):
+    """Passes a stream through, recording when the first delta arrives."""
+    for delta in stream:
+        timings.setdefault("first_token", time.time())
+        yield delta
 
 
 # === Chat Input ===
@@ -83,15 +87,18 @@ if query:
     with st.chat_message("user"):
         st.markdown(query)
 
-    with st.spinner("Thinking..."):
+    with metrics.trace("query"):
         start = time.time()
-        response = respond_to_query(query)
-        duration = time.time() - start
-
-    if response:
-        st.session_state.history.append((query, response))
-        with st.chat_message("assistant"):
-            st.markdown(response)
-            st.caption(f"Response time: {duration:.2f} seconds")
-    else:
-        st.warning("Please enter a valid question.")
+        with st.spinner("Thinking..."):
+            stream = respond_to_query(query)
+
+        if stream:
+            timings = {}
+            with st.chat_message("assistant"):
+                response = st.write_stream(timed(stream, timings))
+                duration = time.time() - start
+                first_token = timings.get("first_token", time.time()) - start
+                st.caption(f"First token: {first_token:.2f} seconds · Response time: {duration:.2f} seconds")
+            st.session_state.history.append((query, response))
+        else:
+            st.warning("Please enter a valid question.")
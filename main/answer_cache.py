@@ -0,0 +1,196 @@
+"""Semantic Answer Cache Module
+
+Reuses generated answers for paraphrased repeats of a question. A cached
+answer is returned when the new query's embedding is within a cosine
+threshold of a cached query's embedding *and* retrieval returned the same
+chunk IDs, so the LLM would have seen the same context.
+
+Entries expire after a TTL and are evicted least-recently-used beyond a size
+limit. The cache is tied to one index revision and empties itself when the
+index changes. It can optionally be persisted to a JSON file; new answers
+are written out by a background timer at most every
+ANSWER_CACHE_FLUSH_INTERVAL seconds and at exit, not on every store.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+from main.config import Config
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed on query embedding and retrieved chunk set.
+
+    Args:
+        threshold (float): Minimum cosine similarity between query embeddings.
+        maxsize (int): Maximum number of answers kept.
+        ttl (float): Seconds an answer stays valid; 0 for no expiry.
+        path (str | None): JSON file to persist entries to; None for memory only.
+        flush_interval (float): Seconds between a store and the write of ``path``
+            that persists it; 0 writes only on ``flush()``.
+    """
+
+    def __init__(
+        self, threshold: float, maxsize: int, ttl: float = 0, path: str | None = None, flush_interval: float = 0
+    ):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.flush_interval = flush_interval
+        self.revision = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (embedding, chunk_ids, answer, created)
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        if path and os.path.exists(path):
+            self._load()
+
+    def sync(self, revision: str):
+        """Empties the cache if ``revision`` (of the index) differs from the one it was filled from."""
+        with self._lock:
+            if revision != self.revision:
+                self._entries.clear()
+                self.revision = revision
+
+    def lookup(self, query_embedding: np.ndarray, chunk_ids) -> str | None:
+        """
+        Returns the cached answer of the most similar query that retrieved the same chunks.
+
+        Args:
+            query_embedding (np.ndarray): Normalized query embedding.
+            chunk_ids: IDs of the retrieved chunks, in any order.
+        """
+        query_embedding = np.asarray(query_embedding, dtype="float32").ravel()
+        chunk_ids = frozenset(chunk_ids)
+        with self._lock:
+            self._expire()
+            best_key, best_similarity = None, self.threshold
+            for key, (embedding, cached_ids, _, _) in self._entries.items():
+                if cached_ids != chunk_ids:
+                    continue
+                similarity = float(embedding @ query_embedding)
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][2]
+
+    def store(self, query_embedding: np.ndarray, chunk_ids, answer: str):
+        if self.maxsize <= 0:
+            return
+        query_embedding = np.asarray(query_embedding, dtype="float32").ravel()
+        with self._lock:
+            self._entries[self._next_key] = (query_embedding, frozenset(chunk_ids), answer, time.time())
+            self._next_key += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            if self.path and self.flush_interval > 0 and self._timer is None:
+                # Answers stored until the timer fires are written together
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Writes the entries to ``path`` if answers were stored since the last write."""
+        with self._lock:
+            self._timer = None
+            dirty, self._dirty = self._dirty, False
+        if dirty and self.path:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def _expire(self):
+        if not self.ttl:
+            return
+        cutoff = time.time() - self.ttl
+        # Entries are in last-use order, not creation order, so check them all
+        for key in [key for key, entry in self._entries.items() if entry[3] < cutoff]:
+            del self._entries[key]
+
+    def save(self):
+        """Atomically writes the entries and index revision to ``path``."""
+        with self._lock:
+            data = {
+                "revision": self.revision,
+                "entries": [
+                    {
+                        "embedding": embedding.tolist(),
+                        "chunk_ids": sorted(chunk_ids),
+                        "answer": answer,
+                        "created": created,
+                    }
+                    for embedding, chunk_ids, answer, created in self._entries.values()
+                ],
+            }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.revision = data.get("revision")
+        for entry in data.get("entries", [])[-self.maxsize:] if self.maxsize > 0 else []:
+            embedding = np.asarray(entry["embedding"], dtype="float32")
+            self._entries[self._next_key] = (embedding, frozenset(entry["chunk_ids"]), entry["answer"], entry["created"])
+            self._next_key += 1
+
+
+_cache = None
+
+
+def get_answer_cache() -> SemanticAnswerCache | None:
+    """Returns the shared answer cache, or None when ANSWER_CACHE_SIZE is 0."""
+    global _cache
+    if Config.ANSWER_CACHE_SIZE <= 0:
+        return None
+    if _cache is None:
+        _cache = SemanticAnswerCache(
+            Config.ANSWER_CACHE_THRESHOLD,
+            Config.ANSWER_CACHE_SIZE,
+            Config.ANSWER_CACHE_TTL,
+            Config.ANSWER_CACHE_PATH or None,
+            Config.ANSWER_CACHE_FLUSH_INTERVAL,
+        )
+        if _cache.path:
+            atexit.register(flush_answer_cache)
+    return _cache
+
+
+def flush_answer_cache():
+    """Persists the answer cache, if it was used."""
+    if _cache is not None:
+        _cache.flush()
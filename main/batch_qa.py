@@ -0,0 +1,199 @@
+"""Batch Question Answering Module
+
+Answers questions read from a JSONL file, for evaluation sets and support
+backlogs, and writes one JSON line per answer:
+
+    {"id": "q1", "question": "What is the maximum flow of the 4300 VIL?", "collections": ["pumps"]}
+
+``id`` defaults to the line number and ``collections`` to all collections.
+Every line is treated as a question (no intent detection).
+
+Questions are processed in batches of BATCH_QA_SIZE: the queries of a batch
+are encoded in one call and searched with one matrix search per store, then
+answers are generated with at most BATCH_QA_CONCURRENCY requests in flight.
+Each answer is appended to the output file as soon as it is ready, so an
+interrupted run can be resumed: questions whose ID already has an answer
+without error are skipped.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from main import metrics, rag_pipeline
+from main.config import Config
+from main.llm.base import LLM_ERROR_RESPONSE
+from main.vector_store import faiss_indexer
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str) -> list[dict]:
+    """
+    Reads question records from a JSONL file.
+
+    Raises:
+        ValueError: If a line is not a JSON object with a non-empty "question".
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON: {e}") from e
+            if not isinstance(record, dict) or not str(record.get("question", "")).strip():
+                raise ValueError(f"{path}:{line_no}: expected an object with a \"question\"")
+            record["id"] = str(record.get("id", line_no))
+            questions.append(record)
+    return questions
+
+
+def completed_ids(path: str) -> set[str]:
+    """IDs that already have an answer without error in an output file (a partial last line is ignored)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("error"):
+                done.discard(record.get("id"))
+            else:
+                done.add(record.get("id"))
+    return done
+
+
+def answer_batch(
+    index,
+    questions: list[dict],
+    llm,
+    output_path: str,
+    model=None,
+    batch_size: int | None = None,
+    concurrency: int | None = None,
+) -> dict:
+    """
+    Answers questions and appends the results to ``output_path``, skipping questions already answered there.
+
+    Args:
+        index: FaissStore or ShardedStore to retrieve from.
+        questions (list[dict]): Records from ``read_questions``.
+        llm: LLM client (see ``main.llm.base.LLMBase``).
+        output_path (str): JSONL file to append answers to.
+        model: SentenceTransformer for query embeddings; defaults to the shared embedding model.
+        batch_size (int | None): Questions retrieved together; defaults to Config.BATCH_QA_SIZE.
+        concurrency (int | None): Generations in flight; defaults to Config.BATCH_QA_CONCURRENCY.
+
+    Returns:
+        dict: Counts of answered, skipped and failed questions, and the elapsed seconds.
+    """
+    batch_size = batch_size or Config.BATCH_QA_SIZE
+    concurrency = concurrency or Config.BATCH_QA_CONCURRENCY
+    if model is None:
+        from main.embedder import embedder
+        model = embedder.get_model()
+
+    done = completed_ids(output_path)
+    pending = [record for record in questions if record["id"] not in done]
+    summary = {"answered": 0, "skipped": len(questions) - len(pending), "failed": 0}
+    if summary["skipped"]:
+        logger.info("Resuming: %d of %d questions already answered", summary["skipped"], len(questions))
+
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if out.tell() and not _ends_with_newline(output_path):
+            out.write("\n")  # After a line cut short by an interrupted run
+        for batch_start in range(0, len(pending), batch_size):
+            batch = pending[batch_start:batch_start + batch_size]
+            retrieved, retrieve_seconds = retrieve_batch(index, batch, model)
+            futures = [
+                executor.submit(contextvars.copy_context().run, _answer, index, record, chunks, llm, model)
+                for record, chunks in zip(batch, retrieved)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                result["timings"]["retrieve_ms"] = round(retrieve_seconds / len(batch) * 1000, 2)
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                summary["failed" if result.get("error") else "answered"] += 1
+            logger.info(
+                "Answered %d of %d questions", summary["answered"] + summary["failed"], len(pending)
+            )
+
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def retrieve_batch(index, batch: list[dict], model) -> tuple[list[list[tuple]], float]:
+    """
+    Top chunks of each question record ("question" and optional "collections"),
+    one batched search per distinct set of collections.
+
+    Returns:
+        tuple[list[list[tuple]], float]: (chunk_id, text, score) triples of each question, in input order,
+        and the seconds taken.
+    """
+    start = time.perf_counter()
+    results = [None] * len(batch)
+    groups = {}
+    for position, record in enumerate(batch):
+        collections = record.get("collections")
+        groups.setdefault(tuple(sorted(collections)) if collections else None, []).append(position)
+    with metrics.trace("batch_retrieve", questions=len(batch)):
+        for collections, positions in groups.items():
+            found = faiss_indexer.query_faiss_index_batch(
+                index,
+                [batch[position]["question"] for position in positions],
+                model,
+                k=rag_pipeline.TOP_K,
+                collections=list(collections) if collections else None,
+            )
+            for position, chunks in zip(positions, found):
+                results[position] = chunks
+    return results, time.perf_counter() - start
+
+
+def _answer(index, record: dict, chunks: list[tuple], llm, model) -> dict:
+    """Generates the answer to one question from its retrieved chunks."""
+    question = record["question"]
+    with metrics.trace("batch_question", id=record["id"]):
+        start = time.perf_counter()
+        prepared = rag_pipeline.prepare_from_chunks(index, question, chunks, [], model)
+        answer = prepared.response if prepared.prompt is None else rag_pipeline.generate(prepared, llm)
+        seconds = time.perf_counter() - start
+
+    result = {
+        "id": record["id"],
+        "question": question,
+        "answer": answer,
+        "generated": prepared.prompt is not None,
+        "max_score": round(max((score for _, _, score in chunks), default=0.0), 4),
+        "chunks": [chunk_info(index, chunk_id, score) for chunk_id, _, score in chunks],
+        "timings": {"answer_ms": round(seconds * 1000, 2)},
+    }
+    if answer == LLM_ERROR_RESPONSE:
+        result["error"] = True
+    return result
+
+
+def chunk_info(index, chunk_id: int, score: float) -> dict:
+    """ID and score of a retrieved chunk, with its file and page if the index records them."""
+    info = {"id": chunk_id, "score": round(score, 4)}
+    source = index.source(chunk_id) if hasattr(index, "source") else None
+    if source is not None:
+        info.update(file=source.file, page=source.page)
+    return info
@@ -1,5 +1,113 @@
-"""Text Chunking Module using LangChain."""
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+"""Text Chunking Module
+
+Splits text into overlapping chunks and reports them as (start, end) character
+offsets instead of copied substrings. Breaks are placed like LangChain's
+``RecursiveCharacterTextSplitter``: at a paragraph break if there is one in
+the second half of the chunk window, otherwise at a line break, then a space,
+and only as a last resort mid-word. Each chunk starts at a word boundary
+about ``chunk_overlap`` characters before the previous one ended.
+
+The search for breaks uses ``str.rfind`` over each window, so the cost is
+linear in the text length and no intermediate strings are built.
+"""
+import re
+import numpy as np
+
+# Recorded in the ingest manifest: changing how text is split invalidates stored chunks
+CHUNKER_VERSION = 2
+
+SEPARATORS = ("\n\n", "\n", " ")
+_WHITESPACE = " \t\r\n"
+_SPACE = re.compile(r"\s")
+_NON_WHITESPACE = re.compile(r"\S")
+
+
+def chunk_spans(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> np.ndarray:
+    """
+    Finds chunk boundaries in text.
+
+    Args:
+        text (str): The full text to split.
+        chunk_size (int): Max size of each chunk.
+        chunk_overlap (int): Approximate number of overlapping characters between chunks.
+
+    Returns:
+        np.ndarray: int64 array of shape (n, 2) with the [start, end) offset of each chunk,
+        trimmed of surrounding whitespace.
+    """
+    spans = []
+    length = len(text)
+    rfind = text.rfind
+    match = _NON_WHITESPACE.search(text)
+    start = match.start() if match else length
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            end = length
+        else:
+            # Coarsest separator in the second half of the window, else anywhere in it;
+            # a separator right at the window end still counts (the chunk ends before it)
+            middle = start + chunk_size // 2
+            for lower in (middle, start + 1):
+                for sep in SEPARATORS:
+                    pos = rfind(sep, lower, end + len(sep))
+                    if pos > start:
+                        end = min(pos, end)
+                        break
+                else:
+                    continue
+                break
+
+        trimmed_end = end
+        while text[trimmed_end - 1] in _WHITESPACE and trimmed_end > start:
+            trimmed_end -= 1
+        if trimmed_end > start:
+            spans.append((start, trimmed_end))
+        if end >= length:
+            break
+
+        # The next chunk starts at the first word boundary inside the overlap
+        next_start = end
+        if chunk_overlap:
+            boundary = _SPACE.search(text, max(end - chunk_overlap, start + 1), end)
+            if boundary:
+                next_start = boundary.start()
+        match = _NON_WHITESPACE.search(text, next_start)
+        start = match.start() if match else length
+
+    return np.array(spans, dtype="int64").reshape(-1, 2)
+
+
+def chunk_pages(
+    text: str,
+    pages: list[tuple[int, int]],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+) -> np.ndarray:
+    """
+    Chunks page-tagged text.
+
+    Args:
+        text (str): Text of a whole document.
+        pages (list[tuple[int, int]]): (page number, offset in ``text`` where the page starts),
+            in order; see ``pdf_extractor.ExtractionResult``.
+        chunk_size (int): Max size of each chunk.
+        chunk_overlap (int): Approximate number of overlapping characters between chunks.
+
+    Returns:
+        np.ndarray: int64 array of shape (n, 3): page number (of the chunk's start; -1 if
+        unknown), start and end offset of each chunk.
+    """
+    spans = chunk_spans(text, chunk_size, chunk_overlap)
+    result = np.full((len(spans), 3), -1, dtype="int64")
+    result[:, 1:] = spans
+    if pages and len(spans):
+        numbers = np.array([number for number, _ in pages], dtype="int64")
+        offsets = np.array([offset for _, offset in pages], dtype="int64")
+        rows = np.searchsorted(offsets, spans[:, 0], side="right") - 1
+        result[:, 0] = np.where(rows >= 0, numbers[np.maximum(rows, 0)], -1)
+    return result
+
 
 def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> list[str]:
     """
@@ -13,11 +121,4 @@ def chunk_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> lis
     Returns:
         List of text chunks.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", " ", ""],  # Logical fallback order
-    )
-    return splitter.split_text(text)
-
-    
\ No newline at end of file
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, chunk_overlap).tolist()]
@@ -6,9 +6,81 @@ load_dotenv()
 class Config:
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx"
+    EMBEDDING_ONNX_FILE: str = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model.onnx")
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS", "0"))  # Ingest-time worker processes; 0 encodes in-process
+    EMBEDDING_WORKER_THREADS: int = int(os.getenv("EMBEDDING_WORKER_THREADS", "0"))  # 0: cores / workers
     SAMPLE_DIR: str = os.getenv("SAMPLE_DIR", "sample_pdfs")
     DEBUG_OUTPUT_DIR: str = os.getenv("DEBUG_OUTPUT_DIR", "debug_chunks")
 
-    OLLAMA_BASE_URL = "http://localhost:11434"
+    EXTRACT_WORKERS: int = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+    EXTRACT_PAGES_PER_TASK: int = int(os.getenv("EXTRACT_PAGES_PER_TASK", "16"))
+
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE", "500"))
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+    INGEST_QUEUE_SIZE: int = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+    FAISS_INDEX_SPEC: str = os.getenv("FAISS_INDEX_SPEC", "Flat")
+    FAISS_SEARCH_PARAMS: str = os.getenv("FAISS_SEARCH_PARAMS", "")
+    FAISS_TRAIN_SIZE: int = int(os.getenv("FAISS_TRAIN_SIZE", "50000"))
+
+    HYBRID_RETRIEVAL: bool = os.getenv("HYBRID_RETRIEVAL", "true").lower() == "true"
+    LEXICAL_SHORT_CIRCUIT: bool = os.getenv("LEXICAL_SHORT_CIRCUIT", "true").lower() == "true"
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    SHARD_WORKERS: int = int(os.getenv("SHARD_WORKERS", "8"))
+
+    QUERY_EMBEDDING_CACHE_SIZE: int = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    RETRIEVAL_CACHE_SIZE: int = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "1536"))
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "768"))  # Part of the prompt budget history may use
+    CHARS_PER_TOKEN: float = float(os.getenv("CHARS_PER_TOKEN", "4"))
+    CONTEXT_DEDUP_THRESHOLD: float = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+
+    ANSWER_CACHE_SIZE: int = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+    ANSWER_CACHE_THRESHOLD: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+    ANSWER_CACHE_PATH: str = os.getenv("ANSWER_CACHE_PATH", "")
+    ANSWER_CACHE_FLUSH_INTERVAL: float = float(os.getenv("ANSWER_CACHE_FLUSH_INTERVAL", "30"))  # Seconds; 0 saves only at exit
+    ANSWER_CACHE_WITH_HISTORY: bool = os.getenv("ANSWER_CACHE_WITH_HISTORY", "false").lower() == "true"
+
+    INTENT_BACKEND: str = os.getenv("INTENT_BACKEND", "embedding")
+    INTENT_CONFIDENCE_THRESHOLD: float = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+    INTENT_CACHE_SIZE: int = int(os.getenv("INTENT_CACHE_SIZE", "1024"))
+
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "0"))
+    METRICS_LOG_JSON: bool = os.getenv("METRICS_LOG_JSON", "false").lower() == "true"
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "")
+
+    SPECULATIVE_RETRIEVAL: bool = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+    SPECULATIVE_WARM_UP: bool = os.getenv("SPECULATIVE_WARM_UP", "false").lower() == "true"
+    SPECULATIVE_WORKERS: int = int(os.getenv("SPECULATIVE_WORKERS", "4"))
+    WARM_UP: bool = os.getenv("WARM_UP", "true").lower() == "true"  # Background warm-up at launch
+
+    BATCH_QA_SIZE: int = int(os.getenv("BATCH_QA_SIZE", "64"))  # Questions retrieved together in batch mode
+    BATCH_QA_CONCURRENCY: int = int(os.getenv("BATCH_QA_CONCURRENCY", "2"))  # Generations in flight in batch mode
+
+    SERVE_HOST: str = os.getenv("SERVE_HOST", "127.0.0.1")
+    SERVE_PORT: int = int(os.getenv("SERVE_PORT", "8000"))
+    SERVE_MAX_BATCH_SIZE: int = int(os.getenv("SERVE_MAX_BATCH_SIZE", "32"))  # Queries retrieved together
+    SERVE_MAX_WAIT_MS: float = float(os.getenv("SERVE_MAX_WAIT_MS", "5"))  # How long a query waits for others to join
+    SERVE_WORKERS: int = int(os.getenv("SERVE_WORKERS", "32"))  # Threads for intent detection and generation
+
+    LLM_MODE: str = os.getenv("LLM_MODE", "chat")  # "chat" (/api/chat messages) or "generate" (one prompt string)
+
+    OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api")
-    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
\ No newline at end of file
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "5m")
+    OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+    OLLAMA_READ_TIMEOUT: float = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+    OLLAMA_DEADLINE: float = float(os.getenv("OLLAMA_DEADLINE", "300"))
+    OLLAMA_MAX_RETRIES: int = int(os.getenv("OLLAMA_MAX_RETRIES", "2"))
+    OLLAMA_RETRY_BACKOFF: float = float(os.getenv("OLLAMA_RETRY_BACKOFF", "0.5"))
+    OLLAMA_MAX_CONCURRENCY: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+    OLLAMA_POOL_SIZE: int = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""Context Builder Module
+
+Packs retrieved chunks and chat history into a prompt token budget.
+
+Chunks are produced with an overlap, so neighbouring hits from the same
+document repeat text: consecutive chunk IDs whose texts overlap are merged
+into one passage. Passages that are near-duplicates of a better-scoring one
+are dropped.
+
+The history is packed first, into its own budget (HISTORY_TOKEN_BUDGET), and
+passages are then added best-first until the rest of the budget runs out.
+The history part does not depend on the passages, so consecutive turns of a
+conversation keep a byte-identical prompt prefix: the history is left as it
+is while it fits, and once it does not, the oldest turns are shortened and
+then dropped in blocks of HISTORY_DROP_BLOCK turns rather than one per turn.
+
+Token counts are estimated from character counts (CHARS_PER_TOKEN), since
+the LLM's tokenizer is not available locally.
+"""
+import math
+import re
+from typing import NamedTuple
+
+from main.config import Config
+
+MIN_OVERLAP = 10  # Shortest suffix/prefix match treated as chunk overlap, in characters
+MIN_PASSAGE_TOKENS = 32  # A passage is only truncated to fit if at least this much of it remains
+COMPRESSED_ANSWER_CHARS = 200
+HISTORY_DROP_BLOCK = 4  # Old turns are shortened and dropped this many at a time
+
+
+class Passage(NamedTuple):
+    chunk_ids: list[int]
+    text: str
+    score: float
+
+
+class PackedContext(NamedTuple):
+    context: str
+    history: list[tuple[str, str]]
+    passages: list[Passage]
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / Config.CHARS_PER_TOKEN)
+
+
+def merge_chunks(chunks: list[tuple[int, str, float]], max_overlap: int | None = None) -> list[Passage]:
+    """
+    Merges chunks with consecutive IDs whose texts overlap into passages.
+
+    Args:
+        chunks (list[tuple[int, str, float]]): (chunk_id, text, score) triples.
+        max_overlap (int | None): Longest overlap to look for, in characters; defaults to twice CHUNK_OVERLAP.
+
+    Returns:
+        list[Passage]: Passages in document order, each scored by its best chunk.
+    """
+    max_overlap = max_overlap or 2 * Config.CHUNK_OVERLAP
+    passages = []
+    for chunk_id, text, score in sorted(chunks, key=lambda chunk: chunk[0]):
+        if passages:
+            last = passages[-1]
+            if chunk_id == last.chunk_ids[-1]:
+                continue
+            if chunk_id == last.chunk_ids[-1] + 1:
+                overlap = _overlap(last.text, text, max_overlap)
+                if overlap:
+                    passages[-1] = Passage(last.chunk_ids + [chunk_id], last.text + text[overlap:], max(last.score, score))
+                    continue
+        passages.append(Passage([chunk_id], text, score))
+    return passages
+
+
+def _overlap(left: str, right: str, max_chars: int) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``, or 0."""
+    for size in range(min(len(left), len(right), max_chars), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def drop_near_duplicates(passages: list[Passage], threshold: float | None = None) -> list[Passage]:
+    """
+    Keeps passages best-first, skipping any whose word trigrams mostly repeat a kept one.
+
+    Args:
+        passages (list[Passage]): Candidate passages.
+        threshold (float | None): Jaccard similarity of word trigrams at or above which
+            passages count as duplicates; defaults to CONTEXT_DEDUP_THRESHOLD.
+    """
+    threshold = Config.CONTEXT_DEDUP_THRESHOLD if threshold is None else threshold
+    kept, kept_shingles = [], []
+    for passage in sorted(passages, key=lambda passage: passage.score, reverse=True):
+        shingles = _shingles(passage.text)
+        duplicate = any(
+            shingles <= other or len(shingles & other) / len(shingles | other) >= threshold
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def _shingles(text: str, size: int = 3) -> frozenset:
+    words = re.findall(r"\w+", text.casefold())
+    if len(words) < size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i:i + size]) for i in range(len(words) - size + 1))
+
+
+def pack_context(
+    chunks: list[tuple[int, str, float]],
+    history: list[tuple[str, str]],
+    budget: int,
+    history_budget: int | None = None,
+) -> PackedContext:
+    """
+    Selects history turns and passages that fit a token budget.
+
+    Args:
+        chunks (list[tuple[int, str, float]]): Retrieved (chunk_id, text, score) triples.
+        history (list[tuple[str, str]]): (question, answer) pairs, oldest first.
+        budget (int): Tokens available for context and history (the prompt minus its fixed parts).
+        history_budget (int | None): Most of ``budget`` the history may use; defaults to HISTORY_TOKEN_BUDGET.
+
+    Returns:
+        PackedContext: Context text, the history to include, the passages used and their token estimate.
+    """
+    history_budget = min(Config.HISTORY_TOKEN_BUDGET if history_budget is None else history_budget, budget)
+    kept = pack_history(history, history_budget)
+    tokens = sum(_turn_tokens(question, answer) for question, answer in kept)
+
+    passages = drop_near_duplicates(merge_chunks(chunks))
+    used = []
+    for passage in passages:
+        cost = estimate_tokens(passage.text) + 1
+        if tokens + cost > budget:
+            remaining = budget - tokens - 1
+            if remaining >= MIN_PASSAGE_TOKENS:
+                text = _truncate(passage.text, int(remaining * Config.CHARS_PER_TOKEN))
+                used.append(passage._replace(text=text))
+                tokens += estimate_tokens(text) + 1
+            break
+        used.append(passage)
+        tokens += cost
+
+    context = "\n\n".join(passage.text for passage in used)
+    return PackedContext(context, kept, used, tokens)
+
+
+def pack_history(history: list[tuple[str, str]], budget: int) -> list[tuple[str, str]]:
+    """
+    Fits the history into ``budget`` tokens, changing as few turns as possible.
+
+    A history that fits is returned as it is. Otherwise old turns are trimmed in
+    steps: each step shortens the answers of the next HISTORY_DROP_BLOCK turns and
+    drops the block shortened by the previous step. Steps are only ever added as
+    the conversation grows, so the kept turns change once per block, not once per
+    turn. The newest turn is kept whole unless the blocks are not enough.
+    """
+    turns = list(history)
+    tokens = sum(_turn_tokens(*turn) for turn in turns)
+    last = len(turns) - 1
+    start = compressed = 0
+    while tokens > budget and compressed + HISTORY_DROP_BLOCK <= last:
+        tokens -= sum(_turn_tokens(*turn) for turn in turns[start:compressed])
+        start = compressed
+        for position in range(compressed, compressed + HISTORY_DROP_BLOCK):
+            tokens -= _compress(turns, position)
+        compressed += HISTORY_DROP_BLOCK
+
+    # Too little room for whole blocks: shorten, then drop, single turns, the newest last
+    while tokens > budget and compressed < last:
+        tokens -= _compress(turns, compressed)
+        compressed += 1
+    while tokens > budget and start < last:
+        tokens -= _turn_tokens(*turns[start])
+        start += 1
+    if tokens > budget and turns:
+        tokens -= _compress(turns, last)
+    if tokens > budget:
+        start = len(turns)
+    return turns[start:]
+
+
+def _compress(turns: list[tuple[str, str]], position: int) -> int:
+    """Shortens the answer of ``turns[position]`` in place; returns the tokens saved."""
+    question, answer = turns[position]
+    short = _truncate(answer, COMPRESSED_ANSWER_CHARS)
+    turns[position] = (question, short)
+    return _turn_tokens(question, answer) - _turn_tokens(question, short)
+
+
+def _turn_tokens(question: str, answer: str) -> int:
+    return estimate_tokens(question) + estimate_tokens(answer) + 2
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cuts text to at most ``max_chars`` at a word boundary, marking the cut."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 1]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + "…"
@@ -0,0 +1,91 @@
+"""Embedding Backend Module
+
+Loads the embedding model with the configured inference backend:
+
+- ``torch`` (default): the PyTorch model.
+- ``onnx``: an exported ONNX model run by ONNX Runtime on CPU (needs
+  ``pip install sentence-transformers[onnx]``). ``EMBEDDING_ONNX_FILE``
+  selects the file inside the model repository, e.g.
+  ``onnx/model_qint8_avx512_vnni.onnx`` for a dynamically int8-quantized
+  export. If the model has no ``onnx/model.onnx``, it is exported on load.
+
+The float ONNX export computes the same vectors as PyTorch (to within
+rounding), so it can serve indexes built with PyTorch. Quantized vectors are
+close but not equal, so every other file gets its own fingerprint: indexes,
+the embedding cache and manifests are keyed by the fingerprint, and an
+index built with one fingerprint is never searched with vectors of another.
+"""
+import os
+
+from main.config import Config
+
+DEFAULT_ONNX_FILE = "onnx/model.onnx"
+
+
+def fingerprint(model_name: str | None = None, backend_name: str | None = None, onnx_file: str | None = None) -> str:
+    """
+    Identifies the vectors a model and backend produce, e.g. "all-MiniLM-L6-v2"
+    or "all-MiniLM-L6-v2+model_qint8_avx2". Arguments default to the Config settings.
+    """
+    model_name = model_name or Config.EMBEDDING_MODEL
+    backend_name = backend_name or Config.EMBEDDING_BACKEND
+    onnx_file = onnx_file or Config.EMBEDDING_ONNX_FILE
+    if backend_name != "onnx" or onnx_file == DEFAULT_ONNX_FILE:
+        return model_name
+    return f"{model_name}+{os.path.splitext(os.path.basename(onnx_file))[0]}"
+
+
+def load_model(
+    model_name: str | None = None,
+    device: str | None = None,
+    backend_name: str | None = None,
+    onnx_file: str | None = None,
+):
+    """
+    Loads the embedding model with the configured backend.
+
+    Args:
+        model_name (str | None): Model name or path; defaults to Config.EMBEDDING_MODEL.
+        device (str | None): Torch device; ignored by the ONNX backend, which runs on CPU.
+        backend_name (str | None): "torch" or "onnx"; defaults to Config.EMBEDDING_BACKEND.
+        onnx_file (str | None): ONNX file in the model repository; defaults to Config.EMBEDDING_ONNX_FILE.
+
+    Returns:
+        SentenceTransformer: The model.
+
+    Raises:
+        ValueError: If EMBEDDING_BACKEND is not "torch" or "onnx".
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model_name = model_name or Config.EMBEDDING_MODEL
+    backend_name = backend_name or Config.EMBEDDING_BACKEND
+    if backend_name == "torch":
+        return SentenceTransformer(model_name, device=device)
+    if backend_name == "onnx":
+        return SentenceTransformer(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": onnx_file or Config.EMBEDDING_ONNX_FILE, "provider": "CPUExecutionProvider"},
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend_name!r} (expected 'torch' or 'onnx')")
+
+
+def export_quantized(model_name: str, save_dir: str, quantization: str = "avx2") -> str:
+    """
+    Exports an int8 dynamically quantized ONNX copy of a model.
+
+    Args:
+        model_name (str): Model name or path.
+        save_dir (str): Directory to save the model to; use it as EMBEDDING_MODEL.
+        quantization (str): "arm64", "avx2", "avx512" or "avx512_vnni", matching the serving CPU.
+
+    Returns:
+        str: The value to set EMBEDDING_ONNX_FILE to.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(model_name, backend="onnx")
+    model.save(save_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, save_dir)
+    return f"onnx/model_qint8_{quantization}.onnx"
@@ -1,33 +1,159 @@
-"""Embedding Generator Module"""
+"""Embedding Generator Module
+
+The model is loaded on first use (``get_model``), so importing this module is
+cheap and processes that never embed anything never load it.
+"""
+from main import metrics
 from main.config import Config
-from typing import List
-from sentence_transformers import SentenceTransformer
+from main.embedder import backend
+from main.embedder.embedding_cache import EmbeddingCache
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List
+import logging
+import threading
+import numpy as np
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
 
-# Load the model once (cached)
-_model = SentenceTransformer(Config.EMBEDDING_MODEL)
+_model = None
+_model_lock = threading.Lock()
+_cache = None
+_pool = None  # EmbeddingPool used by embed_text_chunks while worker_pool() is active
 
 
-def embed_text_chunks(chunks: List[str]) -> List[List[float]]:
+def embed_text_chunks(chunks: List[str], use_cache: bool = True, batch_size: int | None = None) -> np.ndarray:
     """
     Generates embeddings for a list of text chunks.
 
+    Chunks already in the on-disk embedding cache are not re-encoded. Inside
+    ``worker_pool()``, the rest are encoded by the worker processes.
+
     Args:
         chunks (List[str]): List of text strings.
+        use_cache (bool): Look up and store embeddings in the cache.
+        batch_size (int | None): Chunks per forward pass; defaults to Config.EMBEDDING_BATCH_SIZE.
 
     Returns:
-        List[List[float]]: Corresponding list of embeddings.
+        np.ndarray: C-contiguous float32 matrix of shape (len(chunks), dim); (0, 0)
+        for no chunks while the model is not loaded.
     """
     if not chunks:
-        return []
-    
-    return _model.encode(chunks, convert_to_numpy=True, show_progress_bar=Config.DEBUG).tolist()
+        # Not worth loading the model just to learn its dimension
+        dim = _model.get_sentence_embedding_dimension() if _model is not None else 0
+        return np.empty((0, dim), dtype="float32")
+
+    encode = _pool.encode if _pool is not None else lambda texts: encode_batched(texts, batch_size)
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return encode(chunks)
 
+    embeddings, misses = cache.lookup(chunks)
+    if misses:
+        missing = [chunks[i] for i in misses]
+        encoded = encode(missing)
+        embeddings[misses] = encoded
+        cache.store(missing, encoded)
+    return embeddings
 
-def get_model() -> SentenceTransformer:
+
+def encode_batched(texts: List[str], batch_size: int | None = None) -> np.ndarray:
     """
-    Expose the internal model (used for query embedding).
+    Encodes texts in batches of similar length, written into one preallocated matrix.
+
+    Sorting by length keeps the padding in each batch small.
+
+    Args:
+        texts (List[str]): Texts to encode.
+        batch_size (int | None): Texts per forward pass; defaults to Config.EMBEDDING_BATCH_SIZE.
 
     Returns:
-        SentenceTransformer: Preloaded embedding model.
+        np.ndarray: float32 matrix of shape (len(texts), dim), rows in input order.
     """
+    batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+    model = get_model()
+    embeddings = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype="float32")
+    order = np.argsort([len(text) for text in texts], kind="stable")
+
+    for start in range(0, len(order), batch_size):
+        rows = order[start:start + batch_size]
+        embeddings[rows] = model.encode(
+            [texts[i] for i in rows],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+    return embeddings
+
+
+@contextmanager
+def worker_pool(workers: int | None = None, threads_per_worker: int | None = None):
+    """
+    Encodes chunks in worker processes while active (for ingest; queries stay in-process).
+
+    Args:
+        workers (int | None): Worker processes; defaults to Config.EMBEDDING_WORKERS.
+            With fewer than 1, chunks are encoded in this process as usual.
+        threads_per_worker (int | None): Torch threads per worker; see ``EmbeddingPool``.
+    """
+    global _pool
+    workers = Config.EMBEDDING_WORKERS if workers is None else workers
+    if workers < 1 or _pool is not None:
+        yield
+        return
+
+    from main.embedder.embedding_pool import EmbeddingPool
+    _pool = EmbeddingPool(workers, threads_per_worker)
+    try:
+        yield
+    finally:
+        pool, _pool = _pool, None
+        pool.close()
+
+
+def get_cache() -> EmbeddingCache | None:
+    """
+    Returns the embedding cache for the configured model, or None if disabled.
+
+    Returns:
+        EmbeddingCache | None: Cache opened on first use.
+    """
+    global _cache
+    if _cache is None and Config.EMBEDDING_CACHE_MAX_MB > 0:
+        _cache = EmbeddingCache(
+            Config.EMBEDDING_CACHE_DIR,
+            backend.fingerprint(),
+            get_model().get_sentence_embedding_dimension(),
+            Config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        )
+    return _cache
+
+
+def flush_cache():
+    """Persists the embedding cache, if it was used."""
+    if _cache is not None:
+        _cache.flush()
+
+
+def get_model() -> "SentenceTransformer":
+    """
+    Expose the internal model (used for query embedding), loading it on first use.
+
+    Returns:
+        SentenceTransformer: The shared embedding model.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                with metrics.span("model_load", model=backend.fingerprint()):
+                    model = backend.load_model()
+                logger.debug("Loaded embedding model %s", backend.fingerprint())
+                _model = model
     return _model
+
+
+def is_loaded() -> bool:
+    return _model is not None
@@ -0,0 +1,175 @@
+"""Embedding Cache Module
+
+Persistent, content-addressed cache of chunk embeddings. Each embedding model
+gets its own memory-mapped file of fixed-size records (text digest + float32
+vector), bounded by a byte budget with least-recently-used eviction.
+"""
+import hashlib
+import json
+import os
+import re
+import unicodedata
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes a chunk so whitespace-only differences share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_digest(text: str) -> bytes:
+    """Returns the 16-byte cache key of a chunk."""
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed cache of embeddings for one model.
+
+    Records are stored in ``<cache_dir>/<model>/vectors.bin`` as a memmap of
+    ``(key, vector)`` rows, so a lookup only touches the rows it hits. A small
+    ``index.npz`` (keys and last-use ticks per slot) is loaded at startup; the
+    key stored in each row is checked on every hit, so an interrupted run can
+    never return a vector under the wrong key.
+
+    Args:
+        cache_dir (str): Root directory of the cache.
+        model_name (str): Embedding model the vectors come from.
+        dim (int): Embedding dimension.
+        max_bytes (int): Size budget of the vector file.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int, max_bytes: int):
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype([("key", "V16"), ("vector", "<f4", (dim,))])
+        self.capacity = max(1, max_bytes // self.dtype.itemsize)
+        self.hits = 0
+        self.misses = 0
+
+        self.path = os.path.join(cache_dir, re.sub(r"[^\w.-]", "_", model_name))
+        os.makedirs(self.path, exist_ok=True)
+        self._vectors_path = os.path.join(self.path, "vectors.bin")
+        self._index_path = os.path.join(self.path, "index.npz")
+        self._meta_path = os.path.join(self.path, "meta.json")
+        self._open()
+
+    def _open(self):
+        meta = {"model": self.model_name, "dim": self.dim, "capacity": self.capacity}
+        old_meta = None
+        if os.path.exists(self._meta_path) and os.path.exists(self._vectors_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                old_meta = json.load(f)
+
+        if old_meta == meta:
+            self._rows = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity,))
+            keys, self._ticks = self._load_index()
+            self._index_slots(keys)
+            return
+
+        new_path = self._vectors_path + ".tmp"
+        rows = np.memmap(new_path, dtype=self.dtype, mode="w+", shape=(self.capacity,))
+        ticks = np.zeros(self.capacity, dtype="int64")
+        if old_meta is not None and old_meta.get("dim") == self.dim:
+            # Capacity changed: carry over the most recently used entries
+            old_capacity = old_meta["capacity"]
+            old_rows = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(old_capacity,))
+            old_keys, old_ticks = self._load_index(old_capacity)
+            keep = np.flatnonzero(old_keys.any(axis=1))
+            keep = keep[np.argsort(old_ticks[keep])[::-1]][:self.capacity]
+            rows[:len(keep)] = old_rows[keep]
+            ticks[:len(keep)] = old_ticks[keep]
+            del old_rows
+        rows.flush()
+        del rows
+        os.replace(new_path, self._vectors_path)
+
+        self._rows = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity,))
+        self._ticks = ticks
+        self._index_slots(np.array(self._rows["key"]).view(np.uint8).reshape(-1, 16))
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        self.flush()
+
+    def _load_index(self, capacity: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Loads per-slot keys and ticks, rebuilding them from the rows if missing."""
+        capacity = capacity or self.capacity
+        if os.path.exists(self._index_path):
+            with np.load(self._index_path) as data:
+                if data["ticks"].shape == (capacity,):
+                    return data["keys"], data["ticks"]
+        rows = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(capacity,))
+        return np.array(rows["key"]).view(np.uint8).reshape(-1, 16), np.zeros(capacity, dtype="int64")
+
+    def _index_slots(self, keys: np.ndarray):
+        occupied = np.flatnonzero(keys.any(axis=1))
+        self._slots = {keys[slot].tobytes(): int(slot) for slot in occupied}
+        # pop() hands out low slots first
+        self._free = np.flatnonzero(~keys.any(axis=1))[::-1].tolist()
+        self._tick = int(self._ticks.max()) if self.capacity else 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def lookup(self, texts: list[str]) -> tuple[np.ndarray, list[int]]:
+        """
+        Looks up embeddings for a list of chunks.
+
+        Returns:
+            tuple: (float32 array of shape (len(texts), dim) with cached rows
+            filled in, positions of the texts that were not cached).
+        """
+        embeddings = np.zeros((len(texts), self.dim), dtype="float32")
+        misses = []
+        self._tick += 1
+        for position, text in enumerate(texts):
+            key = text_digest(text)
+            slot = self._slots.get(key)
+            if slot is None or self._rows[slot]["key"].tobytes() != key:
+                misses.append(position)
+                continue
+            embeddings[position] = self._rows[slot]["vector"]
+            self._ticks[slot] = self._tick
+        self.hits += len(texts) - len(misses)
+        self.misses += len(misses)
+        return embeddings, misses
+
+    def store(self, texts: list[str], embeddings: np.ndarray):
+        """Adds embeddings for chunks, evicting least recently used entries when full."""
+        self._tick += 1
+        keys = [text_digest(text) for text in texts[-self.capacity:]]
+        new_keys = set()
+        for key in keys:
+            slot = self._slots.get(key)
+            if slot is None:
+                new_keys.add(key)
+            else:
+                self._ticks[slot] = self._tick  # Keeps it out of this round of eviction
+        self._evict(len(new_keys) - len(self._free))
+
+        for key, vector in zip(keys, embeddings[-self.capacity:]):
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = self._free.pop()
+            self._rows[slot] = (key, vector)
+            self._ticks[slot] = self._tick
+
+    def _evict(self, count: int):
+        """Frees the ``count`` least recently used slots, with one partial sort for all of them."""
+        if count <= 0:
+            return
+        ticks = self._ticks.copy()
+        ticks[self._free] = np.iinfo(ticks.dtype).max  # Already free
+        for slot in np.argpartition(ticks, count - 1)[:count].tolist():
+            self._slots.pop(self._rows[slot]["key"].tobytes(), None)
+            self._free.append(slot)
+
+    def flush(self):
+        """Writes pending vectors and the key/recency index to disk."""
+        self._rows.flush()
+        keys = np.zeros((self.capacity, 16), dtype=np.uint8)
+        for key, slot in self._slots.items():
+            keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        tmp_path = self._index_path + ".tmp.npz"
+        np.savez(tmp_path, keys=keys, ticks=self._ticks)
+        os.replace(tmp_path, self._index_path)
@@ -0,0 +1,112 @@
+"""Embedding Pool Module
+
+Encodes chunks in several worker processes, each holding its own copy of the
+embedding model and running torch with a fixed number of threads. For small
+models such as MiniLM, torch's intra-op threading stops scaling after a few
+cores; several single- or few-threaded processes keep all cores busy.
+
+A batch of texts is sorted by length and cut into one contiguous slice per
+worker, so every worker gets texts of similar length (little padding) and the
+results are put back in input order.
+
+Workers are started with the "spawn" method: forking a process that already
+runs torch threads can deadlock. Worker processes start on the first encode.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from main.config import Config
+
+logger = logging.getLogger(__name__)
+
+_worker_model = None  # The model, in a worker process
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    # Set before torch is imported, so its thread pools are sized accordingly
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+    from main.embedder import backend
+    _worker_model = backend.load_model(model_name, device="cpu")
+
+
+def _encode(texts: list[str], batch_size: int) -> np.ndarray:
+    embeddings = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+    return np.asarray(embeddings, dtype="float32")
+
+
+class EmbeddingPool:
+    """
+    Process pool that encodes texts with the embedding model.
+
+    Args:
+        workers (int | None): Worker processes; defaults to Config.EMBEDDING_WORKERS.
+        threads_per_worker (int | None): Torch threads in each worker; defaults to
+            Config.EMBEDDING_WORKER_THREADS, or the cores divided among the workers if that is 0.
+        model_name (str | None): Sentence-transformers model; defaults to Config.EMBEDDING_MODEL.
+        batch_size (int | None): Texts per forward pass; defaults to Config.EMBEDDING_BATCH_SIZE.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        threads_per_worker: int | None = None,
+        model_name: str | None = None,
+        batch_size: int | None = None,
+    ):
+        self.workers = max(1, workers or Config.EMBEDDING_WORKERS)
+        self.threads_per_worker = threads_per_worker or Config.EMBEDDING_WORKER_THREADS or max(
+            1, (os.cpu_count() or 1) // self.workers
+        )
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.threads_per_worker),
+        )
+        logger.debug("Embedding pool: %d workers x %d threads", self.workers, self.threads_per_worker)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """
+        Encodes texts on the workers.
+
+        Args:
+            texts (list[str]): Texts to encode; must not be empty.
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim), rows in input order.
+        """
+        order = np.argsort([len(text) for text in texts], kind="stable")
+        # One slice per worker, but no bigger than a batch, so long inputs still spread evenly
+        size = min(math.ceil(len(texts) / self.workers), self.batch_size)
+        slices = [order[start:start + size] for start in range(0, len(order), size)]
+        results = self._executor.map(_encode, [[texts[i] for i in rows] for rows in slices], [self.batch_size] * len(slices))
+
+        embeddings = None
+        for rows, encoded in zip(slices, results):
+            if embeddings is None:
+                embeddings = np.empty((len(texts), encoded.shape[1]), dtype="float32")
+            embeddings[rows] = encoded
+        return embeddings
+
+    def warm_up(self):
+        """Starts the workers and loads the model in each of them."""
+        list(self._executor.map(_encode, [["warm-up"]] * self.workers, [1] * self.workers))
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,6 +1,34 @@
 """PDF Text Extractor Module"""
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, NamedTuple
 import fitz  # PyMuPDF
 
+
+class ExtractionResult(NamedTuple):
+    """Outcome of extracting one PDF: ``text`` on success, ``error`` otherwise."""
+    file_path: str
+    text: str
+    error: str | None = None
+    pages: list[tuple[int, int]] | None = None  # (page number, offset in text) of each non-empty page
+
+
+def join_pages(pages: list[str], first_page: int = 1) -> tuple[str, list[tuple[int, int]]]:
+    """
+    Joins page texts with newlines, skipping empty pages, and records where each page starts.
+
+    Returns:
+        tuple: (text, list of (page number, offset in text) for each page included).
+    """
+    starts, offset = [], 0
+    for number, page_text in enumerate(pages, start=first_page):
+        if page_text:
+            starts.append((number, offset))
+            offset += len(page_text) + 1
+    return "\n".join(page_text for page_text in pages if page_text), starts
+
+
 def extract_text_from_pdf(file_path: str) -> str:
     """Extracts text from a PDF file."""
     text = []
@@ -13,3 +41,117 @@ def extract_text_from_pdf(file_path: str) -> str:
         return "\n".join(text)
     except Exception as e:
         raise RuntimeError(f"Failed to extract text from PDF: {e}") from e
+
+
+def extract_pages_from_pdf(file_path: str, start: int = 0, stop: int | None = None) -> list[str]:
+    """
+    Extracts the text of pages ``[start, stop)`` from a PDF file.
+
+    Args:
+        file_path (str): Path to the PDF.
+        start (int): First page (0-based).
+        stop (int | None): Page after the last one; defaults to the end of the document.
+
+    Returns:
+        list[str]: Text of each page in order, one entry per page.
+    """
+    try:
+        with fitz.open(file_path) as doc:
+            stop = doc.page_count if stop is None else min(stop, doc.page_count)
+            return [doc[page_no].get_text() for page_no in range(start, stop)]
+    except Exception as e:
+        raise RuntimeError(f"Failed to extract text from PDF: {e}") from e
+
+
+def extract_pdfs_parallel(
+    file_paths: list[str],
+    workers: int | None = None,
+    pages_per_task: int = 16,
+) -> Iterator[ExtractionResult]:
+    """
+    Extracts text from many PDFs across a process pool.
+
+    Every file is split into page ranges of ``pages_per_task`` pages, so large
+    files are spread over several workers too. Pages are reassembled in order
+    and joined exactly like ``extract_text_from_pdf``, with the offset of each
+    page recorded in ``pages``. A failing file yields a
+    result with ``error`` set instead of stopping the other files.
+
+    Args:
+        file_paths (list[str]): PDFs to extract.
+        workers (int | None): Number of worker processes; defaults to the CPU count.
+            With one worker, files are extracted in-process.
+        pages_per_task (int): Pages handled by a single worker task.
+
+    Yields:
+        ExtractionResult: One per file, in completion order.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = deque()
+    pending = {}  # file_path -> list of page-range results, None until done
+
+    for file_path in file_paths:
+        try:
+            with fitz.open(file_path) as doc:
+                page_count = doc.page_count
+        except Exception as e:
+            yield ExtractionResult(file_path, "", f"Failed to open PDF: {e}")
+            continue
+
+        starts = range(0, page_count, pages_per_task)
+        pending[file_path] = [None] * len(starts)
+        for part, start in enumerate(starts):
+            tasks.append((file_path, part, start, start + pages_per_task))
+        if not starts:
+            yield ExtractionResult(file_path, "", pages=[])
+            del pending[file_path]
+
+    if workers <= 1:
+        for file_path, part, start, stop in tasks:
+            if file_path not in pending:
+                continue
+            try:
+                pending[file_path][part] = extract_pages_from_pdf(file_path, start, stop)
+            except RuntimeError as e:
+                del pending[file_path]
+                yield ExtractionResult(file_path, "", str(e))
+                continue
+            result = _finish_file(pending, file_path)
+            if result is not None:
+                yield result
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of page ranges in flight so memory stays flat
+        in_flight = {}
+        while tasks or in_flight:
+            while tasks and len(in_flight) < workers * 2:
+                file_path, part, start, stop = tasks.popleft()
+                if file_path in pending:
+                    future = executor.submit(extract_pages_from_pdf, file_path, start, stop)
+                    in_flight[future] = (file_path, part)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, part = in_flight.pop(future)
+                if file_path not in pending:
+                    continue  # File already failed on another page range
+                try:
+                    pending[file_path][part] = future.result()
+                except Exception as e:
+                    del pending[file_path]
+                    yield ExtractionResult(file_path, "", str(e))
+                    continue
+                result = _finish_file(pending, file_path)
+                if result is not None:
+                    yield result
+
+
+def _finish_file(pending: dict, file_path: str) -> ExtractionResult | None:
+    """Joins a file's page ranges once all of them have been extracted."""
+    parts = pending[file_path]
+    if any(part is None for part in parts):
+        return None
+    del pending[file_path]
+    text, pages = join_pages([page_text for part in parts for page_text in part])
+    return ExtractionResult(file_path, text, pages=pages)
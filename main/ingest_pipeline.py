@@ -0,0 +1,354 @@
+"""Streaming Ingest Pipeline Module
+
+Runs extract -> chunk -> embed -> index as concurrent stages connected by
+bounded queues, so only a few files' worth of text and one batch of
+embeddings are held in memory at a time, and vectors reach the FAISS store
+while later files are still being extracted.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterator, NamedTuple
+import numpy as np
+
+from main import metrics
+from main.config import Config
+from main.embedder import backend
+from main.extractor import pdf_extractor
+from main.vector_store.faiss_indexer import FaissStore, parse_search_params
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class FileResult(NamedTuple):
+    """A file whose chunks are all in the store (or that failed/yielded nothing)."""
+    file_path: str
+    ids: range
+    error: str | None = None
+    chunks: list[str] | None = None  # Only kept when ``keep_outputs`` is set
+    embeddings: np.ndarray | None = None
+
+
+class _FileChunks(NamedTuple):
+    file_path: str
+    ids: range
+    chunks: list[str]
+    error: str | None = None
+    sources: list[tuple[str, int, int, int]] | None = None  # (file, page, start, end) per chunk
+
+
+class _EmbeddedBatch(NamedTuple):
+    ids: list[int]
+    chunks: list[str]
+    embeddings: np.ndarray | None
+    segments: list[tuple[str, int]]  # (file_path, row count) in row order
+    completed: list[_FileChunks]  # Files whose last chunk is in this batch
+    sources: list[tuple[str, int, int, int]] | None  # None if any file in the batch has no provenance
+
+
+class StageStats:
+    """Work done by one stage: items processed and time spent working (not waiting on queues)."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, seconds: float, items: int = 0):
+        """Records one unit of work; work that produced items is also observed in the metrics."""
+        self.busy_seconds += seconds
+        self.items += items
+        if items:
+            metrics.observe("rag_ingest_seconds", seconds, stage=self.name)
+            metrics.inc("rag_ingest_items", items, stage=self.name)
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def __repr__(self):
+        return (
+            f"{self.name}: {self.items} {self.unit} in {self.busy_seconds:.2f}s "
+            f"({self.throughput:.1f} {self.unit}/s)"
+        )
+
+
+class IngestPipeline:
+    """
+    Streams PDFs into a FaissStore.
+
+    Args:
+        store (FaissStore | None): Store to add to; created on the first batch if None.
+        next_id (int): First chunk ID to allocate.
+        chunk_fn (Callable | None): text -> list of chunks. Defaults to the offset-tracking
+            chunker, which also records each chunk's file, page and offsets in the store.
+        embed_fn (Callable): list of chunks -> embeddings.
+        batch_size (int): Chunks per embedding batch (batches may span files).
+        queue_size (int): Capacity of each queue between stages.
+        keep_outputs (bool): Return each file's chunks and embeddings (for debug output).
+        index_spec (str | None): FAISS index-factory string for a new store; defaults to Config.FAISS_INDEX_SPEC.
+        train_size (int | None): Embeddings buffered to train a new store that needs training
+            (IVF, PQ, SQ8); defaults to Config.FAISS_TRAIN_SIZE.
+    """
+
+    def __init__(
+        self,
+        store: FaissStore | None = None,
+        next_id: int = 0,
+        chunk_fn: Callable[[str], list[str]] | None = None,
+        embed_fn: Callable[[list[str]], np.ndarray] | None = None,
+        batch_size: int = 256,
+        queue_size: int = 4,
+        keep_outputs: bool = False,
+        index_spec: str | None = None,
+        train_size: int | None = None,
+    ):
+        self.store = store
+        self.next_id = next_id
+        self.chunk_fn = chunk_fn
+        self.embed_fn = embed_fn or _default_embed
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.keep_outputs = keep_outputs
+        self.index_spec = index_spec or Config.FAISS_INDEX_SPEC
+        self.train_size = train_size or Config.FAISS_TRAIN_SIZE
+        self.stats = {
+            "extract": StageStats("extract", "files"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "chunks"),
+            "index": StageStats("index", "chunks"),
+        }
+        self._stop = threading.Event()
+        self._error = None
+
+    def run(self, file_paths: list[str]) -> Iterator[FileResult]:
+        """
+        Ingests ``file_paths``, yielding each file once all its chunks are indexed.
+
+        Raises the first exception raised by any stage.
+        """
+        texts = queue.Queue(maxsize=self.queue_size)
+        chunked = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._guard, args=(self._extract_stage, file_paths, texts), daemon=True),
+            threading.Thread(target=self._guard, args=(self._chunk_stage, texts, chunked), daemon=True),
+            threading.Thread(target=self._guard, args=(self._embed_stage, chunked, embedded), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            yield from self._index_stage(embedded)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+        if self.stats["extract"].items:
+            for stats in self.stats.values():
+                logger.info("Ingest %s", stats)
+
+    def _guard(self, stage: Callable, source, sink: queue.Queue):
+        """Runs a stage thread, forwarding its failure to the index stage."""
+        try:
+            stage(source, sink)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._error = e
+            self._stop.set()
+        finally:
+            self._put(sink, _DONE, force=True)
+
+    def _put(self, q: queue.Queue, item, force: bool = False):
+        """Blocking put that gives up once the pipeline is stopping."""
+        while True:
+            if self._stop.is_set() and not force:
+                raise _Stopped()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    return
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE once the pipeline is stopping."""
+        while True:
+            if self._stop.is_set():
+                return _DONE
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _extract_stage(self, file_paths: list[str], sink: queue.Queue):
+        stats = self.stats["extract"]
+        results = pdf_extractor.extract_pdfs_parallel(
+            file_paths, workers=Config.EXTRACT_WORKERS, pages_per_task=Config.EXTRACT_PAGES_PER_TASK
+        )
+        try:
+            while True:
+                start = time.perf_counter()
+                result = next(results, None)
+                stats.add(time.perf_counter() - start, 0 if result is None else 1)
+                if result is None:
+                    return
+                self._put(sink, result)
+        finally:
+            results.close()
+
+    def _chunk_stage(self, source: queue.Queue, sink: queue.Queue):
+        stats = self.stats["chunk"]
+        while (result := self._get(source)) is not _DONE:
+            if result.error:
+                self._put(sink, _FileChunks(result.file_path, range(0), [], result.error))
+                continue
+            if not result.text.strip():
+                logger.warning("No text extracted from %s", result.file_path)
+                self._put(sink, _FileChunks(result.file_path, range(0), []))
+                continue
+
+            start = time.perf_counter()
+            sources = None
+            if self.chunk_fn is None:
+                chunks, sources = _chunk_pages(result)
+            else:
+                chunks = self.chunk_fn(result.text)
+            stats.add(time.perf_counter() - start, len(chunks))
+            if not chunks:
+                logger.warning("No chunks created for %s", result.file_path)
+
+            ids = range(self.next_id, self.next_id + len(chunks))
+            self.next_id += len(chunks)
+            logger.debug("Created %d chunks from %s", len(chunks), result.file_path)
+            self._put(sink, _FileChunks(result.file_path, ids, chunks, sources=sources))
+
+    def _embed_stage(self, source: queue.Queue, sink: queue.Queue):
+        stats = self.stats["embed"]
+        ids, chunks, segments, completed, sources = [], [], [], [], []
+        has_sources = True
+
+        def flush():
+            nonlocal has_sources
+            embeddings = None
+            if chunks:
+                start = time.perf_counter()
+                embeddings = np.ascontiguousarray(self.embed_fn(chunks), dtype="float32")
+                stats.add(time.perf_counter() - start, len(chunks))
+            batch_sources = sources[:] if has_sources else None
+            self._put(sink, _EmbeddedBatch(ids[:], chunks[:], embeddings, segments[:], completed[:], batch_sources))
+            for pending in (ids, chunks, segments, completed, sources):
+                pending.clear()
+            has_sources = True
+
+        while (file_chunks := self._get(source)) is not _DONE:
+            pos = 0
+            if not file_chunks.chunks:
+                completed.append(file_chunks)
+            while pos < len(file_chunks.chunks):
+                take = min(self.batch_size - len(chunks), len(file_chunks.chunks) - pos)
+                chunks.extend(file_chunks.chunks[pos:pos + take])
+                ids.extend(file_chunks.ids[pos:pos + take])
+                if file_chunks.sources is None:
+                    has_sources = False
+                else:
+                    sources.extend(file_chunks.sources[pos:pos + take])
+                segments.append((file_chunks.file_path, take))
+                pos += take
+                if pos == len(file_chunks.chunks):
+                    completed.append(file_chunks)
+                if len(chunks) >= self.batch_size:
+                    flush()
+
+        if chunks or completed:
+            flush()
+
+    def _index_stage(self, source: queue.Queue) -> Iterator[FileResult]:
+        outputs = {}  # file_path -> (chunks, embeddings), only when keep_outputs is set
+        untrained = []  # Batches held back until the new store has been trained
+
+        while (batch := self._get(source)) is not _DONE:
+            if self.store is None and batch.embeddings is not None:
+                self.store = FaissStore(
+                    batch.embeddings.shape[1],
+                    self.index_spec,
+                    parse_search_params(Config.FAISS_SEARCH_PARAMS),
+                    backend.fingerprint(),
+                )
+            if self.store is not None and not self.store.is_trained:
+                untrained.append(batch)
+                if sum(len(pending.ids) for pending in untrained) >= self.train_size:
+                    yield from self._train(untrained, outputs)
+                continue
+            yield from self._index_batch(batch, outputs)
+
+        if untrained and self._error is None:
+            yield from self._train(untrained, outputs)
+
+    def _train(self, batches: list[_EmbeddedBatch], outputs: dict) -> Iterator[FileResult]:
+        """Trains the store on the buffered batches, then indexes them."""
+        start = time.perf_counter()
+        sample = np.concatenate([batch.embeddings for batch in batches if batch.embeddings is not None])
+        self.store.train(sample[:self.train_size])
+        seconds = time.perf_counter() - start
+        self.stats["index"].add(seconds)
+        metrics.observe("rag_ingest_seconds", seconds, stage="train")
+        logger.info("Trained %s index on %d embeddings", self.store.index_spec, min(len(sample), self.train_size))
+
+        for batch in batches:
+            yield from self._index_batch(batch, outputs)
+        batches.clear()
+
+    def _index_batch(self, batch: _EmbeddedBatch, outputs: dict) -> Iterator[FileResult]:
+        stats = self.stats["index"]
+        if batch.embeddings is not None:
+            if self.keep_outputs:
+                _collect_outputs(outputs, batch)
+
+            start = time.perf_counter()
+            self.store.add(batch.embeddings, batch.chunks, batch.ids, batch.sources)
+            stats.add(time.perf_counter() - start, len(batch.ids))
+
+        for file_chunks in batch.completed:
+            chunks, embeddings = outputs.pop(file_chunks.file_path, (None, None))
+            if embeddings is not None:
+                embeddings = np.concatenate(embeddings)
+            yield FileResult(file_chunks.file_path, file_chunks.ids, file_chunks.error, chunks, embeddings)
+
+
+def _collect_outputs(outputs: dict, batch: _EmbeddedBatch):
+    """Copies a batch's rows per file before the store normalizes the embeddings in place."""
+    row = 0
+    for file_path, count in batch.segments:
+        chunks, embeddings = outputs.setdefault(file_path, ([], []))
+        chunks.extend(batch.chunks[row:row + count])
+        embeddings.append(batch.embeddings[row:row + count].copy())
+        row += count
+
+
+class _Stopped(Exception):
+    """Raised inside a stage when another stage failed."""
+
+
+def _chunk_pages(result: pdf_extractor.ExtractionResult) -> tuple[list[str], list[tuple[str, int, int, int]]]:
+    """Chunks an extracted file, returning the chunk texts and their (file, page, start, end)."""
+    from main.chunker import text_chunker
+    spans = text_chunker.chunk_pages(result.text, result.pages or [], Config.CHUNK_SIZE, Config.CHUNK_OVERLAP)
+    file = os.path.basename(result.file_path)
+    chunks = [result.text[start:end] for _, start, end in spans.tolist()]
+    return chunks, [(file, page, start, end) for page, start, end in spans.tolist()]
+
+
+def _default_embed(chunks: list[str]) -> np.ndarray:
+    from main.embedder import embedder
+    return embedder.embed_text_chunks(chunks)
@@ -0,0 +1,209 @@
+"""Embedding-based Intent Classifier
+
+Classifies user messages locally with the sentence embedding model used for
+retrieval, instead of a full LLM generation per message. Each intent is the
+normalized mean (centroid) of its example utterances; a message gets the
+intent of the most similar centroid. Messages the classifier is unsure about
+are passed to the LLM-based ``IntentDetector``.
+
+Benchmark against the LLM detector:
+    python -m main.intent_classifier --benchmark
+"""
+import argparse
+import threading
+import time
+import numpy as np
+
+from main.config import Config
+from main.intent_detector import IntentDetector
+from main.vector_store import faiss_indexer
+from main.vector_store.query_cache import LRUCache, normalize_query
+
+EXAMPLES = {
+    "greeting": [
+        "hi", "hello", "hey there", "good morning", "good afternoon", "hello, anyone there?",
+        "hi assistant", "greetings",
+    ],
+    "thanks": [
+        "thanks", "thank you", "thanks a lot, that helped", "much appreciated", "great, thank you!",
+        "cheers for the help",
+    ],
+    "goodbye": [
+        "bye", "goodbye", "see you later", "that's all for now, bye", "talk to you later", "have a good day",
+    ],
+    "help": [
+        "help", "what can you do?", "who are you?", "how do I use this assistant?",
+        "what kind of questions can I ask?", "what are you able to help with?",
+    ],
+    "chitchat": [
+        "how are you?", "what's the weather like?", "tell me a joke", "do you like music?",
+        "are you a robot?", "what's your favourite colour?",
+    ],
+    "question": [
+        "What is the max flow of the IPS4000?", "What is the maximum working pressure of the pump?",
+        "Which motor sizes are available for the 4300 VIL?", "How do I install the circulator?",
+        "What are the dimensions of the IPS4000 controller?", "Does the pump support BACnet?",
+        "What is the recommended maintenance interval?", "How do I wire the sensor?",
+    ],
+    "unclear": [
+        "hmm", "ok", "asdf", "what", "?", "the thing", "yes", "no",
+    ],
+}
+
+EVAL_SET = [
+    ("hello!", "greeting"), ("hey, good evening", "greeting"), ("hi, is anyone here", "greeting"),
+    ("thanks so much", "thanks"), ("ty, that's what I needed", "thanks"), ("appreciate it", "thanks"),
+    ("ok bye", "goodbye"), ("see ya", "goodbye"), ("goodbye and thanks for nothing", "goodbye"),
+    ("what do you do?", "help"), ("how can you help me?", "help"), ("what are you", "help"),
+    ("how's it going?", "chitchat"), ("do you have feelings?", "chitchat"), ("tell me something funny", "chitchat"),
+    ("What is the max pressure of the IPS4000?", "question"), ("What voltage does the 4300 VIL motor need?", "question"),
+    ("How often should the seals be replaced?", "question"), ("Can the IPS4000 control two pumps?", "question"),
+    ("What flange sizes does the pump come with?", "question"), ("um", "unclear"), ("sure", "unclear"),
+]
+
+
+class EmbeddingIntentDetector:
+    """
+    Nearest-centroid intent classifier with an optional LLM fallback.
+
+    The model and the intent centroids are loaded on first use (or by ``warm_up``).
+
+    Args:
+        model: SentenceTransformer; defaults to the shared embedding model.
+        fallback: Detector with a ``detect(text)`` method, used when confidence is below
+            ``threshold``; None to always trust the local classifier.
+        threshold (float): Minimum confidence (softmax probability of the best intent).
+        examples (dict | None): Intent -> example utterances; defaults to EXAMPLES.
+        temperature (float): Softmax temperature applied to cosine similarities.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        fallback=None,
+        threshold: float = Config.INTENT_CONFIDENCE_THRESHOLD,
+        examples: dict[str, list[str]] | None = None,
+        temperature: float = 0.05,
+    ):
+        self._model = model
+        self.fallback = fallback
+        self.threshold = threshold
+        self.temperature = temperature
+        self.cache = LRUCache(Config.INTENT_CACHE_SIZE)
+        self.fallbacks = 0
+
+        self.examples = examples or EXAMPLES
+        self.intents = list(self.examples)
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            from main.embedder import embedder
+            self._model = embedder.get_model()
+        return self._model
+
+    @property
+    def centroids(self) -> np.ndarray:
+        """Normalized mean embedding of each intent's examples, in ``intents`` order."""
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = []
+                    for intent in self.intents:
+                        vectors = np.asarray(self.model.encode(self.examples[intent], convert_to_numpy=True), dtype="float32")
+                        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                        centroid = vectors.mean(axis=0)
+                        centroids.append(centroid / np.linalg.norm(centroid))
+                    self._centroids = np.stack(centroids)
+        return self._centroids
+
+    def warm_up(self):
+        """Loads the model and computes the centroids ahead of the first message."""
+        self.centroids
+
+    def classify(self, text: str) -> tuple[str, float]:
+        """
+        Returns the nearest intent and its confidence, without fallback or caching.
+
+        The query embedding comes from the retrieval query cache, so a message
+        classified as a question is not encoded again for retrieval.
+        """
+        query_embedding = faiss_indexer.embed_query(text, self.model)[0]
+        similarities = self.centroids @ query_embedding
+        weights = np.exp((similarities - similarities.max()) / self.temperature)
+        best = int(np.argmax(similarities))
+        return self.intents[best], float(weights[best] / weights.sum())
+
+    def detect(self, text: str) -> str:
+        text = text.strip()
+        if not text:
+            return "unclear"
+
+        key = normalize_query(text)
+        intent = self.cache.get(key)
+        if intent is not None:
+            return intent
+
+        intent, confidence = self.classify(text)
+        if confidence < self.threshold and self.fallback is not None:
+            self.fallbacks += 1
+            intent = self.fallback.detect(text)
+        self.cache.put(key, intent)
+        return intent
+
+
+def create_intent_detector():
+    """Returns the intent detector selected by Config.INTENT_BACKEND ("embedding" or "llm")."""
+    if Config.INTENT_BACKEND == "llm":
+        return IntentDetector()
+    return EmbeddingIntentDetector(fallback=IntentDetector())
+
+
+def benchmark(detectors: dict, eval_set: list[tuple[str, str]] = EVAL_SET) -> list[dict]:
+    """Measures accuracy and per-message latency of each detector on a labelled set."""
+    report = []
+    for name, detector in detectors.items():
+        latencies, correct = [], 0
+        for text, expected in eval_set:
+            start = time.perf_counter()
+            intent = detector.detect(text)
+            latencies.append(time.perf_counter() - start)
+            correct += intent == expected
+        report.append({
+            "detector": name,
+            "accuracy": round(correct / len(eval_set), 3),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 2),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding-based intent classifier")
+    parser.add_argument("--benchmark", action="store_true", help="Compare accuracy and latency with the LLM detector")
+    parser.add_argument("text", nargs="*", help="Messages to classify")
+    args = parser.parse_args()
+
+    local = EmbeddingIntentDetector()
+    for text in args.text:
+        intent, confidence = local.classify(text)
+        print(f"{text!r}: {intent} ({confidence:.2f})")
+
+    if args.benchmark:
+        from main.llm.ollama_client import OllamaClient
+
+        detectors = {"embedding": local}
+        if OllamaClient().is_running():
+            llm = IntentDetector()
+            detectors["embedding+llm-fallback"] = EmbeddingIntentDetector(fallback=llm)
+            detectors["llm"] = llm
+        else:
+            print("Ollama is not running; benchmarking the local classifier only.")
+        for row in benchmark(detectors):
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
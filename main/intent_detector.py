@@ -1,15 +1,12 @@
-from langchain_ollama import ChatOllama
-from langchain.prompts import PromptTemplate
 from main.config import Config
 
 
 class IntentDetector:
+    """LLM-based intent detector. LangChain and the chat model are loaded on the first ``detect``."""
+
     def __init__(self, model=None):
-        self.model = model or ChatOllama(
-            model=Config.OLLAMA_MODEL,
-            base_url=Config.OLLAMA_BASE_URL,
-            streaming=True
-        )
+        self._model = model
+        self._prompt_template = None
         self.intents = [
             "greeting",
             "thanks",
@@ -19,10 +16,27 @@ class IntentDetector:
             "question",
             "unclear"
         ]
-        self.prompt_template = PromptTemplate.from_template(
-            "Classify the following user message into one of these intents: {intents}.\n\n"
-            "User Message: {text}\nIntent:"
-        )
+
+    @property
+    def model(self):
+        if self._model is None:
+            from langchain_ollama import ChatOllama
+            self._model = ChatOllama(
+                model=Config.OLLAMA_MODEL,
+                base_url=Config.OLLAMA_BASE_URL,
+                streaming=True
+            )
+        return self._model
+
+    @property
+    def prompt_template(self):
+        if self._prompt_template is None:
+            from langchain.prompts import PromptTemplate
+            self._prompt_template = PromptTemplate.from_template(
+                "Classify the following user message into one of these intents: {intents}.\n\n"
+                "User Message: {text}\nIntent:"
+            )
+        return self._prompt_template
 
     def detect(self, text: str) -> str:
         prompt = self.prompt_template.format(
@@ -1,6 +1,81 @@
+import asyncio
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+
+# Returned instead of an answer when generation fails
+LLM_ERROR_RESPONSE = "LLM error: could not generate response"
+
+
+def render_messages(messages: list[dict]) -> str:
+    """Joins chat messages into a single prompt, in order."""
+    return "\n\n".join(message["content"] for message in messages)
+
 
 class LLMBase(ABC):
+    # Threads that run the blocking calls of the *_in_thread methods; at most this many
+    # run at once and further calls queue without holding a thread
+    offload_workers = 4
+    _offload_pool = None
+    _offload_lock = threading.Lock()
+
     @abstractmethod
     def generate_answer(self, prompt: str) -> str:
         pass
+
+    async def generate_answer_in_thread(self, prompt: str, **kwargs) -> str:
+        """
+        Awaitable wrapper that runs the blocking generate_answer on one of the client's
+        ``offload_workers`` threads. Cancelling a call that is still queued drops it;
+        one that has started runs to completion (within its deadline).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._offload_executor(), lambda: self.generate_answer(prompt, **kwargs))
+
+    def chat_answer(self, messages: list[dict]) -> str:
+        """Answers chat messages; clients without a chat API get them as one prompt."""
+        return self.generate_answer(render_messages(messages))
+
+    def stream_chat(self, messages: list[dict]) -> Iterator[str]:
+        """Streaming version of chat_answer."""
+        return self.stream_answer(render_messages(messages))
+
+    def stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yields the answer as text deltas; clients without streaming yield it in one piece."""
+        yield self.generate_answer(prompt)
+
+    async def stream_answer_in_thread(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Async iterator over stream_answer, advanced on the client's ``offload_workers``
+        threads. If the consumer stops or is cancelled, the blocking stream (and with it
+        the HTTP response) is closed once the step in progress returns.
+        """
+        iterator = self.stream_answer(prompt)
+        executor = self._offload_executor()
+        done = object()
+        step = None
+        try:
+            while True:
+                step = executor.submit(next, iterator, done)
+                delta = await asyncio.wrap_future(step)
+                if delta is done:
+                    return
+                yield delta
+        finally:
+            if step is not None:
+                # A generator cannot be closed while another thread is advancing it
+                step.add_done_callback(lambda _: _close(iterator))
+
+    def _offload_executor(self) -> ThreadPoolExecutor:
+        if self._offload_pool is None:
+            with self._offload_lock:
+                if self._offload_pool is None:
+                    self._offload_pool = ThreadPoolExecutor(self.offload_workers, thread_name_prefix="llm")
+        return self._offload_pool
+
+
+def _close(iterator: Iterator[str]):
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
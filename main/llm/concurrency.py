@@ -0,0 +1,75 @@
+"""Concurrency Limiter Module
+
+Caps the number of concurrent requests to the model server and records how
+long callers queue for a slot.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from main import metrics
+
+
+class ConcurrencyLimiter:
+    """
+    Bounded semaphore with queueing metrics.
+
+    Args:
+        limit (int): Maximum number of concurrent holders.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.waiting = 0
+        self.active = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, timeout: float | None = None):
+        """
+        Holds one slot for the duration of the block.
+
+        Raises:
+            TimeoutError: If no slot frees up within ``timeout`` seconds.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._semaphore.acquire(timeout=timeout)
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+                self.acquired += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            else:
+                self.rejected += 1
+        metrics.record_span("llm_queue", waited)
+        if not acquired:
+            raise TimeoutError(f"No free slot within {timeout:.1f}s ({self.limit} requests in flight)")
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "mean_wait_ms": self.wait_seconds / self.acquired * 1000 if self.acquired else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+            }
@@ -1,30 +1,175 @@
+import json
+import random
+import threading
+import time
+from typing import Iterator
 import requests
+from requests.adapters import HTTPAdapter
+from main import metrics
 from main.config import Config
-from main.llm.base import LLMBase
+from main.llm.base import LLM_ERROR_RESPONSE, LLMBase
+from main.llm.concurrency import ConcurrencyLimiter
+
+# Responses worth retrying: the server is overloaded or restarting
+RETRY_STATUS = {429, 502, 503, 504}
+
 
 class OllamaClient(LLMBase):
-    def __init__(self, model: str = Config.OLLAMA_MODEL, url: str = Config.OLLAMA_URL):
+    """
+    Ollama HTTP client with a persistent connection pool.
+
+    Prompts can be sent as plain text (``/api/generate``) or as chat messages
+    (``/api/chat``). Every request asks Ollama to keep the model loaded for
+    OLLAMA_KEEP_ALIVE, so its KV cache of a prompt prefix shared with the
+    previous request (system prompt and earlier turns) can be reused.
+
+    Every request has a connect and read timeout. Generations also get an overall
+    deadline, are retried with exponential backoff on connection errors and
+    overload responses, and are limited to ``max_concurrency`` at a time; callers
+    beyond that queue for a slot (see ``stats()``). The client is blocking: async
+    callers use the ``*_in_thread`` wrappers, which run on ``max_concurrency`` threads.
+
+    Args:
+        model (str): Ollama model name.
+        url (str): Ollama API base URL.
+        max_concurrency (int): Maximum concurrent generations.
+        deadline (float | None): Default overall time limit of a generation, in seconds.
+        max_retries (int): Retries after the first attempt.
+    """
+
+    def __init__(
+        self,
+        model: str = Config.OLLAMA_MODEL,
+        url: str = Config.OLLAMA_URL,
+        max_concurrency: int = Config.OLLAMA_MAX_CONCURRENCY,
+        deadline: float | None = Config.OLLAMA_DEADLINE,
+        max_retries: int = Config.OLLAMA_MAX_RETRIES,
+    ):
         self.model = model
         self.url = url.rstrip("/")
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_backoff = Config.OLLAMA_RETRY_BACKOFF
+        self.timeout = (Config.OLLAMA_CONNECT_TIMEOUT, Config.OLLAMA_READ_TIMEOUT)
+        self.limiter = ConcurrencyLimiter(max_concurrency)
+        self.offload_workers = max_concurrency  # More threads would only wait for the limiter
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(Config.OLLAMA_POOL_SIZE, max_concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def is_running(self) -> bool:
         try:
-            response = requests.get(f"{self.url}/tags")
+            response = self.session.get(f"{self.url}/tags", timeout=Config.OLLAMA_CONNECT_TIMEOUT)
             return response.status_code == 200
-        except requests.ConnectionError:
+        except requests.RequestException:
             return False
 
-    def generate_answer(self, prompt: str) -> str:
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": False
-        }
+    def warm_up(self) -> bool:
+        """Loads the model into memory without generating, so the first answer skips the load time."""
+        payload = {"model": self.model, "keep_alive": Config.OLLAMA_KEEP_ALIVE}
+        try:
+            response = self.session.post(f"{self.url}/generate", json=payload, timeout=self.timeout)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def generate_answer(self, prompt: str, deadline: float | None = None) -> str:
+        return self._complete("generate", {"prompt": prompt}, deadline)
+
+    def stream_answer(self, prompt: str, deadline: float | None = None) -> Iterator[str]:
+        return self._stream("generate", {"prompt": prompt}, deadline)
+
+    def chat_answer(self, messages: list[dict], deadline: float | None = None) -> str:
+        return self._complete("chat", {"messages": messages}, deadline)
 
+    def stream_chat(self, messages: list[dict], deadline: float | None = None) -> Iterator[str]:
+        return self._stream("chat", {"messages": messages}, deadline)
+
+    def _complete(self, endpoint: str, payload: dict, deadline: float | None) -> str:
+        payload = dict(payload, model=self.model, stream=False, keep_alive=Config.OLLAMA_KEEP_ALIVE)
+
+        expires = self._expires(deadline)
         try:
-            response = requests.post(f"{self.url}/generate", json=payload)
-            response.raise_for_status()
-            return response.json()["response"]
-        except requests.RequestException as e:
+            with self.limiter.slot(timeout=self._remaining(expires)):
+                response = self._post(endpoint, payload, expires)
+                data = response.json()
+                metrics.record_llm(data)
+                return _text(data)
+        except (requests.RequestException, TimeoutError, ValueError) as e:
             print(f"[ERROR] Failed to call Ollama: {e}")
-            return "LLM error: could not generate response"
+            return LLM_ERROR_RESPONSE
+
+    def _stream(self, endpoint: str, payload: dict, deadline: float | None) -> Iterator[str]:
+        payload = dict(payload, model=self.model, stream=True, keep_alive=Config.OLLAMA_KEEP_ALIVE)
+
+        expires = self._expires(deadline)
+        try:
+            with self.limiter.slot(timeout=self._remaining(expires)):
+                with self._post(endpoint, payload, expires, stream=True) as response:
+                    for line in response.iter_lines():
+                        if expires is not None and time.monotonic() > expires:
+                            raise requests.Timeout("Generation deadline exceeded")
+                        if not line:
+                            continue
+                        data = json.loads(line)  # A malformed line raises ValueError
+                        if "error" in data:
+                            raise requests.RequestException(data["error"])
+                        if _text(data):
+                            yield _text(data)
+                        if data.get("done"):
+                            metrics.record_llm(data)
+                            break
+        except (requests.RequestException, TimeoutError, ValueError) as e:
+            print(f"[ERROR] Failed to call Ollama: {e}")
+            yield LLM_ERROR_RESPONSE
+
+    def stats(self) -> dict:
+        """Concurrency and retry counters."""
+        return dict(self.limiter.stats(), retries=self.retries)
+
+    def _post(self, endpoint: str, payload: dict, expires: float | None, stream: bool = False) -> requests.Response:
+        """POSTs to /generate or /chat, retrying transient failures with exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            remaining = self._remaining(expires)
+            timeout = self.timeout if remaining is None else tuple(min(t, remaining) for t in self.timeout)
+            try:
+                response = self.session.post(f"{self.url}/{endpoint}", json=payload, stream=stream, timeout=timeout)
+                if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+                response.close()
+            except requests.ConnectionError:
+                # Includes connect timeouts; read timeouts are not retried, the model may just be slow
+                if attempt == self.max_retries:
+                    raise
+
+            delay = self.retry_backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+            if expires is not None and time.monotonic() + delay >= expires:
+                raise requests.Timeout("Generation deadline exceeded while retrying")
+            with self._retries_lock:
+                self.retries += 1
+            time.sleep(delay)
+
+    def _expires(self, deadline: float | None) -> float | None:
+        deadline = self.deadline if deadline is None else deadline
+        return time.monotonic() + deadline if deadline else None
+
+    @staticmethod
+    def _remaining(expires: float | None) -> float | None:
+        if expires is None:
+            return None
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout("Generation deadline exceeded")
+        return remaining
+
+
+def _text(data: dict) -> str:
+    """Generated text of a /generate or /chat response (or stream chunk)."""
+    if "message" in data:
+        return data["message"].get("content", "")
+    return data.get("response", "")
@@ -0,0 +1,344 @@
+"""Metrics Module
+
+Latency histograms and counters for the query and ingest paths, with
+request-scoped traces made of named spans.
+
+    with metrics.trace("query"):
+        with metrics.span("intent"):
+            ...
+
+Every span is observed in the ``rag_stage_seconds{stage=...}`` histogram and
+kept on the enclosing trace. Finished traces can be logged as JSON lines
+(METRICS_LOG_JSON), passed to hooks (``add_trace_hook``) and profiled
+(``set_profiler``, or PROFILE_DIR for cProfile dumps). Everything recorded
+is available as Prometheus text (``prometheus_text``, served on METRICS_PORT)
+or as a JSON snapshot.
+
+Cold-start costs are kept apart from steady-state latency: the first trace
+of each kind in a process is also observed in ``rag_first_request_seconds``
+(and marked ``first`` in its trace), and apps call ``record_startup`` once
+they are ready for requests; by default it records the time since the
+process was launched (``process_uptime``), imports included.
+"""
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from main.config import Config
+
+logger = logging.getLogger(__name__)
+
+_IMPORTED = time.perf_counter()
+
+# Seconds; covers cache hits through long generations
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "rag_request_seconds": "End-to-end time of a traced request.",
+    "rag_first_request_seconds": "End-to-end time of the first traced request of each kind in the process.",
+    "rag_startup_seconds": "Time from process start until the app was ready for requests.",
+    "rag_stage_seconds": "Time spent in each stage of the query and ingest paths.",
+    "rag_ingest_seconds": "Busy time per work item of each ingest pipeline stage.",
+    "rag_ingest_items": "Items processed by each ingest pipeline stage.",
+    "rag_llm_seconds": "Durations reported by Ollama for each generation.",
+    "rag_llm_tokens": "Prompt and generated tokens reported by Ollama.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as exported to Prometheus."""
+
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                inside = cumulative - below
+                return lower + (bound - lower) * ((rank - below) / inside if inside else 1.0)
+            lower, below = bound, cumulative
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe set of labelled histograms and counters."""
+
+    def __init__(self):
+        self._histograms = {}  # name -> {labels: Histogram}
+        self._counters = {}  # name -> {labels: float}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            series.setdefault(key, Histogram()).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """Histogram summaries (count, mean and estimated p50/p95/p99) and counter values."""
+        snapshot = {}
+        with self._lock:
+            for name, series in self._histograms.items():
+                for labels, histogram in series.items():
+                    snapshot[_series_name(name, labels)] = {
+                        "count": histogram.count,
+                        "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                        "p50": histogram.quantile(0.50),
+                        "p95": histogram.quantile(0.95),
+                        "p99": histogram.quantile(0.99),
+                    }
+            for name, series in self._counters.items():
+                for labels, value in series.items():
+                    snapshot[_series_name(name + "_total", labels)] = value
+        return snapshot
+
+    def prometheus_text(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+                for labels, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{_series_name(name + '_bucket', labels + (('le', str(bound)),))} {count}")
+                    lines.append(f"{_series_name(name + '_bucket', labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{_series_name(name + '_sum', labels)} {histogram.sum}")
+                    lines.append(f"{_series_name(name + '_count', labels)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                lines += [f"# HELP {name}_total {HELP.get(name, name)}", f"# TYPE {name}_total counter"]
+                for labels, value in series.items():
+                    lines.append(f"{_series_name(name + '_total', labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _series_name(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+REGISTRY = MetricsRegistry()
+observe = REGISTRY.observe
+inc = REGISTRY.inc
+snapshot = REGISTRY.snapshot
+prometheus_text = REGISTRY.prometheus_text
+
+
+class Trace:
+    """Spans and attributes of one request."""
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.spans = []  # (stage, seconds, attrs)
+        self.seconds = 0.0
+
+    def stage_seconds(self) -> dict[str, float]:
+        """Total time per stage."""
+        totals = {}
+        for stage, seconds, _ in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def to_dict(self) -> dict:
+        return {
+            "trace": self.name,
+            "seconds": round(self.seconds, 6),
+            "stages": {stage: round(seconds, 6) for stage, seconds in self.stage_seconds().items()},
+            "spans": [dict(attrs, stage=stage, seconds=round(seconds, 6)) for stage, seconds, attrs in self.spans],
+            **self.attrs,
+        }
+
+
+_current = contextvars.ContextVar("rag_trace", default=None)
+_hooks = []
+_profiler = None
+_first_traces = set()  # Kinds of trace seen so far
+_first_lock = threading.Lock()
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+def add_trace_hook(hook: Callable[[Trace], None]):
+    """Registers a function called with every finished trace."""
+    _hooks.append(hook)
+
+
+def set_profiler(factory: Callable[[str], object] | None):
+    """
+    Sets a per-request profiler: ``factory(trace_name)`` returns a context
+    manager that wraps each trace. None disables profiling.
+    """
+    global _profiler
+    _profiler = factory
+
+
+def cprofile_profiler(out_dir: str) -> Callable[[str], object]:
+    """Profiler factory that dumps a cProfile .prof file per request into ``out_dir``."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    @contextmanager
+    def profile(name: str):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(out_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{id(profiler):x}.prof"))
+
+    return profile
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Collects the spans of one request; nested traces are recorded as spans of the outer one."""
+    if _current.get() is not None:
+        with span(name, **attrs) as span_attrs:
+            yield span_attrs
+        return
+
+    with _first_lock:
+        first = name not in _first_traces
+        _first_traces.add(name)
+    if first:
+        attrs["first"] = True
+    current = Trace(name, attrs)
+    token = _current.set(current)
+    start = time.perf_counter()
+    try:
+        with _profiler(name) if _profiler else nullcontext():
+            yield current.attrs
+    finally:
+        current.seconds = time.perf_counter() - start
+        _current.reset(token)
+        observe("rag_request_seconds", current.seconds, kind=name)
+        if first:
+            observe("rag_first_request_seconds", current.seconds, kind=name)
+        if Config.METRICS_LOG_JSON:
+            logger.info(json.dumps(current.to_dict(), default=str))
+        for hook in _hooks:
+            hook(current)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Times a block as ``stage``; yields a dict for attributes to record with it."""
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(stage, time.perf_counter() - start, **attrs)
+
+
+def record_span(stage: str, seconds: float, **attrs):
+    """Records a stage timed elsewhere, as if it had run in a ``span``."""
+    observe("rag_stage_seconds", seconds, stage=stage)
+    current = _current.get()
+    if current is not None:
+        current.spans.append((stage, seconds, attrs))
+
+
+def record_startup(app: str, seconds: float | None = None):
+    """Records how long ``app`` took from launch (or ``seconds``) until it was ready for requests."""
+    seconds = process_uptime() if seconds is None else seconds
+    observe("rag_startup_seconds", seconds, app=app)
+    logger.info("%s ready in %.2f s", app, seconds)
+
+
+def process_uptime() -> float:
+    """Seconds since the process was launched; since this module was imported where that is unknown."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # Fields after the parenthesized command name; starttime is field 22 of the line
+            started_ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _IMPORTED
+
+
+def record_llm(data: dict):
+    """Records the token counts and durations (nanoseconds) Ollama returns with a finished generation."""
+    for field in ("load_duration", "prompt_eval_duration", "eval_duration", "total_duration"):
+        if data.get(field):
+            observe("rag_llm_seconds", data[field] / 1e9, phase=field.removesuffix("_duration"))
+    for field, kind in (("prompt_eval_count", "prompt"), ("eval_count", "generated")):
+        if data.get(field):
+            inc("rag_llm_tokens", data[field], kind=kind)
+
+    current = _current.get()
+    if current is not None:
+        current.attrs["llm"] = {
+            field: data[field]
+            for field in ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration")
+            if field in data
+        }
+
+
+def serve(port: int = Config.METRICS_PORT) -> ThreadingHTTPServer:
+    """Serves ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info("Serving metrics on http://localhost:%d/metrics", server.server_port)
+    return server
+
+
+if Config.PROFILE_DIR:
+    set_profiler(cprofile_profiler(Config.PROFILE_DIR))
@@ -0,0 +1,110 @@
+"""Micro-Batcher Module
+
+Groups calls made concurrently from asyncio tasks into batches for a
+function that is cheaper per item on a batch, such as query encoding and
+FAISS search.
+
+The first call of a batch waits at most ``max_wait`` seconds for more calls
+to join it, and a batch holds at most ``max_batch_size`` items. Batches run
+one at a time on an executor, so while one is running, new calls collect into
+the next: under low load a call waits no more than ``max_wait``, and under
+high load batches grow on their own.
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Batches concurrent ``submit`` calls for ``fn``.
+
+    Args:
+        fn (Callable[[list], list]): Takes a list of items and returns one result per item, in order.
+            Runs on ``executor``, so it may block.
+        max_batch_size (int): Most items per call of ``fn``.
+        max_wait (float): Seconds the first item of a batch waits for others.
+        executor (Executor | None): Where ``fn`` runs; None for the event loop's default executor.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list], list],
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        executor: Executor | None = None,
+    ):
+        self.fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.executor = executor
+        self.batches = 0
+        self.items = 0
+        self._queue = None
+        self._task = None
+
+    async def submit(self, item) -> Any:
+        """Adds an item to the next batch and returns its result (or raises the batch's exception)."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Callers that went away no longer need a result
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, [item for item, _ in batch])
+            except Exception as e:
+                logger.warning("Batch of %d failed: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,376 @@
+"""RAG Query Pipeline Module
+
+Query path shared by the CLI (pipeline.py) and the Streamlit app: intent
+detection, retrieval, prompt building and answer generation.
+
+In speculative mode, retrieval (query embedding + FAISS search) starts on a
+worker thread at the same time as intent detection, and the LLM can be
+warmed up in parallel. Most messages are real questions, so this takes the
+intent-detection latency off the critical path; for canned intents the
+speculative result is simply discarded.
+
+``start_warm_up`` loads the embedding model, intent centroids and index
+shards and pings the LLM on a worker thread at launch, so the first query
+does not pay for them.
+
+``stream_query`` returns the answer as text deltas, so callers can show the
+first tokens while the rest is being generated.
+
+Prompts are laid out so that consecutive turns of a conversation share a
+byte-identical prefix: the fixed instructions, then the earlier turns, and
+only then the retrieved context and the new question. In chat mode
+(LLM_MODE=chat) they are sent as /api/chat messages; either way Ollama can
+reuse its KV cache for the shared prefix instead of re-processing it.
+"""
+import contextvars
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, NamedTuple
+
+from main import metrics
+from main.answer_cache import get_answer_cache
+from main.config import Config
+from main.context_builder import estimate_tokens, pack_context
+from main.llm.base import LLM_ERROR_RESPONSE
+from main.vector_store import faiss_indexer
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 4
+RELEVANCE_THRESHOLD = 0.2
+WARM_UP_INTERVAL = 60.0
+
+CANNED_RESPONSES = {
+    "greeting": "Hello! I'm your Armstrong assistant. Ask me a technical question and I’ll look it up for you.",
+    "thanks": "You're welcome! Let me know if you have more questions.",
+    "goodbye": "Goodbye! Feel free to come back with more questions anytime.",
+    "help": "I can help answer questions about your HVAC questions and Armstrong products. Ask me something specific!",
+    "vague": "Could you please rephrase your question or ask something more specific?",
+}
+NO_MATCH_RESPONSE = "Sorry, I couldn't find relevant information in the documents."
+LOW_RELEVANCE_RESPONSE = "I looked through the documents but didn't find anything helpful for that question."
+
+_executor = ThreadPoolExecutor(max_workers=Config.SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+_last_warm_up = {}
+
+
+SYSTEM_PROMPT = (
+    "You are a professional HVAC systems consultant. "
+    "Use ONLY the context below to answer the following customer question.\n"
+    "Answer in a concise, informative paragraph. If the context does not contain the answer, "
+    "say 'The context does not provide enough information.'"
+)
+
+
+def build_prompt(context: str, query: str, history: list[tuple[str, str]]) -> str:
+    conversation = "".join(
+        f"\nQ{i}: {prev_q}\nA{i}: {prev_a}" for i, (prev_q, prev_a) in enumerate(history, start=1)
+    )
+
+    return f"{SYSTEM_PROMPT}\n\n{conversation}\n\nContext:\n{context}\n\nQuestion: {query}"
+
+
+def build_messages(context: str, query: str, history: list[tuple[str, str]]) -> list[dict]:
+    """
+    Chat messages for /api/chat: the system prompt, earlier turns as user/assistant
+    pairs, and the retrieved context with the new question as the last user message.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for prev_q, prev_a in history:
+        messages += [{"role": "user", "content": prev_q}, {"role": "assistant", "content": prev_a}]
+    messages.append({"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"})
+    return messages
+
+
+def recent_history(history: list[tuple[str, str]], max_turns: int) -> list[tuple[str, str]]:
+    """
+    Returns the latest turns, at most ``max_turns``. Older turns are dropped in blocks
+    of half that size rather than one per turn, so the prompt prefix only changes
+    every few turns.
+    """
+    if len(history) <= max_turns:
+        return history
+    step = max(max_turns // 2, 1)
+    start = ((len(history) - max_turns - 1) // step + 1) * step
+    return history[start:]
+
+
+class Prepared(NamedTuple):
+    """Outcome of ``prepare_answer``."""
+    response: str | None  # Final response when no generation is needed
+    prompt: str | list[dict] | None  # Prompt (chat messages in chat mode) to generate the response from otherwise
+    cache_key: tuple | None = None  # (query embedding, chunk IDs) to cache the generated answer under
+
+
+def retrieve(
+    index, query_text: str, model=None, k: int = TOP_K, collections: list[str] | None = None
+) -> list[tuple[int, str, float]]:
+    """Returns the top-k (chunk_id, chunk, score) triples for a query, optionally from some collections only."""
+    with metrics.span("retrieve"):
+        return faiss_indexer.query_faiss_index(
+            index, query_text, _model(model), k=k, with_ids=True, collections=collections
+        )
+
+
+def answer_query(
+    index,
+    query_text: str,
+    llm,
+    history: list[tuple[str, str]],
+    intent_detector,
+    model=None,
+    speculative: bool = Config.SPECULATIVE_RETRIEVAL,
+    warm_up: bool = Config.SPECULATIVE_WARM_UP,
+    collections: list[str] | None = None,
+) -> str | None:
+    """
+    Answers a user message: a canned reply for conversational intents, otherwise a RAG answer.
+
+    Args:
+        index: FaissStore to retrieve from.
+        query_text (str): User message.
+        llm: LLM client (see ``main.llm.base.LLMBase``).
+        history (list[tuple[str, str]]): Previous (question, answer) pairs to include in the prompt.
+        intent_detector: Detector with a ``detect(text)`` method.
+        model: SentenceTransformer for query embeddings; defaults to the shared embedding model.
+        speculative (bool): Start retrieval concurrently with intent detection.
+        warm_up (bool): In speculative mode, also ask the LLM server to load the model.
+        collections (list[str] | None): Collections of a ShardedStore to search; None for all.
+
+    Returns:
+        str | None: The response, or None for an empty message.
+    """
+    with metrics.trace("query"):
+        prepared = prepare_answer(
+            index, query_text, llm, history, intent_detector, model, speculative, warm_up, collections
+        )
+        if prepared.prompt is None:
+            return prepared.response
+        return generate(prepared, llm)
+
+
+def generate(prepared: Prepared, llm) -> str:
+    """Generates the answer to a prepared prompt and stores it in the answer cache."""
+    with metrics.span("generate"):
+        if isinstance(prepared.prompt, list):
+            answer = llm.chat_answer(prepared.prompt)
+        else:
+            answer = llm.generate_answer(prepared.prompt)
+    _remember(prepared.cache_key, answer)
+    return answer
+
+
+def stream_query(
+    index,
+    query_text: str,
+    llm,
+    history: list[tuple[str, str]],
+    intent_detector,
+    model=None,
+    speculative: bool = Config.SPECULATIVE_RETRIEVAL,
+    warm_up: bool = Config.SPECULATIVE_WARM_UP,
+    collections: list[str] | None = None,
+) -> Iterator[str] | None:
+    """
+    Same as ``answer_query``, but returns the response as an iterator of text deltas.
+
+    Intent detection and retrieval run before this returns; generation runs as
+    the iterator is consumed. Canned replies are yielded in one piece.
+    """
+    prepared = prepare_answer(
+        index, query_text, llm, history, intent_detector, model, speculative, warm_up, collections
+    )
+    if prepared.prompt is None:
+        return None if prepared.response is None else iter([prepared.response])
+    return stream_generate(prepared, llm)
+
+
+def stream_generate(prepared: Prepared, llm) -> Iterator[str]:
+    """Same as ``generate``, but returns the answer as an iterator of text deltas."""
+    if isinstance(prepared.prompt, list):
+        return _timed_stream(llm.stream_chat(prepared.prompt), prepared.cache_key)
+    return _timed_stream(llm.stream_answer(prepared.prompt), prepared.cache_key)
+
+
+def _timed_stream(stream: Iterator[str], cache_key: tuple | None) -> Iterator[str]:
+    """
+    Records generation as a span once the stream is consumed, with the time to the
+    first delta, and caches the answer if the stream was consumed to the end.
+
+    A client whose stream fails after some deltas ends it with ``LLM_ERROR_RESPONSE``;
+    the partial answer is then not cached.
+    """
+    parts = []
+    with metrics.span("generate") as span:
+        start = time.perf_counter()
+        for delta in stream:
+            span.setdefault("first_token_seconds", time.perf_counter() - start)
+            parts.append(delta)
+            yield delta
+        failed = span["error"] = bool(parts) and parts[-1] == LLM_ERROR_RESPONSE
+    if not failed:
+        _remember(cache_key, "".join(parts))
+
+
+def prepare_answer(
+    index,
+    query_text: str,
+    llm,
+    history: list[tuple[str, str]],
+    intent_detector,
+    model=None,
+    speculative: bool = Config.SPECULATIVE_RETRIEVAL,
+    warm_up: bool = Config.SPECULATIVE_WARM_UP,
+    collections: list[str] | None = None,
+) -> Prepared:
+    """
+    Runs everything before generation: intent detection, retrieval and the answer cache lookup.
+
+    Answers to questions asked without history (or with any history, if
+    ANSWER_CACHE_WITH_HISTORY is set) are cached; a paraphrase that retrieves
+    the same chunks gets the cached answer without generation.
+
+    Returns:
+        Prepared: The response when no generation is needed, otherwise the prompt.
+    """
+    if not query_text.strip():
+        logger.warning("Empty query. Skipping.")
+        return Prepared(None, None)
+
+    retrieval = None
+    if speculative:
+        # The copied context lets the worker's spans join the caller's trace
+        retrieval = _executor.submit(
+            contextvars.copy_context().run, retrieve, index, query_text, model, TOP_K, collections
+        )
+        if warm_up:
+            _warm_up(llm)
+
+    with metrics.span("intent") as span:
+        intent = span["intent"] = intent_detector.detect(query_text)
+    logger.debug("Detected intent '%s' for query: '%s'", intent, query_text)
+
+    if intent in CANNED_RESPONSES or intent == "empty":
+        # Not a question: drop the speculative retrieval (its result stays cached)
+        if retrieval is not None:
+            retrieval.cancel()
+        return Prepared(CANNED_RESPONSES.get(intent), None)
+
+    if retrieval is not None:
+        # Whatever retrieval time intent detection did not hide
+        with metrics.span("retrieve_wait"):
+            top_chunks = retrieval.result()
+    else:
+        top_chunks = retrieve(index, query_text, model, collections=collections)
+    return prepare_from_chunks(index, query_text, top_chunks, history, model)
+
+
+def prepare_from_chunks(
+    index,
+    query_text: str,
+    top_chunks: list[tuple[int, str, float]],
+    history: list[tuple[str, str]],
+    model=None,
+) -> Prepared:
+    """
+    The part of ``prepare_answer`` after retrieval: relevance check, answer cache lookup
+    and prompt packing. Used directly when chunks were retrieved in a batch.
+    """
+    if not top_chunks:
+        logger.info("No matching chunks found for query: %s", query_text)
+        return Prepared(NO_MATCH_RESPONSE, None)
+
+    max_score = max(score for _, _, score in top_chunks)
+    if max_score < RELEVANCE_THRESHOLD:
+        logger.debug("No relevant chunks found for query: '%s'", query_text)
+        return Prepared(LOW_RELEVANCE_RESPONSE, None)
+    logger.debug("Retrieved %d top matching chunks for query: '%s'", len(top_chunks), query_text)
+
+    cache_key = None
+    answer_cache = None if history and not Config.ANSWER_CACHE_WITH_HISTORY else get_answer_cache()
+    if answer_cache is not None:
+        with metrics.span("answer_cache") as span:
+            answer_cache.sync(index.revision)
+            query_embedding = faiss_indexer.embed_query(query_text, _model(model))[0]
+            chunk_ids = [chunk_id for chunk_id, _, _ in top_chunks]
+            answer = answer_cache.lookup(query_embedding, chunk_ids)
+            span["hit"] = answer is not None
+        if answer is not None:
+            logger.debug("Answer cache hit for query: '%s'", query_text)
+            return Prepared(answer, None)
+        cache_key = (query_embedding, chunk_ids)
+
+    with metrics.span("prompt") as span:
+        budget = Config.PROMPT_TOKEN_BUDGET - estimate_tokens(build_prompt("", query_text, []))
+        packed = pack_context(top_chunks, history, budget)
+        span.update(tokens=packed.tokens, passages=len(packed.passages), history_turns=len(packed.history))
+        if Config.LLM_MODE == "chat":
+            return Prepared(None, build_messages(packed.context, query_text, packed.history), cache_key)
+        return Prepared(None, build_prompt(packed.context, query_text, packed.history), cache_key)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the query embedding, retrieval and answer caches."""
+    stats = faiss_indexer.cache_stats()
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        stats["answer"] = answer_cache.stats()
+    return stats
+
+
+def _model(model):
+    if model is None:
+        from main.embedder import embedder
+        model = embedder.get_model()
+    return model
+
+
+def _remember(cache_key: tuple | None, answer: str):
+    """Stores a generated answer in the answer cache, unless generation failed."""
+    if cache_key is None or not answer or answer == LLM_ERROR_RESPONSE:
+        return
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.store(*cache_key, answer)
+
+
+def start_warm_up(llm=None, index=None, intent_detector=None) -> Future:
+    """
+    Loads what the first query needs on a worker thread; any argument may be None.
+
+    Args:
+        llm: LLM client; asked to load its model (``warm_up``), kept for OLLAMA_KEEP_ALIVE.
+        index: Index whose shards (and lexical indexes) to load, if it has ``warm_up``.
+        intent_detector: Detector whose model and centroids to load, if it has ``warm_up``.
+
+    Returns:
+        Future: Done when warm-up has finished.
+    """
+    return _executor.submit(_warm_up_all, llm, index, intent_detector)
+
+
+def _warm_up_all(llm, index, intent_detector):
+    with metrics.span("warm_up") as attrs:
+        try:
+            if llm is not None:
+                _warm_up(llm)
+            # The first encode also allocates the model's buffers
+            _model(None).encode(["warm-up"], show_progress_bar=False)
+            for component in (intent_detector, index):
+                if hasattr(component, "warm_up"):
+                    component.warm_up()
+        except Exception as e:
+            attrs["error"] = str(e)
+            logger.warning("Warm-up failed: %s", e)
+
+
+def _warm_up(llm):
+    """Asks the LLM server to load the model in the background, at most once per WARM_UP_INTERVAL."""
+    if not hasattr(llm, "warm_up"):
+        return
+    now = time.monotonic()
+    if now - _last_warm_up.get(id(llm), float("-inf")) < WARM_UP_INTERVAL:
+        return
+    _last_warm_up[id(llm)] = now
+    _executor.submit(llm.warm_up)
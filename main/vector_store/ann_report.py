@@ -0,0 +1,111 @@
+"""ANN Index Report Module
+
+Compares FAISS index types on the same embeddings: recall@k against the exact
+flat index, per-query search latency, build time and index size.
+
+Usage:
+    python -m main.vector_store.ann_report --specs "IVF256,Flat@nprobe=8" "IVF256,Flat@nprobe=32" "HNSW32@efSearch=64" "SQ8"
+
+Each spec is a FAISS index-factory string, optionally followed by ``@`` and
+search parameters. Embeddings are read from the global index, so build it
+with the default flat index first.
+"""
+import argparse
+import json
+import os
+import time
+import faiss
+import numpy as np
+
+from main.config import Config
+from main.vector_store.faiss_indexer import FaissStore, load_faiss_index, parse_search_params
+
+
+def make_queries(embeddings: np.ndarray, n_queries: int, seed: int = 0) -> np.ndarray:
+    """Builds queries that fall between stored vectors (normalized midpoints of random pairs)."""
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(embeddings), size=(n_queries, 2))
+    queries = (embeddings[pairs[:, 0]] + embeddings[pairs[:, 1]]).astype("float32")
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def evaluate_index_specs(embeddings: np.ndarray, specs: list[str], k: int = 10, n_queries: int = 200) -> list[dict]:
+    """
+    Measures recall@k and latency of each index spec against exact search.
+
+    Args:
+        embeddings (np.ndarray): float32 matrix of corpus embeddings.
+        specs (list[str]): Index-factory strings, optionally with ``@params``.
+        k (int): Number of neighbours to compare.
+        n_queries (int): Number of queries to run.
+
+    Returns:
+        list[dict]: One row per spec, starting with the exact flat baseline.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    queries = make_queries(embeddings, n_queries)
+    ids = np.arange(len(embeddings), dtype="int64")
+
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    normalized = embeddings.copy()
+    faiss.normalize_L2(normalized)
+    exact.add(normalized)
+    _, truth = exact.search(queries, k)
+
+    report = []
+    for spec in ["Flat"] + list(specs):
+        index_spec, _, params = spec.partition("@")
+        start = time.perf_counter()
+        store = FaissStore(embeddings.shape[1], index_spec, parse_search_params(params))
+        if not store.is_trained:
+            store.train(embeddings[:Config.FAISS_TRAIN_SIZE])
+        store.add(embeddings.copy(), [""] * len(embeddings), ids)
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        found = np.empty_like(truth)
+        for row, query in enumerate(queries):
+            start = time.perf_counter()
+            _, labels = store.index.search(query.reshape(1, -1), k)
+            latencies.append(time.perf_counter() - start)
+            found[row] = labels[0]
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        report.append({
+            "spec": spec,
+            f"recall@{k}": round(float(recall), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 3),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 3),
+            "build_seconds": round(build_seconds, 3),
+            "size_mb": round(faiss.serialize_index(store.index).nbytes / 1e6, 2),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on the global index embeddings")
+    parser.add_argument("--specs", nargs="+", required=True, help='Index specs, e.g. "IVF256,Flat@nprobe=16" "HNSW32"')
+    parser.add_argument("--index", default=os.path.join("faiss_index", "global.index"), help="Index to read embeddings from")
+    parser.add_argument("-k", type=int, default=10, help="Neighbours to compare")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    store = load_faiss_index(args.index)
+    if store.index_spec != "Flat":
+        print(f"Note: {args.index} is a {store.index_spec} index; its vectors may be approximate.")
+    report = evaluate_index_specs(store.vectors(), args.specs, k=args.k, n_queries=args.queries)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = list(report[0])
+    widths = [max(len(column), *(len(str(row[column])) for row in report)) for column in columns]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in report:
+        print("  ".join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+
+
+if __name__ == "__main__":
+    main()
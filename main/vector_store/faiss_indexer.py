@@ -1,75 +1,627 @@
 import os
+import itertools
+import uuid
+import threading
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from typing import TYPE_CHECKING
+from main import metrics
+from main.config import Config
+from main.embedder import backend
+from main.vector_store.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from main.vector_store.provenance import ProvenanceTable, Source
+from main.vector_store.metadata_file import is_metadata_file, read_metadata, write_metadata
+from main.vector_store.query_cache import LRUCache, normalize_query
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Every mutation of any store takes a new version, so cached results never outlive the data
+_versions = itertools.count(1)
+
+
+def parse_search_params(spec: str) -> dict:
+    """Parses search parameters such as ``"nprobe=16,efSearch=64"`` into a dict."""
+    params = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        params[name.strip()] = float(value) if "." in value else int(value)
+    return params
 
 
 class FaissStore:
-    def __init__(self, dim: int):
+    def __init__(
+        self,
+        dim: int,
+        index_spec: str = "Flat",
+        search_params: dict | None = None,
+        model_name: str | None = None,
+    ):
+        """
+        Args:
+            dim (int): Embedding dimension.
+            index_spec (str): FAISS index-factory string, e.g. "Flat", "IVF1024,Flat",
+                "IVF1024,PQ32", "HNSW32", "SQ8" or "SQfp16". Inner-product metric is
+                used throughout (cosine similarity on normalized vectors).
+            search_params (dict | None): Search-time parameters such as nprobe or efSearch.
+            model_name (str | None): Embedding model the vectors come from, recorded on save.
+        """
+        if "IDMap" in index_spec:
+            raise ValueError("index_spec must not contain IDMap; chunk IDs are always mapped")
         self.dim = dim
-        # Using IndexFlatIP for cosine similarity (normalized vectors)
-        self.index = faiss.IndexFlatIP(dim)
-        self.metadata = []
+        self.index_spec = index_spec
+        self.model_name = model_name
+        # Wrapped in an ID map so chunks keep stable IDs across incremental updates.
+        self.index = faiss.IndexIDMap2(faiss.index_factory(dim, index_spec, faiss.METRIC_INNER_PRODUCT))
+        self.metadata: dict[int, str] = {}
+        self._lexical = None
+        self._lexical_path = None
+        self._lexical_lock = threading.Lock()
+        self.provenance = ProvenanceTable()
+        self.next_id = 0
+        self._changed()
+        self.search_params = {}
+        self.set_search_params(search_params or {})
+        self._mapped_path = None  # Set while the index is a read-only memory map of this file
+
+    @classmethod
+    def from_files(
+        cls,
+        index_path: str,
+        metadata_path: str,
+        mmap: bool = True,
+        lexical_path: str | None = None,
+        sources_path: str | None = None,
+    ) -> "FaissStore":
+        """Opens a saved store; its dimension and index settings are read from the files."""
+        store = cls.__new__(cls)
+        store.load(index_path, metadata_path, mmap, lexical_path, sources_path)
+        return store
+
+    @property
+    def lexical(self) -> LexicalIndex:
+        """
+        BM25 and identifier index over the chunk texts. Opened from the saved file on
+        first use, or built from the texts if that is missing or out of date.
+        """
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    lexical = LexicalIndex.load(self._lexical_path, self.revision) if self._lexical_path else None
+                    if lexical is None:
+                        lexical = LexicalIndex()
+                        lexical.add(self.metadata.keys(), self.metadata.values())
+                    self._lexical = lexical
+        return self._lexical
+
+    def _lexical_to_update(self) -> LexicalIndex | None:
+        """
+        The lexical index a change must be applied to: opened first if hybrid retrieval
+        uses it, otherwise only if it is already open (it is rebuilt if needed later).
+        """
+        if self._lexical is None and Config.HYBRID_RETRIEVAL:
+            return self.lexical
+        return self._lexical
+
+    @property
+    def is_trained(self) -> bool:
+        return self.index.is_trained
 
-    def add(self, embeddings: np.ndarray, documents: list[str]):
+    def train(self, embeddings: np.ndarray):
+        """Trains the index (e.g. IVF centroids, PQ codebooks) on a sample of embeddings."""
+        self._make_writable()
+        sample = np.array(embeddings, dtype="float32")
+        faiss.normalize_L2(sample)
+        try:
+            self.index.train(sample)
+        except RuntimeError as e:
+            raise ValueError(f"Could not train {self.index_spec} index on {len(sample)} vectors: {e}") from e
+
+    def set_search_params(self, params: dict):
+        """Applies search-time parameters (e.g. {"nprobe": 16} for IVF, {"efSearch": 64} for HNSW)."""
+        space = faiss.ParameterSpace()
+        for name, value in params.items():
+            try:
+                space.set_index_parameter(self.index, name, value)
+            except RuntimeError as e:
+                raise ValueError(f"Parameter {name} is not supported by {self.index_spec} index") from e
+            self.search_params[name] = value
+
+    def add(self, embeddings: np.ndarray, documents: list[str], ids=None, sources=None) -> np.ndarray:
+        """
+        Adds embeddings and their chunk texts.
+
+        Args:
+            embeddings (np.ndarray): float32 matrix of shape (n, dim). Normalized in place.
+            documents (list[str]): Chunk text for each row.
+            ids: Optional chunk IDs for each row; allocated sequentially if omitted.
+            sources: Optional (file, page, start, end) of each row, returned by ``source``.
+
+        Returns:
+            np.ndarray: The int64 chunk IDs that were stored.
+        """
         if embeddings.shape[1] != self.dim:
             raise ValueError(f"Expected dim {self.dim}, got {embeddings.shape[1]}")
+        if len(documents) != embeddings.shape[0]:
+            raise ValueError(f"Got {embeddings.shape[0]} embeddings for {len(documents)} documents")
+
+        if ids is None:
+            ids = np.arange(self.next_id, self.next_id + len(documents), dtype="int64")
+        else:
+            ids = np.asarray(ids, dtype="int64")
+        if not ids.size:
+            return ids
+        if not self.is_trained:
+            raise ValueError(f"{self.index_spec} index must be trained before adding embeddings")
+        self._make_writable()
 
         faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
-        self.metadata.extend(documents)
+        self.index.add_with_ids(embeddings, ids)
+        lexical = self._lexical_to_update()
+        self.metadata.update(zip(ids.tolist(), documents))
+        if lexical is not None:
+            lexical.add(ids.tolist(), documents)
+        if sources is not None:
+            self.provenance.add(ids, sources)
+        self._changed()
+        self.next_id = max(self.next_id, int(ids.max()) + 1)
+        return ids
+
+    def remove(self, ids) -> int:
+        """
+        Deletes chunks by ID, compacting the index if it cannot remove in place.
+
+        Returns:
+            int: Number of vectors removed.
+        """
+        ids = np.asarray(list(ids), dtype="int64")
+        if not ids.size:
+            return 0
+        self._make_writable()
+
+        try:
+            removed = self.index.remove_ids(faiss.IDSelectorBatch(ids))
+        except RuntimeError:
+            # Some index types (e.g. HNSW) do not support removal.
+            removed = self.compact(ids)
+
+        for chunk_id in ids.tolist():
+            self._forget(chunk_id)
+        self.provenance.remove(ids)
+        self._changed()
+        return removed
+
+    def compact(self, drop_ids=()) -> int:
+        """
+        Rebuilds the index from its stored vectors, leaving out ``drop_ids``.
+
+        Returns:
+            int: Number of vectors dropped.
+        """
+        self._make_writable()
+        stored_ids = self.ids()
+        keep = ~np.isin(stored_ids, np.asarray(list(drop_ids), dtype="int64"))
+        vectors = self.vectors()
+
+        # Cloning keeps any training (IVF centroids, PQ codebooks)
+        base = faiss.clone_index(self.index.index)
+        base.reset()
+        index = faiss.IndexIDMap2(base)
+        index.add_with_ids(vectors[keep], stored_ids[keep])
+        self.index = index
+        self.set_search_params(dict(self.search_params))
+        for chunk_id in stored_ids[~keep].tolist():
+            self._forget(chunk_id)
+        self.provenance.remove(stored_ids[~keep])
+        self._changed()
+        return int((~keep).sum())
+
+    def _forget(self, chunk_id: int):
+        lexical = self._lexical_to_update()
+        text = self.metadata.pop(chunk_id, None)
+        if text is not None and lexical is not None:
+            lexical.remove(chunk_id, text)
+
+    def source(self, chunk_id: int) -> Source | None:
+        """Source file, page and character offsets of a chunk, if they were recorded."""
+        return self.provenance.get(chunk_id)
+
+    def similarities(self, query_embedding: np.ndarray, ids) -> np.ndarray | None:
+        """
+        Inner products of a normalized query embedding with stored vectors, by chunk ID.
+
+        Returns:
+            np.ndarray | None: One score per ID, or None if the index type cannot
+            reconstruct vectors by ID (e.g. IVF).
+        """
+        try:
+            vectors = np.vstack([self.index.reconstruct(int(chunk_id)) for chunk_id in ids])
+        except RuntimeError:
+            return None
+        return vectors @ query_embedding.ravel()
+
+    def vectors(self) -> np.ndarray:
+        """Returns the stored (normalized, possibly quantized) vectors in index order."""
+        return self.index.index.reconstruct_n(0, self.index.ntotal)
+
+    def ids(self) -> np.ndarray:
+        """Returns the stored chunk IDs in index order."""
+        return faiss.vector_to_array(self.index.id_map).astype("int64")
 
     def search(self, query_embedding: np.ndarray, k: int = 5):
-        if query_embedding.ndim == 1:
-            query_embedding = query_embedding.reshape(1, -1)
+        return [(text, score) for _, text, score in self.search_with_ids(query_embedding, k)]
+
+    def search_with_ids(self, query_embedding: np.ndarray, k: int = 5) -> list[tuple[int, str, float]]:
+        """Like ``search``, returning (chunk_id, text, score) triples. Takes a single query."""
+        if query_embedding.ndim == 2 and query_embedding.shape[0] != 1:
+            raise ValueError("search_with_ids takes one query; use search_batch for several")
+        return self.search_batch(query_embedding, k)[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> list[list[tuple[int, str, float]]]:
+        """
+        Searches several queries with one matrix search.
+
+        Args:
+            query_embeddings (np.ndarray): float32 matrix of shape (n, dim), or one vector;
+                normalized in place.
+            k (int): Results per query.
 
-        faiss.normalize_L2(query_embedding)
+        Returns:
+            list[list[tuple[int, str, float]]]: For each query, its (chunk_id, text, score) triples, best first.
+        """
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings.reshape(1, -1)
 
-        distances, indices = self.index.search(query_embedding, k)
-        results = []
+        faiss.normalize_L2(query_embeddings)
 
-        for dist_list, idx_list in zip(distances, indices):
-            for dist, idx in zip(dist_list, idx_list):
-                if idx == -1:
-                    continue
-                results.append((self.metadata[idx], float(dist)))
+        distances, indices = self.index.search(query_embeddings, k)
+        return [
+            [(int(idx), self.metadata[int(idx)], float(dist)) for dist, idx in zip(dist_list, idx_list) if idx != -1]
+            for dist_list, idx_list in zip(distances.tolist(), indices.tolist())
+        ]
 
-        return results
+    def _changed(self):
+        """Marks the contents as changed: a new in-process version and a new persistent revision."""
+        self.version = next(_versions)
+        self.revision = uuid.uuid4().hex
 
-    def save(self, index_path: str, metadata_path: str):
-        faiss.write_index(self.index, index_path)
-        np.save(metadata_path, np.array(self.metadata, dtype=object))
+    def _make_writable(self):
+        """Replaces a memory-mapped index and metadata with in-memory copies before mutating them."""
+        if self._mapped_path is None:
+            return
+        self.index = faiss.read_index(self._mapped_path)
+        self.metadata = dict(self.metadata.items())
+        self._mapped_path = None
+        self.set_search_params(dict(self.search_params))
 
-    def load(self, index_path: str, metadata_path: str):
+    def save(
+        self, index_path: str, metadata_path: str, lexical_path: str | None = None, sources_path: str | None = None
+    ):
+        tmp_path = index_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, index_path)
+
+        ids = self.ids()
+        header = {
+            "dim": self.dim,
+            "model": self.model_name,
+            "index_spec": self.index_spec,
+            "search_params": self.search_params,
+            "next_id": self.next_id,
+            "revision": self.revision,
+        }
+        write_metadata(metadata_path, header, ids, [self.metadata[chunk_id] for chunk_id in ids.tolist()])
+        if lexical_path and (Config.HYBRID_RETRIEVAL or self._lexical is not None):
+            self.lexical.save(lexical_path, self.revision)
+        if sources_path:
+            self.provenance.save(sources_path)
+
+    def load(
+        self,
+        index_path: str,
+        metadata_path: str,
+        mmap: bool = True,
+        lexical_path: str | None = None,
+        sources_path: str | None = None,
+    ):
+        """
+        Loads a saved store.
+
+        Args:
+            index_path (str): FAISS index file.
+            metadata_path (str): Chunk metadata file.
+            mmap (bool): Memory-map the index and texts read-only instead of reading them
+                into memory. The store is copied into memory on its first mutation.
+            lexical_path (str | None): Lexical index file, opened when first used. If it is
+                missing or out of date, the lexical index is rebuilt from the chunk texts.
+            sources_path (str | None): Chunk provenance file; without it no sources are known.
+        """
         if not os.path.exists(index_path) or not os.path.exists(metadata_path):
             raise FileNotFoundError("Index or metadata file not found.")
 
-        self.index = faiss.read_index(index_path)
-        self.metadata = np.load(metadata_path, allow_pickle=True).tolist()
+        if is_metadata_file(metadata_path):
+            header, metadata = read_metadata(metadata_path)
+        else:
+            # Pickled texts in index order, written before the metadata format existed.
+            header, metadata = {"index_spec": "Flat", "search_params": {}}, None
+            texts = np.load(metadata_path, allow_pickle=True).tolist()
+            mmap = False
+
+        index = faiss.read_index(index_path, _mmap_flags(header["index_spec"]) if mmap else 0)
+        if not isinstance(index, faiss.IndexIDMap2):
+            # Index written before chunk IDs existed: IDs are the row numbers.
+            wrapped = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+            wrapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype="int64"))
+            index = wrapped
+        if metadata is None:
+            metadata = dict(zip(faiss.vector_to_array(index.id_map).tolist(), texts))
+        if len(metadata) != index.ntotal:
+            raise ValueError(f"Index has {index.ntotal} vectors but metadata has {len(metadata)} chunks")
+
+        self.index = index
+        self.dim = index.d
+        self.index_spec = header["index_spec"]
+        self.model_name = header.get("model")
+        self.metadata = metadata
+        self._mapped_path = index_path if mmap else None
+        self.search_params = {}
+        self.set_search_params(header["search_params"])
+        if "next_id" in header:
+            self.next_id = header["next_id"]
+        else:
+            ids = self.ids()
+            self.next_id = int(ids.max()) + 1 if ids.size else 0
+        self.version = next(_versions)
+        self.revision = header.get("revision") or uuid.uuid4().hex
+        self.provenance = ProvenanceTable.load(sources_path) if sources_path else ProvenanceTable()
+        self._lexical = None
+        self._lexical_path = lexical_path if header.get("revision") else None
+        self._lexical_lock = threading.Lock()
+
+
+def _mmap_flags(index_spec: str) -> int:
+    """
+    FAISS read flags that memory-map an index of the given type read-only. IO_FLAG_MMAP
+    only maps IVF inverted lists; the codes of flat-code indexes (Flat, SQ, PQ, and the
+    storage of HNSW) need IO_FLAG_MMAP_IFC. The two cannot be combined for IVF indexes.
+    """
+    if "IVF" in index_spec.upper() or not hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
 
 
 # --- Convenience functions for main.py usage ---
 
-def build_faiss_index(embeddings: list[list[float]], documents: list[str]) -> FaissStore:
-    array = np.array(embeddings).astype("float32")
+def build_faiss_index(
+    embeddings: np.ndarray,
+    documents: list[str],
+    ids=None,
+    index_spec: str = "Flat",
+    search_params: dict | None = None,
+) -> FaissStore:
+    array = np.ascontiguousarray(embeddings, dtype="float32")
     dim = array.shape[1]
-    store = FaissStore(dim)
-    store.add(array, documents)
+    store = FaissStore(dim, index_spec, search_params, backend.fingerprint())
+    if not store.is_trained:
+        store.train(array[:Config.FAISS_TRAIN_SIZE])
+    store.add(array, documents, ids)
     return store
 
 def save_faiss_index(store: FaissStore, index_path: str):
     base_path = os.path.splitext(index_path)[0]
-    store.save(base_path + ".index", base_path + ".metadata.npy")
+    store.save(base_path + ".index", base_path + ".meta", base_path + ".lex", base_path + ".src.npz")
 
-def load_faiss_index(index_path: str) -> FaissStore:
+def load_faiss_index(index_path: str, mmap: bool = True) -> FaissStore:
     base_path = os.path.splitext(index_path)[0]
-    dummy_vector = np.zeros((1, 384), dtype="float32")  # Replace 384 if your vector size is different
-    store = FaissStore(dummy_vector.shape[1])
-    store.load(base_path + ".index", base_path + ".metadata.npy")
+    metadata_path = base_path + ".meta"
+    if not os.path.exists(metadata_path) and os.path.exists(base_path + ".metadata.npy"):
+        metadata_path = base_path + ".metadata.npy"
+    store = FaissStore.from_files(base_path + ".index", metadata_path, mmap, base_path + ".lex", base_path + ".src.npz")
+    if Config.FAISS_SEARCH_PARAMS:
+        store.set_search_params(parse_search_params(Config.FAISS_SEARCH_PARAMS))
     return store
 
-def query_faiss_index(store: FaissStore, query_text: str, model: SentenceTransformer, k: int = 5) -> list[tuple[str, float]]:
-    show_progress = os.getenv("DEBUG", "false").lower() == "true"
-    query_embedding = model.encode([query_text], convert_to_numpy=True, show_progress_bar=show_progress)
-    results = store.search(query_embedding, k)
-    return results  # returns list of (chunk_text, score)
+_query_embeddings = LRUCache(Config.QUERY_EMBEDDING_CACHE_SIZE)
+_retrievals = LRUCache(Config.RETRIEVAL_CACHE_SIZE)  # Keyed by store version, so stores share it safely
+_encoding = {}
+_encoding_lock = threading.Lock()
+
+
+def embed_query(query_text: str, model: "SentenceTransformer") -> np.ndarray:
+    """Returns the normalized embedding of a query, reusing it for repeated queries."""
+    key = (id(model), normalize_query(query_text))
+    query_embedding = _query_embeddings.get(key)
+    if query_embedding is not None:
+        return query_embedding
+
+    # Intent detection and speculative retrieval may ask for the same query at once; encode it once
+    with _encoding_lock:
+        lock = _encoding.setdefault(key, threading.Lock())
+    try:
+        with lock, metrics.span("embed_query") as span:
+            query_embedding = _query_embeddings.get(key)
+            span["cached"] = query_embedding is not None
+            if query_embedding is None:
+                show_progress = os.getenv("DEBUG", "false").lower() == "true"
+                query_embedding = model.encode([query_text], convert_to_numpy=True, show_progress_bar=show_progress)
+                faiss.normalize_L2(query_embedding)
+                _query_embeddings.put(key, query_embedding)
+    finally:
+        with _encoding_lock:
+            _encoding.pop(key, None)
+    return query_embedding
+
+def embed_queries(query_texts: list[str], model: "SentenceTransformer") -> np.ndarray:
+    """
+    Normalized embeddings of several queries, encoding all uncached ones in one batched call.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(query_texts), dim); the embeddings are
+        added to the query embedding cache, so ``embed_query`` reuses them.
+    """
+    keys = [(id(model), normalize_query(text)) for text in query_texts]
+    cached = [_query_embeddings.get(key) for key in keys]
+    missing = {key: text for key, text, embedding in zip(keys, query_texts, cached) if embedding is None}
+    if missing:
+        with metrics.span("embed_query", queries=len(missing)):
+            encoded = np.asarray(model.encode(list(missing.values()), convert_to_numpy=True, show_progress_bar=False), dtype="float32")
+            faiss.normalize_L2(encoded)
+        for key, embedding in zip(missing, encoded):
+            _query_embeddings.put(key, embedding.reshape(1, -1))
+        found = dict(zip(missing, encoded))
+        cached = [embedding if embedding is not None else found[key] for key, embedding in zip(keys, cached)]
+    return np.vstack(cached).astype("float32", copy=False)
+
+
+def query_faiss_index_batch(
+    store,
+    query_texts: list[str],
+    model: "SentenceTransformer",
+    k: int = 5,
+    collections: list[str] | None = None,
+) -> list[list[tuple[int, str, float]]]:
+    """
+    Retrieves the top-k chunks for several queries: one batched encode and one
+    matrix search per store, instead of one of each per query.
+
+    Args:
+        store: FaissStore, or ShardedStore to search all (or some) of its collections.
+        query_texts (list[str]): Queries.
+        model (SentenceTransformer): Model for the query embeddings.
+        k (int): Results per query.
+        collections (list[str] | None): ShardedStore collections to search; None for all.
+
+    Returns:
+        list[list[tuple[int, str, float]]]: (chunk_id, text, score) triples of each query, in input order.
+    """
+    version = store.version
+    scope = tuple(sorted(collections)) if collections else None
+    keys = [(version, normalize_query(text), k, scope) for text in query_texts]
+    results = [_retrievals.get(key) for key in keys]
+    # Each distinct uncached query is searched once
+    pending = {key: text for key, text, result in zip(keys, query_texts, results) if result is None}
+    if pending:
+        texts = list(pending.values())
+        if hasattr(store, "shards"):
+            found = store.search_text_batch(texts, model, k, collections)
+        else:
+            found = search_store_batch(store, texts, model, k)
+        for key, result in zip(pending, found):
+            _retrievals.put(key, result)
+        found = dict(zip(pending, found))
+        results = [result if result is not None else found[key] for key, result in zip(keys, results)]
+    return [list(result) for result in results]
+
+
+def query_faiss_index(
+    store,
+    query_text: str,
+    model: "SentenceTransformer",
+    k: int = 5,
+    with_ids: bool = False,
+    collections: list[str] | None = None,
+) -> list[tuple]:
+    """
+    Retrieves the top-k chunks for a query, caching results per store version.
+
+    Args:
+        store: FaissStore, or ShardedStore to search all (or some) of its collections.
+        query_text (str): Query.
+        model (SentenceTransformer): Model for the query embedding.
+        k (int): Number of results.
+        with_ids (bool): Return (chunk_id, text, score) instead of (text, score).
+        collections (list[str] | None): ShardedStore collections to search; None for all.
+    """
+    # Versions are unique across stores and change on every mutation, so stale entries are never hit
+    key = (store.version, normalize_query(query_text), k, tuple(sorted(collections)) if collections else None)
+    results = _retrievals.get(key)
+    if results is None:
+        if hasattr(store, "shards"):
+            results = store.search_text(query_text, model, k, collections)
+        else:
+            results = search_store(store, query_text, model, k)
+        _retrievals.put(key, results)
+    if with_ids:
+        return list(results)  # returns list of (chunk_id, chunk_text, score)
+    return [(text, score) for _, text, score in results]  # returns list of (chunk_text, score)
+
+def search_store(store: FaissStore, query_text: str, model: "SentenceTransformer", k: int) -> list[tuple]:
+    """Uncached search of one store: hybrid (see ``_hybrid_search``) or dense only."""
+    if Config.HYBRID_RETRIEVAL:
+        return _hybrid_search(store, query_text, model, k)
+    # search() normalizes in place, so it gets a copy of the cached embedding
+    query_embedding = embed_query(query_text, model).copy()
+    with metrics.span("search", k=k):
+        return store.search_with_ids(query_embedding, k)
+
+def search_store_batch(store: FaissStore, query_texts: list[str], model: "SentenceTransformer", k: int) -> list[list[tuple]]:
+    """Uncached search of one store for several queries, with one matrix search for all of them."""
+    query_embeddings = embed_queries(query_texts, model)
+    with metrics.span("search", k=k, queries=len(query_texts)):
+        dense = store.search_batch(query_embeddings.copy(), k)
+    if not Config.HYBRID_RETRIEVAL:
+        return dense
+    results = []
+    for query_text, query_embedding, hits in zip(query_texts, query_embeddings, dense):
+        exact, lexical_hits = _lexical_search(store, query_text, k)
+        if exact is not None:
+            exact_hits = _exact_hits(store, query_embedding, exact)
+            if exact_hits is not None:
+                results.append(exact_hits)
+                continue
+            lexical_hits = store.lexical.search(query_text, k)
+        results.append(_fuse(store, query_embedding, hits, lexical_hits, k))
+    return results
+
+def _hybrid_search(store: FaissStore, query_text: str, model: "SentenceTransformer", k: int) -> list[tuple]:
+    """
+    Fuses dense and BM25 results by reciprocal rank. If the query names an identifier
+    found in at most ``k`` chunks, those chunks are returned without a dense search,
+    with their cosine similarity as score (so relevance checks still apply).
+    """
+    exact, lexical_hits = _lexical_search(store, query_text, k)
+    query_embedding = embed_query(query_text, model).copy()
+    if exact is not None:
+        exact_hits = _exact_hits(store, query_embedding, exact)
+        if exact_hits is not None:
+            return exact_hits
+        lexical_hits = store.lexical.search(query_text, k)
+
+    with metrics.span("search", k=k):
+        dense = store.search_with_ids(query_embedding, k)
+    return _fuse(store, query_embedding, dense, lexical_hits, k)
+
+def _lexical_search(store: FaissStore, query_text: str, k: int) -> tuple[list[int] | None, list[tuple[int, float]]]:
+    """Returns (IDs of exact identifier matches, or None if there are none or too many, BM25 hits)."""
+    lexical = store.lexical
+    with metrics.span("lexical", k=k) as span:
+        exact = lexical.lookup_identifiers(query_text)
+        span["exact"] = len(exact)
+        if Config.LEXICAL_SHORT_CIRCUIT and 0 < len(exact) <= k:
+            return sorted(exact), []
+        return None, lexical.search(query_text, k)
+
+def _exact_hits(store: FaissStore, query_embedding: np.ndarray, exact: list[int]) -> list[tuple] | None:
+    """Exact identifier matches, best cosine similarity first; None if the index cannot reconstruct vectors."""
+    similarities = store.similarities(query_embedding, exact)
+    if similarities is None:
+        return None
+    hits = [(chunk_id, store.metadata[chunk_id], float(score)) for chunk_id, score in zip(exact, similarities.tolist())]
+    return sorted(hits, key=lambda hit: hit[2], reverse=True)
+
+def _fuse(store: FaissStore, query_embedding: np.ndarray, dense: list[tuple], lexical_hits: list[tuple], k: int) -> list[tuple]:
+    """Merges one query's dense and BM25 hits by reciprocal rank."""
+    fused = reciprocal_rank_fusion([[hit[0] for hit in dense], [hit[0] for hit in lexical_hits]], Config.RRF_K)[:k]
+
+    # Chunks found only lexically get their cosine similarity, so relevance checks still apply
+    scores = {chunk_id: score for chunk_id, _, score in dense}
+    missing = [chunk_id for chunk_id in fused if chunk_id not in scores]
+    if missing:
+        similarities = store.similarities(query_embedding, missing)
+        fallback = min(scores.values(), default=0.0)
+        scores.update(zip(missing, similarities.tolist() if similarities is not None else [fallback] * len(missing)))
+    return [(chunk_id, store.metadata[chunk_id], float(scores[chunk_id])) for chunk_id in fused]
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the query embedding and retrieval caches."""
+    return {"query_embedding": _query_embeddings.stats(), "retrieval": _retrievals.stats()}
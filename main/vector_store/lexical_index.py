@@ -0,0 +1,355 @@
+"""Lexical Index Module
+
+Inverted index over chunk texts for hybrid retrieval: BM25 scoring of query
+words, plus a lookup table of identifiers (model numbers and part codes such
+as "IPS4000" or "4300 VIL") that dense embeddings match poorly.
+
+Identifier keys are words of at least three characters that contain a digit,
+and such a word joined with its neighbour, with case and separators removed:
+"IPS 4000", "ips-4000" and "IPS4000" all map to the key "ips4000". A key must
+also contain a letter, so plain values ("120", "2000 hours" alone) are not
+identifiers, while "4300 VIL" still is.
+
+The index is kept in step with the FaissStore it belongs to and saved next to
+it, tagged with the store revision it was built from, as flat arrays::
+
+    b"RAGLEX01" | uint64 header size | JSON header | sections, each 8-byte aligned
+
+The sections hold the chunk lengths, the sorted vocabulary and identifier keys
+(offsets into UTF-8 blobs) and their postings in CSR form. A saved index is
+memory-mapped read-only when loaded, so opening it costs the same for any
+corpus size; it is copied into dicts before its first change.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+import numpy as np
+
+MAGIC = b"RAGLEX01"
+FORMAT_VERSION = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+MIN_IDENTIFIER_LENGTH = 3  # Shorter numbers ("24 V") are values rather than identifiers
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.casefold())
+
+
+def identifier_keys(words: list[str]) -> tuple[set[str], set[str]]:
+    """
+    Identifier keys of a tokenized text.
+
+    Returns:
+        tuple[set[str], set[str]]: (single-word keys, keys of a word joined with its neighbour).
+    """
+    singles, pairs = set(), set()
+    for position, word in enumerate(words):
+        if len(word) < MIN_IDENTIFIER_LENGTH or not any(char.isdigit() for char in word):
+            continue
+        if _is_identifier(word):
+            singles.add(word)
+        if position > 0 and _is_identifier(words[position - 1] + word):
+            pairs.add(words[position - 1] + word)
+        if position + 1 < len(words) and _is_identifier(word + words[position + 1]):
+            pairs.add(word + words[position + 1])
+    return singles, pairs
+
+
+def _is_identifier(key: str) -> bool:
+    """Keys need a letter as well as a digit: pure numbers are values, not model numbers."""
+    return any(char.isdigit() for char in key) and any(char.isalpha() for char in key)
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """
+    Merges ranked lists of chunk IDs by summing ``1 / (k + rank)`` over the lists.
+
+    Returns:
+        list[int]: Chunk IDs, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex:
+    """BM25 inverted index and identifier table over chunk texts."""
+
+    def __init__(self):
+        self.postings: dict[str, dict[int, int]] = {}  # word -> {chunk_id: term frequency}
+        self.identifiers: dict[str, set[int]] = {}  # identifier key -> chunk IDs
+        self.lengths: dict[int, int] = {}  # chunk_id -> words
+        self.total_length = 0
+        self._mapped = None  # Set while the index is a read-only view of a saved file
+
+    def __len__(self) -> int:
+        return len(self._mapped.chunk_ids) if self._mapped is not None else len(self.lengths)
+
+    def add(self, ids, texts):
+        self._thaw()
+        for chunk_id, text in zip(ids, texts):
+            chunk_id = int(chunk_id)
+            if chunk_id in self.lengths:
+                self.remove(chunk_id, text)
+            words = tokenize(text)
+            for word, count in Counter(words).items():
+                self.postings.setdefault(word, {})[chunk_id] = count
+            for key in set.union(*identifier_keys(words)):
+                self.identifiers.setdefault(key, set()).add(chunk_id)
+            self.lengths[chunk_id] = len(words)
+            self.total_length += len(words)
+
+    def remove(self, chunk_id: int, text: str):
+        """Removes a chunk; ``text`` must be the text it was added with."""
+        self._thaw()
+        chunk_id = int(chunk_id)
+        if chunk_id not in self.lengths:
+            return
+        words = tokenize(text)
+        for word in set(words):
+            _discard(self.postings, word, chunk_id)
+        for key in set.union(*identifier_keys(words)):
+            _discard(self.identifiers, key, chunk_id)
+        self.total_length -= self.lengths.pop(chunk_id)
+
+    def search(self, query_text: str, k: int = 5, ids: set[int] | None = None) -> list[tuple[int, float]]:
+        """
+        Ranks chunks by BM25 score for the query words.
+
+        Args:
+            query_text (str): Query.
+            k (int): Number of results.
+            ids (set[int] | None): Only rank these chunks.
+
+        Returns:
+            list[tuple[int, float]]: Up to ``k`` (chunk_id, score) pairs, best first.
+        """
+        count = len(self)
+        if not count:
+            return []
+        average_length = self.total_length / count or 1.0
+        matched_ids, matched_scores = [], []
+        for word in set(tokenize(query_text)):
+            chunk_ids, frequencies = self._postings(word)
+            if not len(chunk_ids):
+                continue
+            idf = math.log(1 + (count - len(chunk_ids) + 0.5) / (len(chunk_ids) + 0.5))
+            if ids is not None:
+                keep = np.isin(chunk_ids, np.fromiter(ids, dtype="int64", count=len(ids)))
+                chunk_ids, frequencies = chunk_ids[keep], frequencies[keep]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths(chunk_ids) / average_length)
+            matched_ids.append(chunk_ids)
+            matched_scores.append(idf * frequencies * (BM25_K1 + 1) / (frequencies + norm))
+        if not matched_ids:
+            return []
+        chunk_ids, positions = np.unique(np.concatenate(matched_ids), return_inverse=True)
+        scores = np.bincount(positions, weights=np.concatenate(matched_scores))
+        best = np.argsort(-scores, kind="stable")[:k]
+        return list(zip(chunk_ids[best].tolist(), scores[best].tolist()))
+
+    def lookup_identifiers(self, query_text: str) -> set[int]:
+        """
+        Chunks containing an identifier from the query. Joined keys ("4300 VIL")
+        are more specific than single words, so they are used when any matches.
+        """
+        singles, pairs = identifier_keys(tokenize(query_text))
+        for keys in (pairs, singles):
+            hits = set().union(*(self._identifier_ids(key) for key in keys))
+            if hits:
+                return hits
+        return set()
+
+    def _postings(self, word: str) -> tuple[np.ndarray, np.ndarray]:
+        """(chunk IDs, term frequencies) of a word."""
+        if self._mapped is not None:
+            return self._mapped.postings(word)
+        postings = self.postings.get(word, {})
+        return (
+            np.fromiter(postings.keys(), dtype="int64", count=len(postings)),
+            np.fromiter(postings.values(), dtype="float64", count=len(postings)),
+        )
+
+    def _lengths(self, chunk_ids: np.ndarray) -> np.ndarray:
+        if self._mapped is not None:
+            return self._mapped.lengths[np.searchsorted(self._mapped.chunk_ids, chunk_ids)]
+        return np.fromiter((self.lengths[chunk_id] for chunk_id in chunk_ids.tolist()), dtype="float64", count=len(chunk_ids))
+
+    def _identifier_ids(self, key: str):
+        if self._mapped is not None:
+            return self._mapped.identifier_ids(key)
+        return self.identifiers.get(key, ())
+
+    def _thaw(self):
+        """Copies a memory-mapped index into dicts before its first change."""
+        if self._mapped is None:
+            return
+        mapped, self._mapped = self._mapped, None
+        self.lengths = dict(zip(mapped.chunk_ids.tolist(), mapped.lengths.tolist()))
+        self.postings = {
+            word: dict(zip(ids.tolist(), frequencies.tolist()))
+            for word, (ids, frequencies) in zip(mapped.words(), map(mapped.postings_at, range(mapped.vocabulary)))
+        }
+        self.identifiers = {
+            key: set(mapped.identifier_ids_at(row)) for row, key in enumerate(mapped.keys())
+        }
+
+    def save(self, path: str, revision: str):
+        """Atomically writes the index, tagged with the revision of the store it matches."""
+        if self._mapped is not None:
+            sections = self._mapped.sections
+        else:
+            chunk_ids = np.array(sorted(self.lengths), dtype="int64")
+            words = sorted(self.postings)
+            keys = sorted(self.identifiers)
+            sections = {
+                "chunk_ids": chunk_ids,
+                "lengths": np.array([self.lengths[chunk_id] for chunk_id in chunk_ids.tolist()], dtype="int32"),
+                **_csr("words", "postings", words, [self.postings[word] for word in words]),
+                "frequencies": np.array(
+                    [n for word in words for n in self.postings[word].values()], dtype="int32"
+                ),
+                **_csr("keys", "identifier_ids", keys, [sorted(self.identifiers[key]) for key in keys]),
+            }
+        header = {
+            "format_version": FORMAT_VERSION,
+            "revision": revision,
+            "total_length": self.total_length,
+            "sections": [[name, array.dtype.str, len(array)] for name, array in sections.items()],
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for array in sections.values():
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, revision: str) -> "LexicalIndex | None":
+        """
+        Memory-maps a saved index.
+
+        Returns:
+            LexicalIndex | None: The index, or None if the file is missing, unreadable, in
+            another format or was saved for a different store revision.
+        """
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                header_size = int(np.frombuffer(f.read(8), dtype="uint64")[0])
+                header = json.loads(f.read(header_size))
+        except (OSError, ValueError, IndexError):
+            return None
+        if header.get("format_version") != FORMAT_VERSION or header.get("revision") != revision:
+            return None
+
+        data = np.memmap(path, dtype="uint8", mode="r")
+        sections, position = {}, len(MAGIC) + 8 + header_size
+        for name, dtype, count in header["sections"]:
+            position = _align(position)
+            size = count * np.dtype(dtype).itemsize
+            sections[name] = data[position:position + size].view(dtype)
+            position += size
+
+        index = cls()
+        index.total_length = header["total_length"]
+        index._mapped = _MappedLexicon(sections)
+        return index
+
+
+class _MappedLexicon:
+    """Read-only lookups over the arrays of a saved lexical index."""
+
+    def __init__(self, sections: dict[str, np.ndarray]):
+        self.sections = sections
+        self.chunk_ids = sections["chunk_ids"]
+        self.lengths = sections["lengths"]
+        self.vocabulary = len(sections["words_offsets"]) - 1
+
+    def postings(self, word: str) -> tuple[np.ndarray, np.ndarray]:
+        row = _find(self.sections["words_offsets"], self.sections["words"], word)
+        if row < 0:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float64")
+        return self.postings_at(row)
+
+    def postings_at(self, row: int) -> tuple[np.ndarray, np.ndarray]:
+        start, end = self.sections["postings_offsets"][row:row + 2]
+        return self.sections["postings"][start:end], self.sections["frequencies"][start:end].astype("float64")
+
+    def identifier_ids(self, key: str) -> list[int]:
+        row = _find(self.sections["keys_offsets"], self.sections["keys"], key)
+        return self.identifier_ids_at(row) if row >= 0 else []
+
+    def identifier_ids_at(self, row: int) -> list[int]:
+        start, end = self.sections["identifier_ids_offsets"][row:row + 2]
+        return self.sections["identifier_ids"][start:end].tolist()
+
+    def words(self) -> list[str]:
+        return _strings(self.sections["words_offsets"], self.sections["words"])
+
+    def keys(self) -> list[str]:
+        return _strings(self.sections["keys_offsets"], self.sections["keys"])
+
+
+def _csr(strings_name: str, values_name: str, strings: list[str], values: list) -> dict[str, np.ndarray]:
+    """Sorted strings as a UTF-8 blob with offsets, and a list of ID lists (or dicts) as CSR arrays."""
+    encoded = [string.encode("utf-8") for string in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(blob) for blob in encoded], out=string_offsets[1:])
+    value_offsets = np.zeros(len(values) + 1, dtype="int64")
+    np.cumsum([len(ids) for ids in values], out=value_offsets[1:])
+    return {
+        strings_name + "_offsets": string_offsets,
+        strings_name: np.frombuffer(b"".join(encoded), dtype="uint8"),
+        values_name + "_offsets": value_offsets,
+        values_name: np.array([chunk_id for ids in values for chunk_id in ids], dtype="int64"),
+    }
+
+
+def _find(offsets: np.ndarray, blob: np.ndarray, string: str) -> int:
+    """Row of ``string`` in a sorted blob of strings, or -1."""
+    target = string.encode("utf-8")
+    low, high = 0, len(offsets) - 1
+    while low < high:
+        middle = (low + high) // 2
+        if blob[offsets[middle]:offsets[middle + 1]].tobytes() < target:
+            low = middle + 1
+        else:
+            high = middle
+    if low < len(offsets) - 1 and blob[offsets[low]:offsets[low + 1]].tobytes() == target:
+        return low
+    return -1
+
+
+def _strings(offsets: np.ndarray, blob: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+
+def _align(position: int, alignment: int = 8) -> int:
+    return (position + alignment - 1) // alignment * alignment
+
+
+def _discard(table: dict, key, chunk_id: int):
+    entries = table.get(key)
+    if entries is None:
+        return
+    if isinstance(entries, dict):
+        entries.pop(chunk_id, None)
+    else:
+        entries.discard(chunk_id)
+    if not entries:
+        del table[key]
@@ -0,0 +1,130 @@
+"""Ingest Manifest Module
+
+Tracks which PDFs are in the global index, the content hash they were
+ingested with and the chunk IDs they own, so that re-running the ingest only
+touches files that were added, changed or removed.
+"""
+import hashlib
+import json
+import os
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """Returns the hex SHA-256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    Per-PDF record of what is stored in the index.
+
+    Each entry is keyed by file name and holds the file's content hash, the
+    size/mtime it was hashed at (to skip re-hashing untouched files) and the
+    half-open range of chunk IDs allocated to it. The manifest is only valid
+    for the ingest ``settings`` (chunker and embedding model) it was built with.
+    """
+
+    VERSION = 1
+
+    def __init__(self, settings: dict):
+        self.settings = dict(settings)
+        self.files: dict[str, dict] = {}
+        self.next_id = 0
+
+    @classmethod
+    def load(cls, path: str, settings: dict) -> "IngestManifest":
+        """
+        Loads a manifest from disk.
+
+        Returns an empty manifest if the file is missing, unreadable, or was
+        written with different ingest settings (which forces a full rebuild).
+        """
+        manifest = cls(settings)
+        if not os.path.exists(path):
+            return manifest
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+
+        if data.get("version") != cls.VERSION or data.get("settings") != manifest.settings:
+            return manifest
+
+        manifest.files = data.get("files", {})
+        manifest.next_id = int(data.get("next_id", 0))
+        return manifest
+
+    def save(self, path: str):
+        """Atomically writes the manifest as JSON."""
+        data = {
+            "version": self.VERSION,
+            "settings": self.settings,
+            "next_id": self.next_id,
+            "files": self.files,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def file_hash(self, name: str, file_path: str) -> str:
+        """Returns the content hash of a file, reusing the stored one if size and mtime are unchanged."""
+        stat = os.stat(file_path)
+        entry = self.files.get(name)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry["sha256"]
+        return file_sha256(file_path)
+
+    def diff(self, current: dict[str, str]) -> tuple[list[str], list[str], list[str]]:
+        """
+        Compares the manifest against the files currently on disk.
+
+        Args:
+            current (dict[str, str]): File name -> content hash.
+
+        Returns:
+            tuple: (added, changed, removed) file names, each sorted.
+        """
+        added = sorted(name for name in current if name not in self.files)
+        changed = sorted(
+            name for name, sha in current.items()
+            if name in self.files and self.files[name]["sha256"] != sha
+        )
+        removed = sorted(name for name in self.files if name not in current)
+        return added, changed, removed
+
+    def allocate_ids(self, count: int) -> range:
+        """Reserves ``count`` consecutive chunk IDs."""
+        ids = range(self.next_id, self.next_id + count)
+        self.next_id += count
+        return ids
+
+    def record(self, name: str, file_path: str, sha256: str, ids: range):
+        """Records a file as ingested with the given chunk IDs."""
+        stat = os.stat(file_path)
+        self.files[name] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "ids": [ids.start, ids.stop],
+        }
+
+    def forget(self, name: str) -> range:
+        """Drops a file from the manifest and returns the chunk IDs it owned."""
+        entry = self.files.pop(name, None)
+        if entry is None:
+            return range(0)
+        return range(*entry["ids"])
+
+    def chunk_ids(self) -> set[int]:
+        """Returns every chunk ID referenced by the manifest."""
+        ids = set()
+        for entry in self.files.values():
+            ids.update(range(*entry["ids"]))
+        return ids
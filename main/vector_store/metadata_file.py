@@ -0,0 +1,126 @@
+"""Chunk Metadata File Module
+
+Binary, memory-mappable storage for the chunk texts of a FaissStore.
+
+Layout::
+
+    b"RAGMETA1" | uint64 header size | JSON header | padding to 8 bytes
+    | ids (int64, sorted) | offsets (int64, count + 1) | UTF-8 text blob
+
+The JSON header records the format version, embedding dimension, model and
+index settings, so a store can be opened without being told what it holds.
+Reading maps the file read-only: processes serving the same index share one
+page-cached copy, and opening it costs the same for any corpus size.
+"""
+import json
+import os
+from collections.abc import Mapping
+import numpy as np
+
+MAGIC = b"RAGMETA1"
+FORMAT_VERSION = 1
+
+
+def write_metadata(path: str, header: dict, ids: np.ndarray, texts: list[str]):
+    """
+    Atomically writes chunk IDs and texts with a JSON header.
+
+    Args:
+        path (str): Destination file.
+        header (dict): Store settings to record (dim, model, index_spec, ...).
+        ids (np.ndarray): Chunk IDs, in the same order as ``texts``.
+        texts (list[str]): Chunk texts.
+    """
+    ids = np.asarray(ids, dtype="int64")
+    order = np.argsort(ids, kind="stable")
+    encoded = [texts[i].encode("utf-8") for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype="int64")
+    np.cumsum([len(blob) for blob in encoded], out=offsets[1:])
+
+    header = dict(header, format_version=FORMAT_VERSION, count=len(encoded))
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        f.write(ids[order].tobytes())
+        f.write(offsets.tobytes())
+        for blob in encoded:
+            f.write(blob)
+    os.replace(tmp_path, path)
+
+
+def read_header(path: str) -> tuple[dict, int]:
+    """
+    Reads only the JSON header of a metadata file.
+
+    Returns:
+        tuple: (header dict, header size in bytes).
+
+    Raises:
+        ValueError: If the file is not in this format.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a chunk metadata file")
+        header_size = int(np.frombuffer(f.read(8), dtype="uint64")[0])
+        header = json.loads(f.read(header_size))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported metadata format version: {header.get('format_version')}")
+    return header, header_size
+
+
+def read_metadata(path: str) -> tuple[dict, "MappedTexts"]:
+    """
+    Memory-maps a metadata file written by ``write_metadata``.
+
+    Returns:
+        tuple: (header dict, read-only mapping of chunk ID -> text).
+
+    Raises:
+        ValueError: If the file is not in this format.
+    """
+    header, header_size = read_header(path)
+
+    count = header["count"]
+    data_start = _align(len(MAGIC) + 8 + header_size)
+    data = np.memmap(path, dtype="uint8", mode="r")
+    ids = data[data_start:data_start + count * 8].view("int64")
+    offsets_start = data_start + count * 8
+    offsets = data[offsets_start:offsets_start + (count + 1) * 8].view("int64")
+    blob = data[offsets_start + (count + 1) * 8:]
+    return header, MappedTexts(ids, offsets, blob)
+
+
+def is_metadata_file(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class MappedTexts(Mapping):
+    """Read-only chunk ID -> text mapping over memory-mapped arrays; texts are decoded on access."""
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, blob: np.ndarray):
+        self.ids = ids
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, chunk_id: int) -> str:
+        row = int(np.searchsorted(self.ids, chunk_id))
+        if row >= len(self.ids) or self.ids[row] != chunk_id:
+            raise KeyError(chunk_id)
+        return self.blob[self.offsets[row]:self.offsets[row + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        return iter(self.ids.tolist())
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _align(position: int, alignment: int = 8) -> int:
+    return (position + alignment - 1) // alignment * alignment
@@ -0,0 +1,90 @@
+"""Chunk Provenance Module
+
+Records where each chunk came from, as compact parallel arrays: a sorted
+int64 array of chunk IDs and an int32 (n, 4) array of (document, page, start,
+end) rows, with document numbers indexing a list of file names. That is 24
+bytes per chunk, with no copy of the chunk text.
+"""
+import os
+from typing import NamedTuple
+import numpy as np
+
+
+class Source(NamedTuple):
+    file: str
+    page: int  # 1-based; -1 if unknown
+    start: int  # Character offsets of the chunk in the extracted document text
+    end: int
+
+
+class ProvenanceTable:
+    """Chunk ID -> Source lookup backed by numpy arrays."""
+
+    def __init__(self):
+        self.files: list[str] = []
+        self._file_numbers: dict[str, int] = {}
+        self.ids = np.empty(0, dtype="int64")
+        self.rows = np.empty((0, 4), dtype="int32")
+        self._pending = []  # (ids, rows) added since the arrays were last merged
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self.ids)
+
+    def add(self, ids, sources: list[tuple[str, int, int, int]]):
+        """
+        Records the (file, page, start, end) of each chunk; replaces earlier records of the same IDs.
+        """
+        if not len(sources):
+            return
+        rows = np.empty((len(sources), 4), dtype="int32")
+        for row, (file, page, start, end) in enumerate(sources):
+            number = self._file_numbers.get(file)
+            if number is None:
+                number = self._file_numbers[file] = len(self.files)
+                self.files.append(file)
+            rows[row] = (number, page, start, end)
+        self._pending.append((np.asarray(ids, dtype="int64"), rows))
+
+    def remove(self, ids):
+        self._merge()
+        keep = ~np.isin(self.ids, np.asarray(list(ids), dtype="int64"))
+        self.ids, self.rows = self.ids[keep], self.rows[keep]
+
+    def get(self, chunk_id: int) -> Source | None:
+        self._merge()
+        row = int(np.searchsorted(self.ids, chunk_id))
+        if row >= len(self.ids) or self.ids[row] != chunk_id:
+            return None
+        number, page, start, end = self.rows[row].tolist()
+        return Source(self.files[number], page, start, end)
+
+    def _merge(self):
+        """Folds pending additions into the sorted arrays; later records of an ID win."""
+        if not self._pending:
+            return
+        ids = np.concatenate([self.ids] + [ids for ids, _ in self._pending])
+        rows = np.concatenate([self.rows] + [rows for _, rows in self._pending])
+        self._pending = []
+        # Last occurrence of each ID: unique over the reversed arrays
+        unique, first = np.unique(ids[::-1], return_index=True)
+        self.ids, self.rows = unique, rows[::-1][first]
+
+    def save(self, path: str):
+        self._merge()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=self.ids, rows=self.rows, files=np.array(self.files, dtype=str))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ProvenanceTable":
+        """Reads a saved table; a missing file gives an empty one (indexes built before provenance)."""
+        table = cls()
+        if not os.path.exists(path):
+            return table
+        with np.load(path, allow_pickle=False) as data:
+            table.ids, table.rows = data["ids"], data["rows"]
+            table.files = data["files"].tolist()
+        table._file_numbers = {file: number for number, file in enumerate(table.files)}
+        return table
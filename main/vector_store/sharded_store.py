@@ -0,0 +1,219 @@
+"""Sharded Store Module
+
+Named collections (e.g. one per product family) stored as separate FAISS
+shards, each with its own index, metadata, lexical index and manifest, so one
+collection can be rebuilt without touching the others.
+
+Shards are opened lazily on their first search. A query fans out to the
+selected shards on a thread pool and the per-shard results are merged into a
+global top-k by score. Every shard reports cosine similarities (hybrid
+search fuses by rank but returns each chunk's similarity), so scores from
+different shards are comparable. Chunk IDs are made unique across shards by
+putting the collection's ordinal in the high bits: ``ordinal << SHARD_BITS | local_id``.
+The default collection has ordinal 0, so its chunk IDs are unchanged.
+"""
+import contextvars
+import hashlib
+import heapq
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from main import metrics
+from main.config import Config
+from main.vector_store import faiss_indexer
+from main.vector_store.metadata_file import read_header
+from main.vector_store.provenance import Source
+
+logger = logging.getLogger(__name__)
+
+SHARD_BITS = 40  # Up to 2**40 chunks per shard
+DEFAULT_COLLECTION = "global"
+
+_executor = ThreadPoolExecutor(max_workers=Config.SHARD_WORKERS, thread_name_prefix="shard")
+
+
+def global_id(ordinal: int, local_id: int) -> int:
+    return ordinal << SHARD_BITS | local_id
+
+
+def split_id(chunk_id: int) -> tuple[int, int]:
+    """Returns the (ordinal, local ID) a global chunk ID was made from."""
+    return chunk_id >> SHARD_BITS, chunk_id & ((1 << SHARD_BITS) - 1)
+
+
+class Shard:
+    """
+    One collection's FaissStore, loaded on first use.
+
+    Args:
+        name (str): Collection name.
+        ordinal (int): Number of the collection, stored in the high bits of its chunk IDs.
+        index_path (str): Saved index (``.index``; metadata and lexical files sit next to it).
+        store (FaissStore | None): Already loaded store, if any.
+    """
+
+    def __init__(self, name: str, ordinal: int, index_path: str, store=None):
+        self.name = name
+        self.ordinal = ordinal
+        self.index_path = index_path
+        self._store = store
+        self._saved_header = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._store is not None
+
+    @property
+    def revision(self) -> str:
+        """The store's revision; read from the saved metadata header while not loaded."""
+        if self._store is not None:
+            return self._store.revision
+        return self._header().get("revision") or ""
+
+    @property
+    def model(self) -> str | None:
+        """Fingerprint of the embedding model the shard's vectors come from (None if unrecorded)."""
+        if self._store is not None:
+            return self._store.model_name
+        return self._header().get("model")
+
+    def _header(self) -> dict:
+        if self._saved_header is None:
+            try:
+                self._saved_header, _ = read_header(os.path.splitext(self.index_path)[0] + ".meta")
+            except (OSError, ValueError):
+                self._saved_header = {}
+        return self._saved_header
+
+    def get(self):
+        """Returns the store, loading it on first use."""
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    with metrics.span("shard_load", collection=self.name):
+                        self._store = faiss_indexer.load_faiss_index(self.index_path)
+                    logger.debug("Loaded collection '%s' (%d chunks)", self.name, self._store.index.ntotal)
+        return self._store
+
+    def search(self, query_text: str, model, k: int) -> list[tuple[int, str, float]]:
+        """Top-k (global chunk ID, text, score) triples of this shard."""
+        results = faiss_indexer.search_store(self.get(), query_text, model, k)
+        return [(global_id(self.ordinal, chunk_id), text, score) for chunk_id, text, score in results]
+
+    def search_batch(self, query_texts: list[str], model, k: int) -> list[list[tuple[int, str, float]]]:
+        """Top-k (global chunk ID, text, score) triples of this shard for each query."""
+        results = faiss_indexer.search_store_batch(self.get(), query_texts, model, k)
+        return [
+            [(global_id(self.ordinal, chunk_id), text, score) for chunk_id, text, score in hits] for hits in results
+        ]
+
+
+class ShardedStore:
+    """
+    Searches a set of collection shards as one index.
+
+    Args:
+        shards (list[Shard]): The collections; names and ordinals must be unique.
+    """
+
+    def __init__(self, shards: list[Shard]):
+        self.shards = {shard.name: shard for shard in shards}
+        self._by_ordinal = {shard.ordinal: shard for shard in shards}
+
+    @property
+    def collections(self) -> list[str]:
+        return sorted(self.shards)
+
+    @property
+    def revision(self) -> str:
+        """Changes whenever any shard's contents change; loading a shard does not change it."""
+        digest = hashlib.sha1()
+        for name in self.collections:
+            digest.update(f"{name}:{self.shards[name].revision};".encode())
+        return digest.hexdigest()
+
+    @property
+    def version(self) -> str:
+        return self.revision
+
+    @property
+    def ntotal(self) -> int:
+        """Chunks in all collections (loads every shard)."""
+        return sum(shard.get().index.ntotal for shard in self.shards.values())
+
+    def source(self, chunk_id: int) -> Source | None:
+        """Source file, page and offsets of a chunk, by global chunk ID."""
+        ordinal, local_id = split_id(chunk_id)
+        shard = self._by_ordinal.get(ordinal)
+        return shard.get().source(local_id) if shard is not None else None
+
+    def warm_up(self):
+        """Loads every shard, and its lexical index if used, ahead of the first query."""
+        for shard in self.shards.values():
+            store = shard.get()
+            if Config.HYBRID_RETRIEVAL:
+                store.lexical  # Loaded or rebuilt on first access
+        logger.debug("Loaded %d collections", len(self.shards))
+
+    def search_text(self, query_text: str, model, k: int = 5, collections: list[str] | None = None) -> list[tuple]:
+        """
+        Searches the selected shards in parallel and merges their results.
+
+        Args:
+            query_text (str): Query.
+            model: SentenceTransformer for the query embedding (encoded once, shared by all shards).
+            k (int): Number of results overall.
+            collections (list[str] | None): Collections to search; None for all.
+
+        Returns:
+            list[tuple[int, str, float]]: The top-k (global chunk ID, text, score) triples.
+        """
+        shards = self._select(collections)
+        with metrics.span("fan_out", shards=len(shards)):
+            if len(shards) == 1:
+                results = [shards[0].search(query_text, model, k)]
+            else:
+                # Each task gets its own copy of the context so its spans join the caller's trace
+                futures = [
+                    _executor.submit(contextvars.copy_context().run, shard.search, query_text, model, k)
+                    for shard in shards
+                ]
+                results = [future.result() for future in futures]
+        return _merge(results, k)
+
+    def search_text_batch(
+        self, query_texts: list[str], model, k: int = 5, collections: list[str] | None = None
+    ) -> list[list[tuple]]:
+        """
+        Like ``search_text`` for several queries: each selected shard searches all of them
+        in one batch, and the results are merged per query.
+
+        Returns:
+            list[list[tuple[int, str, float]]]: The top-k triples of each query, in input order.
+        """
+        shards = self._select(collections)
+        # Encoded once here; the shards find the embeddings in the query embedding cache
+        faiss_indexer.embed_queries(query_texts, model)
+        with metrics.span("fan_out", shards=len(shards), queries=len(query_texts)):
+            futures = [
+                _executor.submit(contextvars.copy_context().run, shard.search_batch, query_texts, model, k)
+                for shard in shards
+            ]
+            per_shard = [future.result() for future in futures]
+        return [_merge(hits, k) for hits in zip(*per_shard)] if per_shard else [[] for _ in query_texts]
+
+    def _select(self, collections: list[str] | None) -> list[Shard]:
+        if not collections:
+            return list(self.shards.values())
+        unknown = set(collections) - set(self.shards)
+        if unknown:
+            logger.warning("Unknown collections ignored: %s", ", ".join(sorted(unknown)))
+        return [self.shards[name] for name in sorted(set(collections) & set(self.shards))]
+
+
+def _merge(results, k: int) -> list[tuple]:
+    """Global top-k of the per-shard results by score (cosine similarity in every shard)."""
+    return heapq.nlargest(k, (result for hits in results for result in hits), key=lambda result: result[2])
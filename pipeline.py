@@ -3,15 +3,26 @@
 import os
 import logging
 import argparse
-from main.extractor import pdf_extractor
+import json
+import time
+from typing import TYPE_CHECKING
+import numpy as np
 from main.chunker import text_chunker
+from main.embedder import backend as embedding_backend
 from main.embedder import embedder
 from main.vector_store import faiss_indexer
+from main.vector_store.manifest import IngestManifest
+from main.vector_store.sharded_store import DEFAULT_COLLECTION, Shard, ShardedStore
 from main.config import Config
 from main.llm.ollama_client import OllamaClient
-from main.intent_detector import IntentDetector
+from main.intent_classifier import create_intent_detector
+from main.ingest_pipeline import IngestPipeline
+from main import batch_qa, metrics, rag_pipeline
 from main.logger_config import setup_logging
 
+if TYPE_CHECKING:
+    from main.intent_detector import IntentDetector
+
 
 MAX_HISTORY_LENGTH = 10
 
@@ -21,15 +32,15 @@ logger = logging.getLogger(__name__)
 
 SAMPLE_DIR = Config.SAMPLE_DIR
 DEBUG_OUTPUT_DIR = Config.DEBUG_OUTPUT_DIR
-FAISS_INDEX_PATH = os.path.join("faiss_index", "global.index")
-
+INDEX_DIR = "faiss_index"
+FAISS_INDEX_PATH = os.path.join(INDEX_DIR, "global.index")
+MANIFEST_PATH = os.path.join(INDEX_DIR, "global.manifest.json")
+COLLECTIONS_PATH = os.path.join(INDEX_DIR, "collections.json")
 
-os.makedirs(DEBUG_OUTPUT_DIR, exist_ok=True)
-os.makedirs(os.path.dirname(FAISS_INDEX_PATH), exist_ok=True)
 
-
-def save_debug_outputs(filename: str, chunks: list[str], embeddings: list[list[float]]):
+def save_debug_outputs(filename: str, chunks: list[str], embeddings: np.ndarray):
     """Save chunks and embeddings to debug files."""
+    os.makedirs(DEBUG_OUTPUT_DIR, exist_ok=True)
     # Save chunks
     debug_path = os.path.join(DEBUG_OUTPUT_DIR, f"{filename}.md")
     with open(debug_path, "w", encoding="utf-8") as f:
@@ -39,26 +50,10 @@ def save_debug_outputs(filename: str, chunks: list[str], embeddings: list[list[f
 
     # Save embeddings
     debug_embed_path = os.path.join(DEBUG_OUTPUT_DIR, f"{filename}.embeddings.txt")
-    with open(debug_embed_path, "w", encoding="utf-8") as f:
-        for i, emb in enumerate(embeddings, start=1):
-            f.write(f"Embedding {i}: {emb}\n")
+    np.savetxt(debug_embed_path, embeddings, fmt="%.6f", header=f"{len(embeddings)} embeddings, one per line")
     logger.debug("Embeddings saved to: %s", debug_embed_path)
 
 
-def build_prompt(context: str, query: str, history: list[tuple[str, str]]) -> str:
-    conversation = ""
-    for i, (prev_q, prev_a) in enumerate(history, start=1):
-        conversation += f"\nQ{i}: {prev_q}\nA{i}: {prev_a}"
-    
-    return (
-        "You are a professional HVAC systems consultant. "
-        "Use ONLY the context below to answer the following customer question.\n"
-        "Answer in a concise, informative paragraph. If the context does not contain the answer, "
-        "say 'The context does not provide enough information.'\n\n"
-        f"{conversation}\n\nContext:\n{context}\n\nQuestion: {query}"
-    )
-
-
 def detect_intent(text: str) -> str:
     lowered = text.lower().strip()
 
@@ -85,102 +80,241 @@ def detect_intent(text: str) -> str:
     return "rag"
 
 
-def build_global_index(force: bool = False):
-    """Extract, chunk, and embed all PDFs and return a global index."""
-    if os.path.exists(FAISS_INDEX_PATH) and not force:
-        logger.info("Global index already exists. Skipping reprocessing.")
-        return faiss_indexer.load_faiss_index(FAISS_INDEX_PATH)
-
-    all_chunks = []
-    all_embeddings = []
-
-    pdf_files = [f for f in os.listdir(SAMPLE_DIR) if f.lower().endswith(".pdf")]
-    if not pdf_files:
-        logger.warning("No PDF files found.")
-        return None
-
-    for file in pdf_files:
-        file_path = os.path.join(SAMPLE_DIR, file)
-        logger.debug("Processing: %s", file)
-
-        text = pdf_extractor.extract_text_from_pdf(file_path)
-        if not text.strip():
-            logger.warning("No text extracted from %s", file)
-            continue
+def _ingest_settings() -> dict:
+    """Settings that invalidate every stored chunk when they change."""
+    return {
+        "chunk_size": Config.CHUNK_SIZE,
+        "chunk_overlap": Config.CHUNK_OVERLAP,
+        "chunker": text_chunker.CHUNKER_VERSION,
+        "embedding_model": embedding_backend.fingerprint(),
+        "index_spec": Config.FAISS_INDEX_SPEC,
+    }
+
+
+def find_collections() -> dict[str, str]:
+    """
+    Maps collection names to their PDF folders: PDFs directly in SAMPLE_DIR form
+    the default collection, and each subfolder with PDFs is a collection of its own.
+    """
+    sources = {}
+    if _pdf_files(SAMPLE_DIR):
+        sources[DEFAULT_COLLECTION] = SAMPLE_DIR
+    for entry in sorted(os.listdir(SAMPLE_DIR)):
+        folder = os.path.join(SAMPLE_DIR, entry)
+        if entry != DEFAULT_COLLECTION and os.path.isdir(folder) and _pdf_files(folder):
+            sources[entry] = folder
+    return sources
+
+
+def collection_paths(name: str) -> tuple[str, str]:
+    """Index and manifest paths of a collection; the default one keeps the original global.* files."""
+    if name == DEFAULT_COLLECTION:
+        return FAISS_INDEX_PATH, MANIFEST_PATH
+    folder = os.path.join(INDEX_DIR, name)
+    return os.path.join(folder, "index.index"), os.path.join(folder, "manifest.json")
+
+
+def build_global_index(force: bool = False, stats: dict | None = None, collections: list[str] | None = None):
+    """
+    Bring the collection indexes in sync with the PDFs in SAMPLE_DIR and return them.
+
+    Only PDFs that were added or whose content changed since the last run are
+    extracted, chunked, and embedded; chunks of changed or removed PDFs are
+    deleted from the index. ``force`` discards the existing index and manifest.
+    If ``stats`` is given, it receives the StageStats of each ingest stage.
+
+    Each collection (see ``find_collections``) is a separate shard. Only the
+    ``collections`` named are synced (all by default); the others are opened
+    as they are. Up-to-date shards are loaded on their first search.
+
+    Returns:
+        ShardedStore | None: All collections with data, or None if there are none.
+    """
+    with metrics.trace("ingest", force=force) as attrs:
+        stats = {} if stats is None else stats
+        sources = find_collections()
+        if not sources:
+            logger.warning("No PDF files found.")
+            return None
+
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        ordinals = _collection_ordinals(sources)
+        shards = []
+        # Worker processes are only started if some collection has chunks to embed
+        with embedder.worker_pool():
+            for name in sorted(sources):
+                index_path, _ = collection_paths(name)
+                if collections is None or name in collections:
+                    shard_stats = {}
+                    shard = _sync_collection(name, sources[name], ordinals[name], force, shard_stats)
+                    prefix = "" if name == DEFAULT_COLLECTION else f"{name}/"
+                    stats.update({prefix + stage: stage_stats for stage, stage_stats in shard_stats.items()})
+                elif os.path.exists(index_path):
+                    shard = Shard(name, ordinals[name], index_path)
+                    if shard.model not in (None, embedding_backend.fingerprint()):
+                        # Vectors of different models (or quantizations) are not comparable
+                        logger.warning(
+                            "Collection '%s' was embedded with %s, not %s; it is left out until it is synced.",
+                            name, shard.model, embedding_backend.fingerprint(),
+                        )
+                        shard = None
+                else:
+                    shard = None
+                if shard is not None:
+                    shards.append(shard)
+
+        attrs["collections"] = len(shards)
+        attrs["pipeline_stages"] = {name: {"items": stage.items, "busy_seconds": stage.busy_seconds} for name, stage in stats.items()}
+        if not shards:
+            logger.warning("No data to build global FAISS index.")
+            return None
+        return ShardedStore(shards)
+
+
+def _pdf_files(folder: str) -> list[str]:
+    return sorted(f for f in os.listdir(folder) if f.lower().endswith(".pdf"))
+
+
+def _collection_ordinals(sources: dict[str, str]) -> dict[str, int]:
+    """Stable ordinals of collections (used in chunk IDs), recorded in COLLECTIONS_PATH."""
+    ordinals = {DEFAULT_COLLECTION: 0}
+    if os.path.exists(COLLECTIONS_PATH):
+        with open(COLLECTIONS_PATH, "r", encoding="utf-8") as f:
+            ordinals.update(json.load(f))
+    new = [name for name in sorted(sources) if name not in ordinals]
+    for name in new:
+        ordinals[name] = max(ordinals.values()) + 1
+    if new:
+        with open(COLLECTIONS_PATH, "w", encoding="utf-8") as f:
+            json.dump(ordinals, f, indent=2)
+    return ordinals
+
+
+def _sync_collection(name: str, source_dir: str, ordinal: int, force: bool, stats: dict) -> Shard | None:
+    pdf_files = _pdf_files(source_dir)
+    index_path, manifest_path = collection_paths(name)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+
+    settings = _ingest_settings()
+    manifest = IngestManifest(settings) if force else IngestManifest.load(manifest_path, settings)
+    if not os.path.exists(index_path):
+        manifest = IngestManifest(settings)
+
+    with metrics.span("hash", files=len(pdf_files), collection=name):
+        hashes = {file: manifest.file_hash(file, os.path.join(source_dir, file)) for file in pdf_files}
+    added, changed, removed = manifest.diff(hashes)
+
+    if manifest.files and not (added or changed or removed):
+        logger.info("Collection '%s' is up to date. Skipping reprocessing.", name)
+        return Shard(name, ordinal, index_path)
+
+    index = None
+    if manifest.files:
+        try:
+            index = faiss_indexer.load_faiss_index(index_path)
+        except (OSError, RuntimeError, ValueError) as e:
+            logger.warning("Could not load the index of collection '%s', rebuilding it: %s", name, e)
+            manifest = IngestManifest(settings)
+            added, changed, removed = manifest.diff(hashes)
+
+    stale_ids = set()
+    if index is not None:
+        # Chunks left behind by an interrupted run are not owned by any file.
+        stale_ids.update(set(index.ids().tolist()) - manifest.chunk_ids())
+        manifest.next_id = max(manifest.next_id, index.next_id)
+
+    logger.info(
+        "Syncing collection '%s': %d added, %d changed, %d removed", name, len(added), len(changed), len(removed)
+    )
 
-        chunks = text_chunker.chunk_text(text)
-        if not chunks:
-            logger.warning("No chunks created for %s", file)
+    for file in changed + removed:
+        stale_ids.update(manifest.forget(file))
+    if index is not None and stale_ids:
+        with metrics.span("remove", chunks=len(stale_ids)):
+            removed_count = index.remove(stale_ids)
+        logger.debug("Removed %d stale chunks from collection '%s'", removed_count, name)
+
+    to_process = [os.path.join(source_dir, file) for file in added + changed]
+    ingest = IngestPipeline(
+        index,
+        next_id=manifest.next_id,
+        batch_size=Config.INGEST_BATCH_SIZE,
+        queue_size=Config.INGEST_QUEUE_SIZE,
+        keep_outputs=Config.DEBUG,
+    )
+    start = time.perf_counter()
+    for result in ingest.run(to_process):
+        file = os.path.basename(result.file_path)
+        if result.error:
+            # Left out of the manifest so it is retried on the next run.
+            logger.error("Skipping %s: %s", file, result.error)
             continue
 
-        logger.debug("Created %d chunks from %s", len(chunks), file)
-        embeddings = embedder.embed_text_chunks(chunks)
-        if not embeddings:
-            logger.warning("No embeddings created for %s", file)
-            continue
+        # Files without chunks are recorded too, so they are not retried until their content changes.
+        manifest.record(file, result.file_path, hashes[file], result.ids)
+        logger.debug("Indexed %d chunks from %s", len(result.ids), file)
+        if Config.DEBUG and result.chunks:
+            save_debug_outputs(file, result.chunks, result.embeddings)
 
-        logger.debug("Generated %d embeddings from %s", len(embeddings), file)
-        if Config.DEBUG:
-            save_debug_outputs(file, chunks, embeddings)
+    metrics.record_span("pipeline", time.perf_counter() - start, files=len(to_process))
 
-        all_chunks.extend(chunks)
-        all_embeddings.extend(embeddings)
+    index = ingest.store
+    manifest.next_id = ingest.next_id
+    stats.update(ingest.stats)
+    embedder.flush_cache()
 
-    if not all_chunks or not all_embeddings:
-        logger.warning("No data to build global FAISS index.")
+    if index is None or index.index.ntotal == 0:
+        logger.warning("No data to build the index of collection '%s'.", name)
         return None
 
-    logger.debug("Building global FAISS index...")
-    index = faiss_indexer.build_faiss_index(all_embeddings, all_chunks)
-    faiss_indexer.save_faiss_index(index, FAISS_INDEX_PATH)
-    logger.debug("Global FAISS index saved to: %s", FAISS_INDEX_PATH)
+    with metrics.span("save"):
+        faiss_indexer.save_faiss_index(index, index_path)
+        manifest.save(manifest_path)
+    logger.debug("FAISS index of collection '%s' saved to: %s", name, index_path)
+
+    return Shard(name, ordinal, index_path, index)
+
 
-    return index
+def query_and_respond(
+    index,
+    query_text: str,
+    llm,
+    history: list[tuple[str, str]],
+    intent_detector: "IntentDetector",
+    collections: list[str] | None = None,
+):
+    """Query the index (optionally only some collections) and generate a response using LLM."""
 
+    with metrics.trace("query"):
+        stream = rag_pipeline.stream_query(index, query_text, llm, history, intent_detector, collections=collections)
+        if stream is None:
+            return
 
-def query_and_respond(index, query_text: str, llm, history: list[tuple[str, str]], intent_detector: IntentDetector):
-    """Query global index and generate a response using LLM."""
+        print("\nAssistant: ", end="", flush=True)
+        parts = []
+        for delta in stream:
+            print(delta, end="", flush=True)
+            parts.append(delta)
+        print()
+    history.append((query_text, "".join(parts)))
 
-    intent = intent_detector.detect(query_text)
+    # Limit history length (in blocks, to keep the prompt prefix stable between turns)
+    history[:] = rag_pipeline.recent_history(history, MAX_HISTORY_LENGTH)
 
 
-    if intent == "greeting":
-        response = "Hello! I'm your Armstrong assistant. Ask me a technical question and I’ll look it up for you."
-    elif intent == "thanks":
-        response = "You're welcome! Let me know if you have more questions."
-    elif intent == "goodbye":
-        response = "Goodbye! Feel free to come back with more questions anytime."
-    elif intent == "help":
-        response = "I can help answer questions about your HVAC questions and Armstrong products. Ask me something specific!"
-    elif intent == "vague":
-        response = "Could you please rephrase your question or ask something more specific?"
-    elif intent == "empty":
-        logger.warning("Empty query. Skipping.")
+def run_batch(index, llm, questions_path: str, output_path: str | None = None, concurrency: int | None = None):
+    """Answers the questions in a JSONL file (see ``main.batch_qa``) and prints a summary."""
+    output_path = output_path or os.path.splitext(questions_path)[0] + ".answers.jsonl"
+    try:
+        questions = batch_qa.read_questions(questions_path)
+    except (OSError, ValueError) as e:
+        logger.error("Could not read questions: %s", e)
         return
-    else:
-        # Use the RAG pipeline
-        top_chunks = faiss_indexer.query_faiss_index(index, query_text, embedder.get_model(), k=4)
-        if not top_chunks:
-            logger.info("No matching chunks found for query: %s", query_text)
-            response = "Sorry, I couldn't find relevant information in the documents."
-        else:
-            max_score = max(score for _, score in top_chunks)
-            threshold = 0.2
-            if max_score < threshold:
-                logger.debug("No relevant chunks found for query: '%s'", query_text)
-                response = "I looked through the documents but didn't find anything helpful for that question."
-            else:
-                logger.debug("Retrieved %d top matching chunks for query: '%s'", len(top_chunks), query_text)
-                context = "\n\n".join(chunk for chunk, _ in top_chunks)
-                prompt = build_prompt(context, query_text, history)
-                response = llm.generate_answer(prompt)
-
-    print(f"\nAssistant: {response}")
-    history.append((query_text, response))
-
-    # Limit history length
-    if len(history) > MAX_HISTORY_LENGTH:
-        history[:] = history[-MAX_HISTORY_LENGTH:]
+    summary = batch_qa.answer_batch(index, questions, llm, output_path, concurrency=concurrency)
+    print(
+        f"{summary['answered']} answered, {summary['failed']} failed, {summary['skipped']} already done "
+        f"in {summary['seconds']:.1f} s. Answers: {output_path}"
+    )
 
 
 def main():
@@ -191,28 +325,43 @@ def main():
         logger.error("Ollama is not running. Please start Ollama before continuing.")
         return
     
-    intent_detector = IntentDetector()
+    intent_detector = create_intent_detector()
+    if Config.WARM_UP:
+        # Model loading and the Ollama ping overlap with the index sync
+        rag_pipeline.start_warm_up(llm, intent_detector=intent_detector)
+    if Config.METRICS_PORT:
+        metrics.serve(Config.METRICS_PORT)
 
     parser = argparse.ArgumentParser(description="Run RAG pipeline on sample PDFs")
-    parser.add_argument("--force", action="store_true", help="Force reprocessing even if FAISS index exists")
+    parser.add_argument("--force", action="store_true", help="Rebuild the FAISS index from scratch instead of syncing it")
+    parser.add_argument(
+        "--collection", action="append", help="Only sync (or with --force, rebuild) this collection; repeatable"
+    )
+    parser.add_argument("--batch", metavar="QUESTIONS.jsonl", help="Answer the questions in a JSONL file and exit")
+    parser.add_argument("--output", help="Answers file for --batch (default: <questions>.answers.jsonl); resumed if it exists")
+    parser.add_argument("--concurrency", type=int, help="Generations in flight for --batch (default: BATCH_QA_CONCURRENCY)")
     args = parser.parse_args()
 
-    pdf_files = [f for f in os.listdir(SAMPLE_DIR) if f.lower().endswith(".pdf")]
-    if not pdf_files:
-        logger.warning("No PDF files found.")
-        return
-    
-    index = build_global_index(force=args.force)
+    index = build_global_index(force=args.force, collections=args.collection)
     if index is None:
         logger.warning("Index could not be created or loaded.")
         return
+    if Config.WARM_UP:
+        rag_pipeline.start_warm_up(index=index)
+    metrics.record_startup("cli")
+
+    if args.batch:
+        run_batch(index, llm, args.batch, args.output, args.concurrency)
+        return
     
     history = []
+    collections = None
     
     try:
         print("Welcome to Armstrong Chat Assistant!")
         print("Chat started. Type your question below.")
-        print("Type `/reset` to start over or `/exit` to quit.\n")
+        print("Type `/reset` to start over, `/stats` for cache statistics, or `/exit` to quit.")
+        print(f"Collections: {', '.join(index.collections)}. Type `/collections a,b` to search only some of them.\n")
 
         while True:
             query = input("You: ").strip()
@@ -226,8 +375,20 @@ def main():
                 history.clear()
                 logger.info("Chat history reset.")
                 continue
+            if query.lower().startswith("/collections"):
+                names = [name.strip() for name in query[len("/collections"):].split(",") if name.strip()]
+                collections = names or None
+                logger.info("Searching collections: %s", ", ".join(collections or index.collections))
+                continue
+            if query.lower() == "/stats":
+                for name, stats in rag_pipeline.cache_stats().items():
+                    print(f"{name}: {stats}")
+                print(f"llm: {llm.stats()}")
+                for name, summary in metrics.snapshot().items():
+                    print(f"{name}: {summary}")
+                continue
             
-            query_and_respond(index, query, llm, history, intent_detector)
+            query_and_respond(index, query, llm, history, intent_detector, collections)
     except KeyboardInterrupt:
         logger.info("\nExiting on user interrupt")
         
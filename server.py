@@ -0,0 +1,400 @@
+"""RAG HTTP Service
+
+Asyncio HTTP API around the query path, for many concurrent users:
+
+    GET  /health    Index, embedding model and Ollama status, batching statistics
+    GET  /metrics   Prometheus metrics (see ``main.metrics``)
+    POST /query     {"question": "...", "history": [["q", "a"], ...], "collections": ["pumps"], "stream": false}
+
+``/query`` returns {"answer", "intent", "generated", "chunks", "timings"}. With
+``"stream": true`` the response is newline-delimited JSON sent as it is
+generated: {"delta": "..."} lines, then one {"done": true, ...} line with
+everything but the answer.
+
+Concurrent queries are retrieved together: a query waits at most
+SERVE_MAX_WAIT_MS for others, and up to SERVE_MAX_BATCH_SIZE queries are
+encoded in one call and searched with one matrix search per store (see
+``main.micro_batcher``). Intent detection then finds the query embedding in
+the cache, and generation runs on a thread pool, limited by
+OLLAMA_MAX_CONCURRENCY.
+
+Run:
+    python server.py --port 8000
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import NamedTuple
+
+from main import batch_qa, metrics, rag_pipeline
+from main.config import Config
+from main.embedder import embedder
+from main.intent_classifier import create_intent_detector
+from main.llm.ollama_client import OllamaClient
+from main.logger_config import setup_logging
+from main.micro_batcher import MicroBatcher
+from pipeline import build_global_index
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_BYTES = 1 << 16
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str | None = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+class QueryService:
+    """
+    Answers HTTP queries against an index, retrieving concurrent queries in batches.
+
+    Args:
+        index: FaissStore or ShardedStore to retrieve from.
+        llm: LLM client (see ``main.llm.base.LLMBase``).
+        intent_detector: Detector with a ``detect(text)`` method.
+        model: SentenceTransformer for query embeddings; defaults to the shared embedding model.
+        max_batch_size (int | None): Most queries per batch; defaults to Config.SERVE_MAX_BATCH_SIZE.
+        max_wait_ms (float | None): Longest wait for a batch to fill; defaults to Config.SERVE_MAX_WAIT_MS.
+        workers (int | None): Threads for intent detection and generation; defaults to Config.SERVE_WORKERS.
+    """
+
+    def __init__(
+        self,
+        index,
+        llm,
+        intent_detector,
+        model=None,
+        max_batch_size: int | None = None,
+        max_wait_ms: float | None = None,
+        workers: int | None = None,
+    ):
+        self.index = index
+        self.llm = llm
+        self.intent_detector = intent_detector
+        self.model = model
+        self._workers = ThreadPoolExecutor(max_workers=workers or Config.SERVE_WORKERS, thread_name_prefix="serve")
+        # Batches run one at a time; a thread of their own keeps them from queueing behind generation
+        self._retriever = ThreadPoolExecutor(max_workers=1, thread_name_prefix="serve-retrieve")
+        self.batcher = MicroBatcher(
+            self._retrieve_batch,
+            max_batch_size or Config.SERVE_MAX_BATCH_SIZE,
+            (Config.SERVE_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000,
+            executor=self._retriever,
+        )
+
+    async def start(self, host: str = Config.SERVE_HOST, port: int = Config.SERVE_PORT) -> asyncio.AbstractServer:
+        """Starts listening; ``port`` 0 picks a free port."""
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def close(self):
+        await self.batcher.close()
+        self._workers.shutdown(wait=False, cancel_futures=True)
+        self._retriever.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serves the requests of one connection, keeping it open between them unless asked not to."""
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HTTPError as e:
+                    await _send_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                await self.dispatch(request, writer)
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: Request, writer: asyncio.StreamWriter):
+        routes = {
+            "/health": ("GET", self.health),
+            "/metrics": ("GET", self.prometheus),
+            "/query": ("POST", self.query),
+        }
+        try:
+            if request.path not in routes:
+                raise HTTPError(HTTPStatus.NOT_FOUND)
+            method, handler = routes[request.path]
+            if request.method != method:
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+            await handler(request, writer)
+        except HTTPError as e:
+            await _send_json(writer, e.status, {"error": str(e)}, request.keep_alive)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            raise
+        except Exception as e:
+            logger.exception("Request to %s failed", request.path)
+            await _send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, request.keep_alive)
+
+    async def health(self, request: Request, writer: asyncio.StreamWriter):
+        """200 if Ollama is reachable, 503 otherwise, with the state of each component."""
+        llm_running = await self._run(self.llm.is_running)
+        body = {
+            "status": "ok" if llm_running else "unavailable",
+            "llm": llm_running,
+            "model_loaded": self.model is not None or embedder.is_loaded(),
+            "collections": getattr(self.index, "collections", None),
+            "revision": self.index.revision,
+            "batching": self.batcher.stats(),
+        }
+        status = HTTPStatus.OK if llm_running else HTTPStatus.SERVICE_UNAVAILABLE
+        await _send_json(writer, status, body, request.keep_alive)
+
+    async def prometheus(self, request: Request, writer: asyncio.StreamWriter):
+        body = metrics.prometheus_text().encode()
+        await _send(writer, HTTPStatus.OK, body, "text/plain; version=0.0.4", request.keep_alive)
+
+    async def query(self, request: Request, writer: asyncio.StreamWriter):
+        question, history, collections, stream = _parse_query(request.body)
+        start = time.perf_counter()
+        with metrics.trace("serve_query", stream=stream):
+            result = await self.prepare(question, history, collections)
+            prepared = result.pop("prepared")
+            if not stream:
+                if prepared.prompt is None:
+                    result["answer"] = prepared.response
+                else:
+                    result["answer"] = await self._run(rag_pipeline.generate, prepared, self.llm)
+                result["timings"]["total_ms"] = _ms(time.perf_counter() - start)
+                await _send_json(writer, HTTPStatus.OK, result, request.keep_alive)
+                return
+
+            await _start_chunked(writer, "application/x-ndjson", request.keep_alive)
+            if prepared.prompt is None:
+                await _write_chunk(writer, _json_line({"delta": prepared.response}))
+            else:
+                try:
+                    async for delta in self._iterate(rag_pipeline.stream_generate(prepared, self.llm)):
+                        result["timings"].setdefault("first_token_ms", _ms(time.perf_counter() - start))
+                        await _write_chunk(writer, _json_line({"delta": delta}))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # The status line is already sent: report the error in the last line instead
+                    logger.exception("Streaming an answer failed")
+                    result["error"] = str(e)
+            result["timings"]["total_ms"] = _ms(time.perf_counter() - start)
+            await _write_chunk(writer, _json_line(dict(result, done=True)))
+            await _write_chunk(writer, b"")
+
+    async def prepare(self, question: str, history: list[tuple[str, str]], collections: list[str] | None) -> dict:
+        """
+        Retrieves (in a batch with concurrent queries) and detects the intent of a question.
+
+        Returns:
+            dict: The response fields other than the answer, and the ``Prepared`` prompt or response.
+        """
+        start = time.perf_counter()
+        with metrics.span("retrieve_wait"):
+            chunks = await self.batcher.submit((question, tuple(sorted(collections)) if collections else None))
+        retrieve_seconds = time.perf_counter() - start
+
+        # Retrieval added the query embedding to the cache, so the embedding classifier does not encode again
+        with metrics.span("intent") as span:
+            intent = span["intent"] = await self._run(self.intent_detector.detect, question)
+        if intent in rag_pipeline.CANNED_RESPONSES or intent == "empty":
+            prepared, chunks = rag_pipeline.Prepared(rag_pipeline.CANNED_RESPONSES.get(intent, ""), None), []
+        else:
+            prepared = await self._run(
+                rag_pipeline.prepare_from_chunks, self.index, question, chunks, history, self.model
+            )
+        return {
+            "prepared": prepared,
+            "intent": intent,
+            "generated": prepared.prompt is not None,
+            "chunks": [batch_qa.chunk_info(self.index, chunk_id, score) for chunk_id, _, score in chunks],
+            "timings": {"retrieve_ms": _ms(retrieve_seconds)},
+        }
+
+    def _retrieve_batch(self, items: list[tuple[str, tuple | None]]) -> list[list[tuple]]:
+        records = [{"question": question, "collections": collections} for question, collections in items]
+        model = self.model if self.model is not None else embedder.get_model()
+        results, _ = batch_qa.retrieve_batch(self.index, records, model)
+        return results
+
+    async def _run(self, fn, *args):
+        """Runs a blocking call on the worker threads, its spans joining the current trace."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._workers, contextvars.copy_context().run, fn, *args
+        )
+
+    async def _iterate(self, stream):
+        """Iterates a blocking iterator on the worker threads, closing it if the caller stops early."""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                item = await loop.run_in_executor(self._workers, context.run, next, stream, None)
+                if item is None:
+                    return
+                yield item
+        finally:
+            # Releases the Ollama connection if the client disconnected mid-answer
+            await loop.run_in_executor(self._workers, context.run, stream.close)
+
+
+def _parse_query(body: bytes) -> tuple[str, list[tuple[str, str]], list[str] | None, bool]:
+    try:
+        data = json.loads(body or b"null")
+    except ValueError as e:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get("question"), str) or not data["question"].strip():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Expected an object with a non-empty "question"')
+    history = data.get("history") or []
+    if not isinstance(history, list) or not all(
+        isinstance(turn, list) and len(turn) == 2 and all(isinstance(part, str) for part in turn) for turn in history
+    ):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, '"history" must be a list of [question, answer] pairs')
+    collections = data.get("collections") or None
+    if collections is not None and (
+        not isinstance(collections, list) or not all(isinstance(name, str) for name in collections)
+    ):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, '"collections" must be a list of names')
+    return data["question"], [tuple(turn) for turn in history], collections, bool(data.get("stream"))
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Request | None:
+    """Reads one HTTP/1.x request; None if the connection was closed before one started."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED)
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+    body = await reader.readexactly(length) if length else b""
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+    return Request(method, target.split("?", 1)[0], headers, body, keep_alive)
+
+
+async def _send(writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes, content_type: str, keep_alive: bool):
+    writer.write(
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: HTTPStatus, data: dict, keep_alive: bool):
+    await _send(writer, status, json.dumps(data, ensure_ascii=False).encode(), "application/json", keep_alive)
+
+
+async def _start_chunked(writer: asyncio.StreamWriter, content_type: str, keep_alive: bool):
+    writer.write(
+        f"HTTP/1.1 200 OK\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Transfer-Encoding: chunked\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+    )
+    await writer.drain()
+
+
+async def _write_chunk(writer: asyncio.StreamWriter, data: bytes):
+    """Writes one chunk of a chunked response; an empty one ends the response."""
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+
+def _json_line(data: dict) -> bytes:
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode()
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+async def serve(service: QueryService, host: str, port: int):
+    server = await service.start(host, port)
+    metrics.record_startup("server")
+    for sock in server.sockets:
+        logger.info("Serving queries on http://%s:%d", *sock.getsockname()[:2])
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main():
+    """Main"""
+
+    parser = argparse.ArgumentParser(description="Serve the RAG pipeline over HTTP")
+    parser.add_argument("--host", default=Config.SERVE_HOST, help="Address to listen on (default: SERVE_HOST)")
+    parser.add_argument("--port", type=int, default=Config.SERVE_PORT, help="Port to listen on (default: SERVE_PORT)")
+    parser.add_argument("--max-batch-size", type=int, help="Queries retrieved together (default: SERVE_MAX_BATCH_SIZE)")
+    parser.add_argument("--max-wait-ms", type=float, help="Longest wait for a batch to fill (default: SERVE_MAX_WAIT_MS)")
+    args = parser.parse_args()
+
+    llm = OllamaClient()
+    if not llm.is_running():
+        logger.error("Ollama is not running. Please start Ollama before continuing.")
+        return
+
+    intent_detector = create_intent_detector()
+    if Config.WARM_UP:
+        # Model loading and the Ollama ping overlap with the index sync
+        rag_pipeline.start_warm_up(llm, intent_detector=intent_detector)
+    index = build_global_index(force=False)
+    if index is None:
+        logger.warning("Index could not be created or loaded.")
+        return
+    if Config.WARM_UP:
+        rag_pipeline.start_warm_up(index=index)
+
+    service = QueryService(index, llm, intent_detector, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Helpers shared by the test suites."""
+import threading
+import zlib
+import numpy as np
+
+
+class BagOfWordsModel:
+    """
+    Stand-in for SentenceTransformer: hashed bag-of-words vectors.
+
+    Records the size of every encode call in ``batches`` and sets ``called``
+    on the first one.
+    """
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.batches = []
+        self.called = threading.Event()
+
+    def encode(self, texts, **kwargs):
+        self.batches.append(len(texts))
+        self.called.set()
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().replace("?", " ").replace(".", " ").split():
+                vectors[row, zlib.crc32(word.encode()) % self.dim] += 1
+        return vectors + 1e-3
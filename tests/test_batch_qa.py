@@ -0,0 +1,60 @@
+"""Test suite for batch question answering."""
+import json
+from main import batch_qa
+from main.config import Config
+from main.llm.base import LLMBase
+from main.vector_store import faiss_indexer
+from main.vector_store.faiss_indexer import build_faiss_index
+from tests.helpers import BagOfWordsModel
+
+DOCS = [
+    "The IPS 4000 pump has a maximum flow of 900 gpm.",
+    "The 4300 VIL circulator runs at 3500 rpm.",
+    "Seal kits are available for split case pumps.",
+    "Install the valve upstream of the sensor.",
+]
+
+
+class CountingLLM(LLMBase):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_answer(self, prompt):
+        self.calls += 1
+        return "answer"
+
+
+def test_batch_retrieval_matches_single_queries(monkeypatch):
+    monkeypatch.setattr(Config, "HYBRID_RETRIEVAL", False)
+    model = BagOfWordsModel()
+    store = build_faiss_index(model.encode(DOCS), DOCS)
+    questions = ["How much flow does the IPS 4000 have?", "What speed does the circulator run at?", "Which seal kits?"]
+
+    model.batches.clear()
+    batched = faiss_indexer.query_faiss_index_batch(store, questions, model, k=2)
+    assert model.batches == [len(questions)]  # One encode call for all queries
+
+    single = [faiss_indexer.search_store(store, question, model, 2) for question in questions]
+    assert batched == single
+
+
+def test_answer_batch_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "LLM_MODE", "generate")
+    model = BagOfWordsModel()
+    store = build_faiss_index(model.encode(DOCS), DOCS)
+    path = tmp_path / "questions.jsonl"
+    path.write_text("\n".join(json.dumps({"question": doc.replace(".", "?")}) for doc in DOCS) + "\n")
+    questions = batch_qa.read_questions(str(path))
+    output = tmp_path / "answers.jsonl"
+
+    llm = CountingLLM()
+    summary = batch_qa.answer_batch(store, questions[:2], llm, str(output), model=model, batch_size=1)
+    assert summary["answered"] == 2 and llm.calls == 2
+
+    summary = batch_qa.answer_batch(store, questions, llm, str(output), model=model, batch_size=3, concurrency=2)
+    assert summary == dict(summary, answered=2, skipped=2, failed=0)
+    assert llm.calls == 4
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["id"] for record in records) == ["1", "2", "3", "4"]
+    assert all(record["answer"] == "answer" and record["chunks"] for record in records)
@@ -0,0 +1,33 @@
+"""Test suite for the benchmark helpers."""
+import fitz
+from benchmarks.compare import compare
+from benchmarks.corpus import generate_corpus
+from benchmarks.fake_ollama import FakeOllamaServer
+from main.llm.ollama_client import OllamaClient
+
+
+def test_generate_corpus(tmp_path):
+    questions = generate_corpus(str(tmp_path), n_docs=2, pages_per_doc=3, facts_per_page=2)
+    assert len(questions) == 12
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["synthetic_0000.pdf", "synthetic_0001.pdf"]
+    with fitz.open(tmp_path / "synthetic_0000.pdf") as doc:
+        assert doc.page_count == 3
+        model = questions[0].rsplit(" ", 1)[1].rstrip("?")
+        assert model in doc[0].get_text()
+
+
+def test_fake_ollama_server():
+    with FakeOllamaServer(tokens_per_second=0, first_token_latency=0, answer_tokens=3) as server:
+        llm = OllamaClient(url=server.url)
+        assert llm.is_running()
+        assert llm.generate_answer("prompt") == "tok0 tok1 tok2 "
+        assert list(llm.stream_answer("prompt")) == ["tok0 ", "tok1 ", "tok2 "]
+
+
+def test_compare_flags_regressions():
+    baseline = {"ingest": {"total_seconds": 10.0, "chunks": 100}, "query": {"end_to_end": {"p95_ms": 100.0}}}
+    results = {"ingest": {"total_seconds": 10.5, "chunks": 200}, "query": {"end_to_end": {"p95_ms": 150.0}}}
+    rows = {row["metric"]: row for row in compare(results, baseline, tolerance=0.1)}
+    assert not rows["ingest.total_seconds"]["regression"]
+    assert rows["query.end_to_end.p95_ms"]["regression"]
+    assert "ingest.chunks" not in rows
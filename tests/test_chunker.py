@@ -1,5 +1,5 @@
 """Test suite for the text chunking functionality."""
-from main.chunker.text_chunker import chunk_text
+from main.chunker.text_chunker import chunk_pages, chunk_text
 
 
 def test_chunk_text_basic():
@@ -27,3 +27,17 @@ def test_chunk_text_basic():
         assert similarity > 3, f"Not enough overlapping words found. Overlap similarity: {similarity}"
 
     print(f"Chunk test passed: {len(chunks)} chunks created.")
+
+
+def test_chunk_pages_offsets():
+    """Chunk offsets slice the source text and each chunk is tagged with its start page."""
+    from main.extractor.pdf_extractor import join_pages
+    text, pages = join_pages(["Pump model IPS4000. " * 20, "Valve 4300 VIL. " * 20])
+
+    rows = chunk_pages(text, pages, chunk_size=120, chunk_overlap=20)
+
+    assert rows.shape[1] == 3
+    for page, start, end in rows.tolist():
+        assert text[start:end].strip() == text[start:end]
+        assert page == (1 if start < pages[1][1] else 2)
+    assert [text[start:end] for _, start, end in rows.tolist()] == chunk_text(text, 120, 20)
@@ -0,0 +1,64 @@
+"""Test suite for the context builder module."""
+from main.context_builder import (
+    HISTORY_DROP_BLOCK,
+    drop_near_duplicates,
+    estimate_tokens,
+    merge_chunks,
+    pack_context,
+    pack_history,
+)
+
+TEXT = " ".join(f"word{i}" for i in range(120))
+
+
+def test_merge_and_dedup():
+    # Consecutive chunks that share text are joined; a non-consecutive one is kept apart
+    chunks = [(1, TEXT[300:], 0.4), (0, TEXT[:350], 0.9), (5, TEXT[:TEXT.index(" word20")], 0.3)]
+    passages = merge_chunks(chunks, max_overlap=100)
+    assert [passage.chunk_ids for passage in passages] == [[0, 1], [5]]
+    assert passages[0].text == TEXT
+    assert passages[0].score == 0.9
+
+    # The lower-scoring passage only repeats the best one
+    kept = drop_near_duplicates(passages, threshold=0.8)
+    assert [passage.chunk_ids for passage in kept] == [[0, 1]]
+
+
+def test_pack_context_budget():
+    chunks = [(0, TEXT, 0.9), (10, "pump " * 400, 0.5)]
+    history = [("old question", "old answer " * 100), ("new question", "new answer")]
+    budget = estimate_tokens(TEXT) + 120
+    packed = pack_context(chunks, history, budget, history_budget=100)
+
+    # Over the history budget, the old long answer is shortened and the newest turn kept in full
+    assert packed.history[0][1].endswith("…")
+    assert packed.history[1] == ("new question", "new answer")
+
+    # Passages fill the rest of the budget; the second one is cut to fit
+    assert [passage.chunk_ids for passage in packed.passages] == [[0], [10]]
+    assert packed.passages[1].text.endswith("…")
+    assert packed.tokens <= budget
+
+    # The history part does not depend on what was retrieved
+    assert pack_context(chunks[1:], history, budget, history_budget=100).history == packed.history
+
+
+def test_history_prefix_stable():
+    history, previous, breaks = [], None, 0
+    for turn in range(24):
+        history.append((f"question {turn}", "answer " * 60))
+        kept = pack_history(history, budget=768)
+        assert sum(estimate_tokens(q) + estimate_tokens(a) + 2 for q, a in kept) <= 768
+        assert kept[-1] == history[-1]
+        # Each prompt repeats the previous one's history, except when a block of old turns is dropped
+        if previous is not None and kept[:len(previous)] != previous:
+            breaks += 1
+            assert kept[0][0] == history[len(history) - len(kept)][0]
+        previous = kept
+    assert 0 < breaks <= len(history) // HISTORY_DROP_BLOCK
+
+
+def test_history_that_fits_is_unchanged():
+    # A long answer to the question being followed up is not shortened while everything fits
+    history = [("old question", "old answer"), ("new question", "new answer " * 60)]
+    assert pack_history(history, budget=768) == history
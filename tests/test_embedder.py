@@ -1,5 +1,6 @@
 """Test suite for embedding generation from text chunks."""
 
+import numpy as np
 from main.embedder import embedder
 
 def test_embed_text_chunks():
@@ -10,13 +11,46 @@ def test_embed_text_chunks():
         "Yet another meaningful text segment."
     ]
 
-    embeddings = embedder.embed_text_chunks(sample_chunks)
+    embeddings = embedder.embed_text_chunks(sample_chunks, use_cache=False)
 
-    assert isinstance(embeddings, list)
-    assert len(embeddings) == len(sample_chunks)
-    assert all(isinstance(vec, list) for vec in embeddings)
-    assert all(isinstance(dim, float) for vec in embeddings for dim in vec)
+    assert isinstance(embeddings, np.ndarray)
+    assert embeddings.dtype == np.float32
+    assert embeddings.flags["C_CONTIGUOUS"]
+    assert embeddings.shape[0] == len(sample_chunks)
 
-    # All vectors should be the same length
-    dim_lengths = set(len(vec) for vec in embeddings)
-    assert len(dim_lengths) == 1, "Inconsistent embedding dimensions"
+    # Length-sorted batching must return rows in input order
+    batched = embedder.embed_text_chunks(sample_chunks, use_cache=False, batch_size=1)
+    single = embedder.get_model().encode(sample_chunks[2:], convert_to_numpy=True)
+    assert np.allclose(batched[2], single[0], atol=1e-5)
+
+
+def test_empty_input_does_not_load_model(monkeypatch):
+    monkeypatch.setattr(embedder, "_model", None)
+    assert embedder.embed_text_chunks([]).shape == (0, 0)
+    assert embedder._model is None
+
+
+def test_worker_pool_matches_in_process():
+    """Chunks encoded by worker processes come back in input order."""
+    chunks = [f"chunk {i} " + "text " * (i % 7) for i in range(20)]
+    expected = embedder.embed_text_chunks(chunks, use_cache=False)
+
+    with embedder.worker_pool(workers=2, threads_per_worker=1):
+        pooled = embedder.embed_text_chunks(chunks, use_cache=False)
+
+    assert pooled.shape == expected.shape
+    assert np.allclose(pooled, expected, atol=1e-4)
+
+
+def test_backend_fingerprint(monkeypatch):
+    """Quantized ONNX vectors get their own fingerprint; PyTorch and float ONNX share the model name."""
+    from main.config import Config
+    from main.embedder import backend
+
+    monkeypatch.setattr(Config, "EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    assert backend.fingerprint(backend_name="torch") == "all-MiniLM-L6-v2"
+    assert backend.fingerprint(backend_name="onnx", onnx_file="onnx/model.onnx") == "all-MiniLM-L6-v2"
+    assert (
+        backend.fingerprint(backend_name="onnx", onnx_file="onnx/model_qint8_avx2.onnx")
+        == "all-MiniLM-L6-v2+model_qint8_avx2"
+    )
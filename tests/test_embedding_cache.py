@@ -0,0 +1,53 @@
+"""Test suite for the persistent embedding cache."""
+import tempfile
+import shutil
+import numpy as np
+from main.embedder.embedding_cache import EmbeddingCache
+
+
+def test_embedding_cache_lookup_evict_and_reopen():
+    temp_dir = tempfile.mkdtemp()
+    dim = 8
+    record_size = 16 + dim * 4
+
+    try:
+        cache = EmbeddingCache(temp_dir, "all-MiniLM-L6-v2", dim, max_bytes=record_size * 3)
+        assert cache.capacity == 3
+
+        vectors = np.random.rand(4, dim).astype("float32")
+        cache.store(["alpha", "beta"], vectors[:2])
+
+        # Whitespace differences share an entry
+        embeddings, misses = cache.lookup(["alpha", "  beta\n", "gamma"])
+        assert misses == [2]
+        assert np.array_equal(embeddings[:2], vectors[:2])
+
+        # Filling the cache evicts the least recently used entry
+        cache.lookup(["beta"])
+        cache.store(["gamma", "delta"], vectors[2:])
+        assert len(cache) == 3
+        assert cache.lookup(["alpha"])[1] == [0]
+
+        cache.flush()
+        reopened = EmbeddingCache(temp_dir, "all-MiniLM-L6-v2", dim, max_bytes=record_size * 3)
+        embeddings, misses = reopened.lookup(["beta", "gamma", "delta"])
+        assert misses == []
+        assert np.array_equal(embeddings, vectors[1:])
+
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_batch_eviction(tmp_path):
+    dim = 4
+    cache = EmbeddingCache(str(tmp_path), "model", dim, max_bytes=(16 + dim * 4) * 4)
+    vectors = np.arange(6 * dim, dtype="float32").reshape(6, dim)
+    cache.store(["a", "b", "c", "d"], vectors[:4])
+    cache.lookup(["a"])
+
+    # One store needing two slots evicts the two least recently used entries; "c" is
+    # refreshed by the same store and a repeated text takes a single slot
+    cache.store(["c", "e", "f", "e"], vectors[[2, 4, 5, 4]])
+    embeddings, misses = cache.lookup(["a", "b", "c", "d", "e", "f"])
+    assert misses == [1, 3] and len(cache) == 4
+    assert np.array_equal(embeddings[[0, 2, 4, 5]], vectors[[0, 2, 4, 5]])
@@ -0,0 +1,42 @@
+"""Test suite for the streaming ingest pipeline."""
+import numpy as np
+import pytest
+from main.ingest_pipeline import IngestPipeline
+
+
+def fake_embed(chunks):
+    return np.random.rand(len(chunks), 8).astype("float32")
+
+
+def test_ingest_pipeline_streams_into_store():
+    """Test every chunk is indexed with its file's IDs, across batches spanning files."""
+    sample_pdf = "sample_pdfs/IPS4000.pdf"
+    broken_pdf = "sample_pdfs/missing.pdf"
+
+    ingest = IngestPipeline(
+        next_id=100,
+        chunk_fn=lambda text: [text[i:i + 200] for i in range(0, len(text), 200)],
+        embed_fn=fake_embed,
+        batch_size=7,
+        queue_size=1,
+    )
+    results = {result.file_path: result for result in ingest.run([sample_pdf, broken_pdf])}
+
+    assert results[broken_pdf].error
+    assert len(results[broken_pdf].ids) == 0
+
+    ids = results[sample_pdf].ids
+    assert ids.start == 100 and len(ids) > 7
+    assert ingest.next_id == ids.stop
+    assert sorted(ingest.store.ids().tolist()) == list(ids)
+    assert ingest.stats["embed"].items == len(ids)
+
+
+def test_ingest_pipeline_raises_stage_errors():
+    """Test a failing stage stops the pipeline and surfaces its exception."""
+    def failing_embed(chunks):
+        raise ValueError("embedding failed")
+
+    ingest = IngestPipeline(chunk_fn=lambda text: [text], embed_fn=failing_embed)
+    with pytest.raises(ValueError, match="embedding failed"):
+        list(ingest.run(["sample_pdfs/IPS4000.pdf"]))
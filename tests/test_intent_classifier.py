@@ -0,0 +1,36 @@
+"""Test suite for the embedding-based intent classifier."""
+from main.intent_classifier import EmbeddingIntentDetector
+from tests.helpers import BagOfWordsModel
+
+
+class FixedDetector:
+    def __init__(self, intent):
+        self.intent = intent
+        self.calls = 0
+
+    def detect(self, text):
+        self.calls += 1
+        return self.intent
+
+
+EXAMPLES = {
+    "greeting": ["hello", "hello there", "hi there"],
+    "question": ["what is the max flow", "what is the pressure rating"],
+}
+
+
+def test_embedding_intent_detector():
+    fallback = FixedDetector("question")
+    detector = EmbeddingIntentDetector(BagOfWordsModel(dim=64), fallback, threshold=0.5, examples=EXAMPLES)
+
+    assert detector.classify("hello")[0] == "greeting"
+    assert detector.detect("what is the max flow of the IPS4000?") == "question"
+    assert detector.detect("   ") == "unclear"
+    assert fallback.calls == 0
+
+    # Low confidence goes to the fallback, and decisions are cached
+    unsure = EmbeddingIntentDetector(BagOfWordsModel(dim=64), fallback, threshold=1.01, examples=EXAMPLES)
+    assert unsure.detect("hello") == "question"
+    assert unsure.detect("  HELLO ") == "question"
+    assert fallback.calls == 1
+    assert unsure.cache.hits == 1
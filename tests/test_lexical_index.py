@@ -0,0 +1,96 @@
+"""Test suite for the lexical index and hybrid retrieval."""
+import numpy as np
+import pytest
+from main.vector_store import faiss_indexer
+from main.vector_store.faiss_indexer import build_faiss_index, load_faiss_index, save_faiss_index
+from main.vector_store.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+CHUNKS = [
+    "The IPS 4000 controller runs pumps in parallel.",
+    "Series 4300 VIL pumps are vertical in-line pumps.",
+    "Series 4300 VIL-S adds a split coupled motor.",
+    "Motor bearings need grease every 2000 hours.",
+    "The controller displays flow and head.",
+]
+
+
+class ConstantModel:
+    """Embeds everything alike, so dense search cannot tell chunks apart."""
+
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 8), dtype="float32")
+
+
+def test_lexical_index(tmp_path):
+    lexical = LexicalIndex()
+    lexical.add(range(len(CHUNKS)), CHUNKS)
+
+    # Separators and case do not matter for identifiers
+    assert lexical.lookup_identifiers("What is the ips4000?") == {0}
+    assert lexical.lookup_identifiers("4300 VIL") == {1, 2}
+    assert lexical.lookup_identifiers("Series 4300") == {1, 2}
+    assert lexical.lookup_identifiers("24 V") == set()
+    # Plain values are not identifiers, even with three or more digits
+    assert lexical.lookup_identifiers("What pump runs on 2000 V?") == set()
+    assert lexical.search("grease motor bearings", k=1)[0][0] == 3
+
+    lexical.remove(0, CHUNKS[0])
+    assert lexical.lookup_identifiers("IPS 4000") == set()
+    assert [chunk_id for chunk_id, _ in lexical.search("controller")] == [4]
+
+    lexical.save(str(tmp_path / "test.lex"), "rev1")
+    assert LexicalIndex.load(str(tmp_path / "test.lex"), "rev2") is None
+    restored = LexicalIndex.load(str(tmp_path / "test.lex"), "rev1")
+    assert restored.search("controller") == lexical.search("controller")
+    assert restored.search("series pumps") == lexical.search("series pumps")
+    assert restored.lookup_identifiers("4300 VIL") == {1, 2}
+    # A loaded index is copied before its first change
+    restored.add([0], [CHUNKS[0]])
+    assert restored.lookup_identifiers("IPS 4000") == {0}
+    assert {chunk_id for chunk_id, _ in restored.search("controller")} == {0, 4}
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]]) == [1, 3, 2]
+
+
+def test_hybrid_retrieval(tmp_path, monkeypatch):
+    model = ConstantModel()
+    store = build_faiss_index(model.encode(CHUNKS), CHUNKS)
+
+    # An identifier in few chunks is answered from the lexical index alone
+    results = faiss_indexer.query_faiss_index(store, "Tell me about the IPS4000", model, k=2, with_ids=True)
+    assert [chunk_id for chunk_id, _, _ in results] == [0]
+    assert results[0][2] == pytest.approx(1.0)  # Its cosine similarity, not a fixed score
+
+    # Otherwise BM25 hits are fused with the dense ones, and scored by cosine similarity
+    results = faiss_indexer.query_faiss_index(store, "grease for bearings", model, k=2, with_ids=True)
+    assert 3 in [chunk_id for chunk_id, _, _ in results]
+    assert all(abs(score - 1.0) < 1e-5 for _, _, score in results)
+
+    # The lexical index is saved with the store and follows its updates
+    store.remove([1])
+    save_faiss_index(store, str(tmp_path / "global.index"))
+    loaded = load_faiss_index(str(tmp_path / "global.index"))
+    assert loaded._lexical is None  # Opened on first use
+    assert loaded.lexical.lookup_identifiers("4300 VIL") == {2}
+
+    # Dense-only retrieval neither builds nor saves a lexical index
+    monkeypatch.setattr(faiss_indexer.Config, "HYBRID_RETRIEVAL", False)
+    dense = build_faiss_index(model.encode(CHUNKS), CHUNKS)
+    save_faiss_index(dense, str(tmp_path / "dense.index"))
+    assert dense._lexical is None and not (tmp_path / "dense.lex").exists()
+
+
+def test_numeric_value_is_not_an_exact_match():
+    class TopicModel:
+        """Embeds texts by the topic words they contain."""
+
+        def encode(self, texts, **kwargs):
+            topics = ["controller", "grease"]
+            return np.array([[float(topic in text.lower()) for topic in topics] + [0.1] for text in texts], dtype="float32")
+
+    model = TopicModel()
+    store = build_faiss_index(model.encode(CHUNKS), CHUNKS)
+
+    # "2000" is a value, not a model number: the query is not answered by chunk 3 with a fixed score
+    results = faiss_indexer.query_faiss_index(store, "Which controller runs on 2000 V?", model, k=2, with_ids=True)
+    assert results[0][0] in (0, 4)
+    assert all(score < 0.5 for chunk_id, _, score in results if chunk_id == 3)
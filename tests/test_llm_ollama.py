@@ -1,3 +1,10 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from main.llm.base import LLM_ERROR_RESPONSE
+from main.llm.concurrency import ConcurrencyLimiter
 from main.llm.ollama_client import OllamaClient
 import pytest
 
@@ -24,3 +31,88 @@ def test_generate_answer():
     assert isinstance(response, str), "Response should be a string"
     assert len(response.strip()) > 0, "Response should not be empty"
     assert "simplicity" in response.lower() or "readability" in response.lower() or "easy" in response.lower()
+
+
+def test_stream_answer():
+    """Test that streamed deltas add up to a non-empty answer."""
+
+    llm = OllamaClient()
+
+    if not llm.is_running():
+        pytest.skip("Ollama is not running. Skipping LLM test.")
+
+    deltas = list(llm.stream_answer("Answer in one word: what colour is the sky on a clear day?"))
+
+    assert len(deltas) > 0, "Stream should yield at least one delta"
+    assert all(isinstance(delta, str) for delta in deltas)
+    assert len("".join(deltas).strip()) > 0, "Streamed answer should not be empty"
+
+
+
+class FlakyOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate with 503 for the first ``failures`` requests, after ``delay`` seconds."""
+
+    failures = 0
+    delay = 0.0
+    body = json.dumps({"response": "ok", "done": True}).encode()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(self.delay)
+        if FlakyOllamaHandler.failures > 0:
+            FlakyOllamaHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def flaky_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/api"
+    server.shutdown()
+
+
+def test_retries_and_deadline(flaky_server):
+    """Transient 503s are retried; a slow server hits the deadline instead of hanging."""
+    llm = OllamaClient(url=flaky_server, max_retries=2)
+    llm.retry_backoff = 0.01
+
+    FlakyOllamaHandler.failures = 2
+    assert llm.generate_answer("prompt") == "ok"
+    assert llm.stats()["retries"] == 2
+    assert asyncio.run(llm.generate_answer_in_thread("prompt")) == "ok"
+
+    FlakyOllamaHandler.delay = 0.5
+    try:
+        assert llm.generate_answer("prompt", deadline=0.1).startswith("LLM error")
+    finally:
+        FlakyOllamaHandler.delay = 0.0
+    assert llm.stats()["acquired"] == 3
+
+
+def test_malformed_response(flaky_server, monkeypatch):
+    """A response that is not JSON ends the answer with the error message instead of raising."""
+    llm = OllamaClient(url=flaky_server)
+    monkeypatch.setattr(FlakyOllamaHandler, "body", b'{"response": "partial"}\nnot json\n')
+    assert list(llm.stream_answer("prompt")) == ["partial", LLM_ERROR_RESPONSE]
+    assert llm.generate_answer("prompt") == LLM_ERROR_RESPONSE
+
+
+def test_concurrency_limiter():
+    limiter = ConcurrencyLimiter(1)
+    with limiter.slot():
+        assert limiter.stats()["active"] == 1
+        with pytest.raises(TimeoutError):
+            with limiter.slot(timeout=0.01):
+                pass
+    stats = limiter.stats()
+    assert stats["active"] == 0 and stats["acquired"] == 1 and stats["rejected"] == 1
@@ -0,0 +1,48 @@
+"""Test suite for the incremental ingest manifest."""
+import os
+import tempfile
+import shutil
+from main.vector_store.manifest import IngestManifest
+
+
+def test_manifest_diff_and_reload():
+    temp_dir = tempfile.mkdtemp()
+    manifest_path = os.path.join(temp_dir, "global.manifest.json")
+    settings = {"chunk_size": 500, "chunk_overlap": 50, "embedding_model": "all-MiniLM-L6-v2"}
+
+    try:
+        paths = {}
+        for name, content in [("a.pdf", b"first"), ("b.pdf", b"second")]:
+            paths[name] = os.path.join(temp_dir, name)
+            with open(paths[name], "wb") as f:
+                f.write(content)
+
+        manifest = IngestManifest(settings)
+        for name, path in paths.items():
+            manifest.record(name, path, manifest.file_hash(name, path), manifest.allocate_ids(3))
+        manifest.save(manifest_path)
+
+        loaded = IngestManifest.load(manifest_path, settings)
+        assert loaded.next_id == 6
+        assert loaded.chunk_ids() == set(range(6))
+
+        # Change one file, remove the other, add a new one
+        with open(paths["a.pdf"], "wb") as f:
+            f.write(b"first, edited")
+        current = {
+            "a.pdf": loaded.file_hash("a.pdf", paths["a.pdf"]),
+            "c.pdf": "new-hash",
+        }
+        added, changed, removed = loaded.diff(current)
+        assert added == ["c.pdf"]
+        assert changed == ["a.pdf"]
+        assert removed == ["b.pdf"]
+        assert loaded.forget("b.pdf") == range(3, 6)
+
+        # Different ingest settings invalidate the manifest
+        other = IngestManifest.load(manifest_path, {**settings, "chunk_size": 800})
+        assert other.files == {}
+        assert other.next_id == 0
+
+    finally:
+        shutil.rmtree(temp_dir)
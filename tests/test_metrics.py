@@ -0,0 +1,62 @@
+"""Test suite for the metrics module."""
+import contextvars
+import threading
+from main import metrics
+
+
+def test_trace_spans_and_export():
+    registry = metrics.MetricsRegistry()
+    finished = []
+    metrics.add_trace_hook(finished.append)
+    try:
+        with metrics.trace("query") as attrs:
+            with metrics.span("intent") as span:
+                span["intent"] = "question"
+            # Spans from other threads join the trace when the context is copied
+            context = contextvars.copy_context()
+            worker = threading.Thread(target=context.run, args=(metrics.record_span, "retrieve", 0.02))
+            worker.start()
+            worker.join()
+            metrics.record_llm({"eval_count": 12, "eval_duration": 300_000_000})
+            attrs["user"] = "test"
+    finally:
+        metrics._hooks.remove(finished.append)
+
+    trace = finished[0]
+    assert [stage for stage, _, _ in trace.spans] == ["intent", "retrieve"]
+    assert trace.spans[0][2] == {"intent": "question"}
+    assert trace.to_dict()["llm"] == {"eval_count": 12, "eval_duration": 300_000_000}
+    assert trace.to_dict()["user"] == "test"
+
+    for value in (0.02, 0.03, 0.2, 3.0):
+        registry.observe("rag_stage_seconds", value, stage="search")
+    registry.inc("rag_llm_tokens", 12, kind="generated")
+    text = registry.prometheus_text()
+    assert 'rag_stage_seconds_bucket{stage="search",le="0.05"} 2' in text
+    assert 'rag_stage_seconds_count{stage="search"} 4' in text
+    assert 'rag_llm_tokens_total{kind="generated"} 12' in text
+
+    summary = registry.snapshot()['rag_stage_seconds{stage="search"}']
+    assert summary["count"] == 4
+    assert 0.025 <= summary["p50"] <= 0.05
+
+
+def test_first_request_recorded_separately():
+    finished = []
+    metrics.add_trace_hook(finished.append)
+    try:
+        for _ in range(2):
+            with metrics.trace("cold-start-test"):
+                pass
+    finally:
+        metrics._hooks.remove(finished.append)
+
+    assert [trace.attrs.get("first") for trace in finished] == [True, None]
+    snapshot = metrics.snapshot()
+    assert snapshot['rag_request_seconds{kind="cold-start-test"}']["count"] == 2
+    assert snapshot['rag_first_request_seconds{kind="cold-start-test"}']["count"] == 1
+
+    # Startup is measured from process launch, which was before this module was imported
+    metrics.record_startup("startup-test")
+    recorded = metrics.snapshot()['rag_startup_seconds{app="startup-test"}']
+    assert recorded["count"] == 1 and 0 < recorded["mean"] <= metrics.process_uptime()
@@ -0,0 +1,27 @@
+"""Test suite for the micro-batcher."""
+import asyncio
+import pytest
+from main.micro_batcher import MicroBatcher
+
+
+def test_concurrent_calls_are_batched():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        if -1 in items:
+            raise ValueError("negative")
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait=0.05)
+        results = await asyncio.gather(*(batcher.submit(item) for item in range(10)))
+        with pytest.raises(ValueError):
+            await batcher.submit(-1)
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == [item * 2 for item in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2, 1]
+    assert stats == dict(stats, batches=4, items=11)
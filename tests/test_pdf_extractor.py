@@ -1,6 +1,6 @@
 """Test suite for PDF text extraction functionality."""
 import os
-from main.extractor.pdf_extractor import extract_text_from_pdf
+from main.extractor.pdf_extractor import extract_text_from_pdf, extract_pdfs_parallel
 
 def test_extract_text_from_pdf():
     """Test the PDF text extraction functionality."""
@@ -12,3 +12,18 @@ def test_extract_text_from_pdf():
     assert isinstance(text, str)
     assert len(text) > 10  # Adjust threshold depending on your PDF
     # assert "Introduction" in text or "Summary" in text or "the" in text.lower()
+
+
+def test_extract_pdfs_parallel():
+    """Test parallel extraction keeps page order and reports failing files."""
+    sample_pdf = "sample_pdfs/IPS4000.pdf"
+    broken_pdf = "sample_pdfs/missing.pdf"
+
+    results = {
+        result.file_path: result
+        for result in extract_pdfs_parallel([sample_pdf, broken_pdf], workers=2, pages_per_task=1)
+    }
+
+    assert results[sample_pdf].error is None
+    assert results[sample_pdf].text == extract_text_from_pdf(sample_pdf)
+    assert results[broken_pdf].error
@@ -0,0 +1,53 @@
+"""Test suite for the query embedding and retrieval caches."""
+import numpy as np
+from main.vector_store import faiss_indexer
+from main.vector_store.faiss_indexer import FaissStore
+
+
+class CountingModel:
+    """Stand-in for SentenceTransformer that counts encode calls."""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        return np.ones((len(texts), self.dim), dtype="float32")
+
+
+def test_query_caches_hit_and_invalidate():
+    dim = 8
+    store = FaissStore(dim)
+    store.add(np.random.rand(3, dim).astype("float32"), ["doc1", "doc2", "doc3"])
+    model = CountingModel(dim)
+
+    first = faiss_indexer.query_faiss_index(store, "What is the max flow?", model, k=2)
+    again = faiss_indexer.query_faiss_index(store, "  what is the MAX flow? ", model, k=2)
+    assert again == first
+    assert model.calls == 1
+
+    # Mutating the index invalidates cached results but not the query embedding
+    retrieval_misses = faiss_indexer.cache_stats()["retrieval"]["misses"]
+    store.add(np.ones((1, dim), dtype="float32"), ["doc4"])
+    results = faiss_indexer.query_faiss_index(store, "What is the max flow?", model, k=2)
+    assert results[0][0] == "doc4"
+    assert model.calls == 1
+    assert faiss_indexer.cache_stats()["retrieval"]["misses"] == retrieval_misses + 1
+
+
+def test_retrieval_cache_per_store():
+    dim = 8
+    stores = [FaissStore(dim), FaissStore(dim)]
+    for number, store in enumerate(stores):
+        store.add(np.random.rand(2, dim).astype("float32"), [f"store{number} doc1", f"store{number} doc2"])
+    model = CountingModel(dim)
+
+    # Alternating stores neither evict each other's entries nor mix up their results
+    for store in stores:
+        faiss_indexer.query_faiss_index(store, "seal kit", model, k=1)
+    hits = faiss_indexer.cache_stats()["retrieval"]["hits"]
+    for number, store in enumerate(stores):
+        results = faiss_indexer.query_faiss_index(store, "seal kit", model, k=1)
+        assert results[0][0].startswith(f"store{number}")
+    assert faiss_indexer.cache_stats()["retrieval"]["hits"] == hits + 2
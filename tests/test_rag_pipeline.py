@@ -0,0 +1,179 @@
+"""Test suite for the shared RAG query path."""
+import asyncio
+import numpy as np
+import pytest
+from main import rag_pipeline
+from main.answer_cache import SemanticAnswerCache
+from main.llm.base import LLM_ERROR_RESPONSE, LLMBase
+from main.vector_store.faiss_indexer import build_faiss_index
+from tests.helpers import BagOfWordsModel
+
+
+class WaitingDetector:
+    """Returns a fixed intent, after waiting briefly for the query to be embedded."""
+
+    def __init__(self, intent, model):
+        self.intent = intent
+        self.model = model
+        self.embedded_during_detection = False
+
+    def detect(self, text):
+        self.embedded_during_detection = self.model.called.wait(timeout=2)
+        return self.intent
+
+
+class EchoLLM(LLMBase):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_answer(self, prompt):
+        self.calls += 1
+        return prompt.rsplit("Context:\n", 1)[1]
+
+
+class WordStreamLLM(EchoLLM):
+    def stream_answer(self, prompt):
+        for word in self.generate_answer(prompt).split(" "):
+            yield word + " "
+
+
+@pytest.fixture(autouse=True)
+def answer_cache(monkeypatch):
+    """A fresh answer cache per test, disabled unless a test enables it."""
+    cache = SemanticAnswerCache(threshold=0.95, maxsize=16)
+    enabled = []
+    monkeypatch.setattr(rag_pipeline, "get_answer_cache", lambda: cache if enabled else None)
+    cache.enable = lambda: enabled.append(True)
+    return cache
+
+
+def test_answer_query_speculative():
+    model = BagOfWordsModel()
+    chunks = ["pump max flow is 100 gpm", "controller voltage is 24 v"]
+    index = build_faiss_index(model.encode(chunks), chunks)
+    model.called.clear()
+
+    detector = WaitingDetector("question", model)
+    answer = rag_pipeline.answer_query(index, "pump max flow", EchoLLM(), [], detector, model, speculative=True)
+    assert detector.embedded_during_detection
+    assert answer.startswith("pump max flow is 100 gpm")
+
+    sequential = rag_pipeline.answer_query(index, "pump max flow", EchoLLM(), [], detector, model, speculative=False)
+    assert sequential == answer
+
+    greeting = rag_pipeline.answer_query(index, "hello pump", EchoLLM(), [], WaitingDetector("greeting", model), model)
+    assert greeting == rag_pipeline.CANNED_RESPONSES["greeting"]
+    assert rag_pipeline.answer_query(index, "  ", EchoLLM(), [], detector, model) is None
+
+
+def test_stream_query():
+    model = BagOfWordsModel()
+    chunks = ["pump max flow is 100 gpm"]
+    index = build_faiss_index(model.encode(chunks), chunks)
+    detector = WaitingDetector("question", model)
+
+    answer = rag_pipeline.answer_query(index, "pump max flow", EchoLLM(), [], detector, model)
+    deltas = list(rag_pipeline.stream_query(index, "pump max flow", WordStreamLLM(), [], detector, model))
+    assert len(deltas) > 1
+    assert "".join(deltas).strip() == answer.strip()
+
+    # Clients without streaming yield the whole answer once, also through the async wrapper
+    assert list(rag_pipeline.stream_query(index, "pump max flow", EchoLLM(), [], detector, model)) == [answer]
+
+    async def collect():
+        return [delta async for delta in WordStreamLLM().stream_answer_in_thread("Context:\na b c")]
+    assert asyncio.run(collect()) == ["a ", "b ", "c "]
+
+    greeting = rag_pipeline.stream_query(index, "hi", EchoLLM(), [], WaitingDetector("greeting", model), model)
+    assert list(greeting) == [rag_pipeline.CANNED_RESPONSES["greeting"]]
+
+
+def test_stream_in_thread_closes_stream():
+    class EndlessLLM(EchoLLM):
+        closed = False
+
+        def stream_answer(self, prompt):
+            try:
+                while True:
+                    yield "word "
+            finally:
+                EndlessLLM.closed = True
+
+    async def first_delta():
+        stream = EndlessLLM().stream_answer_in_thread("prompt")
+        delta = await anext(stream)
+        await stream.aclose()  # The consumer stops early: the blocking stream is closed too
+        return delta, EndlessLLM.closed
+
+    assert asyncio.run(first_delta()) == ("word ", True)
+
+
+def test_answer_cache(answer_cache, tmp_path):
+    answer_cache.enable()
+    model = BagOfWordsModel()
+    chunks = ["pump max flow is 100 gpm", "controller voltage is 24 v"]
+    index = build_faiss_index(model.encode(chunks), chunks)
+    detector = WaitingDetector("question", model)
+    llm = EchoLLM()
+
+    first = rag_pipeline.answer_query(index, "pump max flow?", llm, [], detector, model)
+    # Same words in another order: identical embedding and chunks, so no second generation
+    again = "".join(rag_pipeline.stream_query(index, "Max flow pump?", llm, [], detector, model))
+    assert again == first and llm.calls == 1
+    assert answer_cache.hits == 1
+
+    # Follow-up questions depend on the conversation and are not served from the cache
+    rag_pipeline.answer_query(index, "Max flow pump?", llm, [("q", "a")], detector, model)
+    assert llm.calls == 2
+
+    # Entries persist on flush rather than on every store, and are dropped once the index changes
+    answer_cache.path = str(tmp_path / "answers.json")
+    answer_cache.store(np.ones(4, dtype="float32"), [99], "unsaved")
+    assert not (tmp_path / "answers.json").exists()
+    answer_cache.flush()
+    restored = SemanticAnswerCache(threshold=0.95, maxsize=16, path=answer_cache.path)
+    assert len(restored) == 2
+    index.add(model.encode(["new chunk"]), ["new chunk"])
+    restored.sync(index.revision)
+    assert len(restored) == 0
+
+
+def test_failed_stream_not_cached(answer_cache):
+    answer_cache.enable()
+    model = BagOfWordsModel()
+    chunks = ["pump max flow is 100 gpm"]
+    index = build_faiss_index(model.encode(chunks), chunks)
+    detector = WaitingDetector("question", model)
+
+    class FailingStreamLLM(EchoLLM):
+        def stream_answer(self, prompt):
+            self.calls += 1
+            yield "The pump "
+            yield LLM_ERROR_RESPONSE  # The connection dropped midway
+
+    llm = FailingStreamLLM()
+    deltas = list(rag_pipeline.stream_query(index, "pump max flow?", llm, [], detector, model))
+    assert deltas == ["The pump ", LLM_ERROR_RESPONSE]
+    assert len(answer_cache) == 0
+
+    list(rag_pipeline.stream_query(index, "Max flow pump?", llm, [], detector, model))
+    assert llm.calls == 2 and answer_cache.hits == 0
+
+
+def test_chat_prompt_prefix(monkeypatch):
+    monkeypatch.setattr(rag_pipeline.Config, "LLM_MODE", "chat")
+    model = BagOfWordsModel()
+    chunks = ["pump max flow is 100 gpm", "controller voltage is 24 v"]
+    index = build_faiss_index(model.encode(chunks), chunks)
+    detector = WaitingDetector("question", model)
+
+    history = [("pump max flow?", "100 gpm")]
+    first = rag_pipeline.prepare_answer(index, "controller voltage?", EchoLLM(), history, detector, model).prompt
+    history.append(("controller voltage?", "24 v"))
+    second = rag_pipeline.prepare_answer(index, "pump voltage?", EchoLLM(), history, detector, model).prompt
+
+    # The next turn only appends: everything before the last user message is unchanged
+    assert first[0]["role"] == "system"
+    assert second[:len(first) - 1] == first[:-1]
+    assert second[-1]["content"].startswith("Context:\n")
+    assert rag_pipeline.answer_query(index, "pump max flow", EchoLLM(), [], detector, model).startswith("pump max flow")
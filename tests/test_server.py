@@ -0,0 +1,73 @@
+"""Test suite for the HTTP query service."""
+import asyncio
+import http.client
+import json
+import server
+from main.config import Config
+from main.llm.base import LLMBase
+from main.vector_store.faiss_indexer import build_faiss_index
+from tests.helpers import BagOfWordsModel
+
+DOCS = [
+    "The IPS 4000 pump has a maximum flow of 900 gpm.",
+    "The 4300 VIL circulator runs at 3500 rpm.",
+    "Seal kits are available for split case pumps.",
+]
+
+
+class StreamingLLM(LLMBase):
+    def generate_answer(self, prompt):
+        return "The answer."
+
+    def stream_answer(self, prompt):
+        yield from ["The ", "answer."]
+
+
+class QuestionDetector:
+    def detect(self, text):
+        return "question"
+
+
+def post(port: int, payload: dict) -> tuple[int, bytes]:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request("POST", "/query", json.dumps(payload), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def test_concurrent_queries_share_one_encode(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_MODE", "generate")
+    monkeypatch.setattr(Config, "ANSWER_CACHE_SIZE", 0)
+    model = BagOfWordsModel()
+    store = build_faiss_index(model.encode(DOCS), DOCS)
+    model.batches.clear()
+    service = server.QueryService(
+        store, StreamingLLM(), QuestionDetector(), model=model, max_batch_size=3, max_wait_ms=2000
+    )
+    questions = [doc.replace(".", "?") for doc in DOCS]
+
+    async def scenario():
+        listener = await service.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        loop = asyncio.get_running_loop()
+        batched = await asyncio.gather(*(
+            loop.run_in_executor(None, post, port, {"question": question, "stream": index == 0})
+            for index, question in enumerate(questions)
+        ))
+        invalid = await loop.run_in_executor(None, post, port, {"history": []})
+        listener.close()
+        await service.close()
+        return batched, invalid
+
+    batched, invalid = asyncio.run(scenario())
+    assert model.batches == [3]  # All three questions were encoded together
+
+    status, body = batched[0]
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert status == 200
+    assert "".join(line["delta"] for line in lines[:-1]) == "The answer."
+    assert lines[-1]["done"] and lines[-1]["generated"] and lines[-1]["chunks"]
+
+    status, body = batched[1]
+    assert status == 200 and json.loads(body)["answer"] == "The answer."
+    assert invalid[0] == 400
@@ -0,0 +1,52 @@
+"""Test suite for sharded collections."""
+import os
+import numpy as np
+from main.vector_store import faiss_indexer
+from main.vector_store.faiss_indexer import build_faiss_index, save_faiss_index
+from main.vector_store.sharded_store import Shard, ShardedStore, _merge, global_id, split_id
+
+
+class KeywordModel:
+    """Embeds a text by which of a few keywords it contains."""
+
+    WORDS = ["pump", "valve", "motor", "flow"]
+
+    def encode(self, texts, **kwargs):
+        return np.array([[word in text.lower() for word in self.WORDS] for text in texts], dtype="float32") + 1e-3
+
+
+def test_sharded_search(tmp_path):
+    model = KeywordModel()
+    collections = {
+        "pumps": ["pump flow rate", "pump motor size"],
+        "valves": ["valve flow coefficient", "valve motor actuator"],
+    }
+    shards = []
+    for ordinal, (name, chunks) in enumerate(collections.items(), start=1):
+        path = os.path.join(tmp_path, name, "index.index")
+        os.makedirs(os.path.dirname(path))
+        save_faiss_index(build_faiss_index(model.encode(chunks), chunks), path)
+        shards.append(Shard(name, ordinal, path))
+    store = ShardedStore(shards)
+    revision = store.revision
+
+    # Results from all shards are merged into one top-k, with collection-unique IDs
+    results = faiss_indexer.query_faiss_index(store, "flow", model, k=2, with_ids=True)
+    assert sorted(text for _, text, _ in results) == ["pump flow rate", "valve flow coefficient"]
+    assert {split_id(chunk_id)[0] for chunk_id, _, _ in results} == {1, 2}
+    assert all(shard.loaded for shard in shards)
+    assert store.revision == revision  # Loading does not count as a change
+
+    results = faiss_indexer.query_faiss_index(store, "motor", model, k=2, with_ids=True, collections=["valves"])
+    assert [(chunk_id, text) for chunk_id, text, _ in results][0] == (global_id(2, 1), "valve motor actuator")
+    assert all(split_id(chunk_id)[0] == 2 for chunk_id, _, _ in results)
+
+    shards[0].get().remove([0])
+    assert store.revision != revision
+
+
+def test_merge_by_score():
+    # One collection holds all the relevant hits; the others' best chunks must not push them out
+    pumps = [(1, "a", 0.91), (2, "b", 0.88), (3, "c", 0.85), (4, "d", 0.80)]
+    others = [[(5, "e", 0.12), (6, "f", 0.10)], [(7, "g", 0.11)], [(8, "h", 0.09)]]
+    assert [chunk_id for chunk_id, _, _ in _merge([pumps, *others], 4)] == [1, 2, 3, 4]
@@ -53,3 +53,106 @@ def test_faiss_store():
 
     finally:
         shutil.rmtree(temp_dir)
+
+
+def test_faiss_store_remove():
+    dim = 16
+    store = FaissStore(dim)
+
+    embeddings = np.random.rand(4, dim).astype("float32")
+    ids = store.add(embeddings.copy(), ["doc1", "doc2", "doc3", "doc4"], ids=[10, 11, 12, 13])
+    assert ids.tolist() == [10, 11, 12, 13]
+    assert store.next_id == 14
+
+    assert store.remove([11, 12]) == 2
+    assert store.index.ntotal == 2
+    assert sorted(store.metadata) == [10, 13]
+
+    results = store.search(embeddings[3], k=4)
+    assert {doc for doc, _ in results} == {"doc1", "doc4"}
+
+    # Compaction rebuilds the index with the remaining vectors and IDs
+    assert store.compact([10]) == 1
+    assert store.ids().tolist() == [13]
+
+
+def test_faiss_store_index_specs():
+    temp_dir = tempfile.mkdtemp()
+    index_file = os.path.join(temp_dir, "test.index")
+    metadata_file = os.path.join(temp_dir, "test_metadata.npy")
+
+    try:
+        dim = 16
+        embeddings = np.random.rand(200, dim).astype("float32")
+        documents = [f"doc{i}" for i in range(200)]
+
+        store = FaissStore(dim, "IVF4,Flat", {"nprobe": 4})
+        assert not store.is_trained
+        store.train(embeddings)
+        store.add(embeddings.copy(), documents)
+        assert store.search(embeddings[7], k=1)[0][0] == "doc7"
+
+        # Index type and search parameters survive save/load
+        store.save(index_file, metadata_file)
+        loaded = FaissStore(dim)
+        loaded.load(index_file, metadata_file)
+        assert loaded.index_spec == "IVF4,Flat"
+        assert loaded.search_params == {"nprobe": 4}
+        assert loaded.search(embeddings[7], k=1)[0][0] == "doc7"
+
+        # HNSW cannot remove in place, so removal compacts the index
+        hnsw = FaissStore(dim, "HNSW8", {"efSearch": 32})
+        hnsw.add(embeddings.copy(), documents)
+        assert hnsw.remove(range(100)) == 100
+        assert hnsw.index.ntotal == 100
+        assert hnsw.search(embeddings[150], k=1)[0][0] == "doc150"
+
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_faiss_store_memory_mapped_load():
+    temp_dir = tempfile.mkdtemp()
+    index_file = os.path.join(temp_dir, "test.index")
+    metadata_file = os.path.join(temp_dir, "test.meta")
+
+    try:
+        dim = 16
+        store = FaissStore(dim, model_name="all-MiniLM-L6-v2")
+        embeddings = np.random.rand(3, dim).astype("float32")
+        store.add(embeddings.copy(), ["première", "doc2", "doc3"], ids=[5, 2, 9])
+        store.save(index_file, metadata_file)
+
+        # Dimension and model are read from the files
+        loaded = FaissStore.from_files(index_file, metadata_file)
+        assert loaded.dim == dim
+        assert loaded.model_name == "all-MiniLM-L6-v2"
+        assert loaded.next_id == 10
+        assert dict(loaded.metadata) == {2: "doc2", 5: "première", 9: "doc3"}
+        assert loaded.search(embeddings[0].copy(), k=1)[0][0] == "première"
+
+        # Mutating a mapped store works on an in-memory copy
+        loaded.add(np.random.rand(1, dim).astype("float32"), ["doc4"])
+        assert loaded.index.ntotal == 4
+        assert len(FaissStore.from_files(index_file, metadata_file).metadata) == 3
+
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+def test_faiss_store_sources():
+    temp_dir = tempfile.mkdtemp()
+    try:
+        store = FaissStore(8)
+        embeddings = np.random.rand(3, 8).astype("float32")
+        store.add(embeddings, ["a", "b", "c"], [0, 1, 2], [("x.pdf", 1, 0, 10), ("x.pdf", 2, 8, 20), ("y.pdf", 1, 0, 5)])
+        store.remove([1])
+        assert store.source(0) == ("x.pdf", 1, 0, 10)
+        assert store.source(1) is None
+
+        base = os.path.join(temp_dir, "test")
+        store.save(base + ".index", base + ".meta", sources_path=base + ".src.npz")
+        loaded = FaissStore.from_files(base + ".index", base + ".meta", sources_path=base + ".src.npz")
+        assert loaded.source(2) == ("y.pdf", 1, 0, 5)
+    finally:
+        shutil.rmtree(temp_dir)